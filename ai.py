@@ -0,0 +1,214 @@
+import math
+import random
+import time
+import pygame
+
+# Difficulty presets: lookahead depth in action steps, search time allowed per frame,
+# frames between decisions and how many clash key presses the CPU manages per second
+DIFFICULTIES = {
+    'easy': {'depth': 1, 'budget_ms': 1.0, 'replan_frames': 12, 'mash_rate': 6},
+    'normal': {'depth': 2, 'budget_ms': 2.0, 'replan_frames': 8, 'mash_rate': 8},
+    'hard': {'depth': 3, 'budget_ms': 3.0, 'replan_frames': 4, 'mash_rate': 10},
+}
+
+STEP_FRAMES = 6  # Frames each action is held for during a rollout
+PREFERRED_RANGE = 60  # Distance the CPU likes to fight at
+ATTACK_RANGE = 75  # Distance at which a swing can land
+AGGRESSION = 1.2  # Damage dealt is worth a bit more than damage taken
+BUDGET_HEADROOM = 1.25  # Safety factor on the expected rollout time
+
+# Stand still plus the eight movement directions
+MOVES = [(0, 0), (0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (1, -1), (-1, 1), (1, 1)]
+
+def make_controls(move=(0, 0), attack=False, guard=False):
+    """Build the same control dictionary the keyboard produces"""
+    dx, dy = move
+    return {
+        pygame.K_w: dy < 0,
+        pygame.K_s: dy > 0,
+        pygame.K_a: dx < 0,
+        pygame.K_d: dx > 0,
+        pygame.K_SPACE: attack,
+        pygame.K_g: guard
+    }
+
+# Every action the search considers
+CANDIDATES = ([make_controls(move, attack=False) for move in MOVES] +
+              [make_controls(move, attack=True) for move in MOVES] +
+              [make_controls(guard=True)])
+
+def chase_controls(player, target):
+    """Simple policy: close in on the target and swing when in range"""
+    dx = target.x - player.x
+    dy = target.y - player.y
+    distance = math.hypot(dx, dy)
+    move_x = 0 if abs(dx) < PREFERRED_RANGE * 0.5 else (1 if dx > 0 else -1)
+    move_y = 0 if abs(dy) < PREFERRED_RANGE * 0.5 else (1 if dy > 0 else -1)
+    return make_controls((move_x, move_y), attack=distance < ATTACK_RANGE)
+
+def opponent_controls(opponent, player, move):
+    """Opponent model: keep moving the way it was last seen moving and swing when in range"""
+    distance = math.hypot(player.x - opponent.x, player.y - opponent.y)
+    return make_controls(move, attack=distance < ATTACK_RANGE)
+
+def evaluate(player, target):
+    """Score a simulated position from the CPU's point of view"""
+    if target.is_dead:
+        return 100000.0
+    if player.is_dead:
+        return -100000.0
+    score = (player.health - target.health * AGGRESSION) * 10.0
+    distance = math.hypot(player.x - target.x, player.y - target.y)
+    return score - abs(distance - PREFERRED_RANGE)
+
+class AIController:
+    """CPU opponent that picks actions by running short lookahead rollouts of the sim.
+
+    The search is spread over several frames and never runs longer than the
+    per-frame budget; while it runs the previous decision keeps being played.
+    """
+    def __init__(self, copy_fighters, simulate_step, difficulty='normal'):
+        self.copy_fighters = copy_fighters
+        self.simulate_step = simulate_step
+        self.set_difficulty(difficulty)
+        self.reset()
+
+    def set_difficulty(self, difficulty):
+        settings = DIFFICULTIES[difficulty]
+        self.difficulty = difficulty
+        self.max_depth = settings['depth']
+        self.budget_ms = settings['budget_ms']
+        self.replan_frames = settings['replan_frames']
+        self.mash_rate = settings['mash_rate']
+        self.depth = self.max_depth
+
+    def reset(self):
+        """Forget the current plan and any search in progress"""
+        self.controls = make_controls()
+        self.pending = []
+        self.snapshot = None
+        self.best_controls = None
+        self.best_score = -math.inf
+        self.frames_since_plan = self.replan_frames
+        self.search_frames = 0
+        self.fallback_controls = make_controls()
+        self.rollout_cost = 0.0005  # Recent peak rollout time in seconds
+        self.last_think_ms = 0.0
+        self.target_move = (0, 0)
+        self.last_target_pos = None
+
+    def think(self, fighters, slot):
+        """Return this frame's controls for fighters[slot], searching within the time budget"""
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        player = fighters[slot]
+        target = self._nearest_opponent(fighters, player)
+        if target is None:
+            return make_controls()
+
+        self._observe(target)
+        self.frames_since_plan += 1
+        if self.snapshot is None and self.frames_since_plan >= self.replan_frames:
+            self._start_search(player, target)
+
+        if self.snapshot is not None:
+            self.search_frames += 1
+            self._search(deadline)
+
+            if not self.pending:
+                # Search finished: play the best action and think about depth again
+                self._commit()
+                if self.search_frames <= max(1, self.replan_frames // 2):
+                    self._set_depth(self.depth + 1)
+            elif self.search_frames >= self.replan_frames:
+                # Out of time: settle for the best action found so far and look less far ahead
+                self._commit()
+                self._set_depth(self.depth - 1)
+
+        self.last_think_ms = (time.perf_counter() - start) * 1000
+        return self.controls
+
+    def mash(self):
+        """Clash key presses the CPU manages this frame (at 60 frames per second)"""
+        return 1 if random.random() < self.mash_rate / 60 else 0
+
+    def _set_depth(self, depth):
+        depth = max(1, min(self.max_depth, depth))
+        # Rollout cost grows with depth, so rescale the estimate with it
+        self.rollout_cost *= depth / self.depth
+        self.depth = depth
+
+    def _observe(self, target):
+        """Remember which way the opponent is moving for the opponent model"""
+        if self.last_target_pos is not None:
+            dx = target.x - self.last_target_pos[0]
+            dy = target.y - self.last_target_pos[1]
+            self.target_move = ((dx > 1) - (dx < -1), (dy > 1) - (dy < -1))
+        self.last_target_pos = (target.x, target.y)
+
+    def _nearest_opponent(self, fighters, player):
+        nearest = None
+        nearest_distance = math.inf
+        for other in fighters:
+            if other is player or other.is_dead:
+                continue
+            distance = (other.x - player.x) ** 2 + (other.y - player.y) ** 2
+            if distance < nearest_distance:
+                nearest = other
+                nearest_distance = distance
+        return nearest
+
+    def _start_search(self, player, target):
+        self.snapshot = self.copy_fighters([player, target])
+        self.best_controls = None
+        self.best_score = -math.inf
+        self.search_frames = 0
+        self.fallback_controls = chase_controls(player, target)
+
+        # Evaluate the current action and the chase policy first so a cut-short
+        # search still has sensible answers
+        self.pending = list(CANDIDATES)
+        self.pending.append(self.fallback_controls)
+        self.pending.append(self.controls)
+
+    def _search(self, deadline):
+        started = False
+        while self.pending:
+            # Only start a rollout we expect to finish inside the budget, with some headroom
+            now = time.perf_counter()
+            if now + self.rollout_cost * BUDGET_HEADROOM > deadline:
+                if not started:
+                    # Let the estimate recover after an unusually slow rollout
+                    self.rollout_cost *= 0.9
+                break
+            started = True
+            controls = self.pending.pop()
+            score = self._rollout(controls)
+            # Track a slowly decaying peak so one slow rollout makes us more careful
+            self.rollout_cost = max(time.perf_counter() - now, self.rollout_cost * 0.99)
+            if score > self.best_score:
+                self.best_score = score
+                self.best_controls = controls
+
+    def _commit(self):
+        if self.best_controls is not None:
+            self.controls = self.best_controls
+        else:
+            # Nothing fitted in the budget: fall back to the plain chase policy
+            self.controls = self.fallback_controls
+        self.pending = []
+        self.snapshot = None
+        self.frames_since_plan = 0
+
+    def _rollout(self, first_controls):
+        """Play first_controls for one step, then the chase policy, and score the result"""
+        fighters = self.copy_fighters(self.snapshot)
+        player, target = fighters
+        for step in range(self.depth):
+            for _ in range(STEP_FRAMES):
+                controls = first_controls if step == 0 else chase_controls(player, target)
+                self.simulate_step(fighters, {0: controls,
+                                              1: opponent_controls(target, player, self.target_move)})
+                if player.is_dead or target.is_dead:
+                    return evaluate(player, target)
+        return evaluate(player, target)
@@ -0,0 +1,121 @@
+import mmap
+import os
+import struct
+import sys
+import pygame
+
+if __package__:
+    from .bundle import ASSET_DIR, AssetBundle
+else:
+    from bundle import ASSET_DIR, AssetBundle
+
+CACHE_PATH = os.path.join(ASSET_DIR, 'sounds.cache')
+CACHE_MAGIC = b'MGAUDIO2'
+HEADER = struct.Struct('<8siiiI')  # Magic, mixer frequency, format, channels, entry count
+ENTRY = struct.Struct('<32sQQH')  # Source stamp, data offset, data length, name length
+DATA_ALIGN = 16
+
+class AudioCache:
+    """Sounds already decoded to the mixer's sample format, kept in one memory-mapped file.
+
+    Each entry is keyed by asset name and records the stamp of the data it
+    was decoded from (see AssetBundle.stamp); an entry whose source has
+    changed, or a cache written for a different mixer format, is treated as
+    missing so the sound is decoded again and the cache rewritten.
+    """
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.file = None
+        self.mapping = None
+        self.entries = {}  # Asset name -> (stamp, offset, length)
+
+    def open(self):
+        """Map the cache file; returns False if there is no usable cache"""
+        self.close()
+        if not os.path.exists(self.path) or not pygame.mixer.get_init():
+            return False
+        try:
+            self.file = open(self.path, 'rb')
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, frequency, sample_format, channels, count = HEADER.unpack_from(self.mapping, 0)
+            if magic != CACHE_MAGIC or (frequency, sample_format, channels) != pygame.mixer.get_init():
+                self.close()
+                return False
+            position = HEADER.size
+            for _ in range(count):
+                stamp, offset, length, name_length = ENTRY.unpack_from(self.mapping, position)
+                position += ENTRY.size
+                name = bytes(self.mapping[position:position + name_length]).decode('utf-8')
+                position += name_length
+                self.entries[name] = (stamp, offset, length)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring audio cache {self.path}: {e}")
+            self.close()
+            return False
+        return True
+
+    def sound(self, name, stamp):
+        """Sound for an asset straight from the cache, or None if it is missing or stale"""
+        entry = self.entries.get(name)
+        if entry is None or self.mapping is None or entry[0] != stamp:
+            return None
+        stamp, offset, length = entry
+        return pygame.mixer.Sound(buffer=memoryview(self.mapping)[offset:offset + length])
+
+    def write(self, sounds):
+        """Rewrite the cache from {asset name: (stamp, Sound)}; returns (success, message)"""
+        self.close()
+        entries = [(name.encode('utf-8'), stamp, sound.get_raw()) for name, (stamp, sound) in sounds.items()]
+
+        # Header and index first, then each sound's samples at an aligned offset
+        offset = HEADER.size + sum(ENTRY.size + len(name) for name, stamp, raw in entries)
+        index = []
+        for name, stamp, raw in entries:
+            offset = -(-offset // DATA_ALIGN) * DATA_ALIGN
+            index.append((name, stamp, raw, offset))
+            offset += len(raw)
+
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(HEADER.pack(CACHE_MAGIC, *pygame.mixer.get_init(), len(index)))
+                for name, stamp, raw, offset in index:
+                    f.write(ENTRY.pack(stamp, offset, len(raw), len(name)))
+                    f.write(name)
+                for name, stamp, raw, offset in index:
+                    f.write(b'\0' * (offset - f.tell()))
+                    f.write(raw)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            return False, f"Could not write audio cache: {e}"
+        return True, f"Wrote {len(index)} sounds to {self.path}"
+
+    def close(self):
+        self.entries = {}
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def build_cache(bundle, names, cache_path=CACHE_PATH):
+    """Decode sounds from the bundle and write the cache; the build step run ahead of shipping"""
+    sounds = {}
+    for name in names:
+        if bundle.exists(name):
+            with bundle.open_asset(name) as f:
+                sounds[name] = (bundle.stamp(name), pygame.mixer.Sound(file=f))
+    return AudioCache(cache_path).write(sounds)
+
+if __name__ == '__main__':
+    # python assets/audio_cache.py [names...]; defaults to every sound effect in
+    # the assets (the music is streamed, so it is left out). Build the bundle first.
+    pygame.mixer.init(44100, -16, 2)
+    bundle = AssetBundle()
+    success, message = bundle.open()
+    print(message)
+    names = sys.argv[1:] or sorted(name for name in os.listdir(ASSET_DIR)
+                                   if name.endswith('.wav') and name != 'background-music.wav')
+    success, message = build_cache(bundle, names)
+    print(message)
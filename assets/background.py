@@ -2,18 +2,12 @@ import pygame
 import math
 import random
 
+CROWD_BOB = 3  # Pixels each spectator bobs up and down
+CROWD_RADIUS = 5
+SINE_STEPS = 256  # Entries in the crowd's sine table (a power of two)
+
 class ColiseumBackground:
-    def __init__(self, width, height):
-        self.width = width
-        self.height = height
-        # Keep the coliseum size fixed while allowing for wider window
-        self.coliseum_width = min(1000, width)  # Fixed coliseum width
-        self.center_x = width // 2  # Center of the window
-        
-        # Create the base background with a gradient sunset sky
-        self.base_bg = pygame.Surface((width, height))
-        self.create_gradient((255, 164, 27), (135, 206, 235))  # Sunset orange to sky blue
-        
+    def __init__(self, width, height, camera=None):
         # Coliseum parameters
         self.pillar_color = (210, 180, 140)  # Tan stone color
         self.arch_color = (180, 150, 110)    # Darker stone
@@ -27,7 +21,38 @@ class ColiseumBackground:
             (205, 133, 63),  # Peru
             (210, 180, 140), # Tan
         ]
+        
+        # One sine period as whole-pixel offsets, shared by the whole crowd
+        self.sine_table = [round(CROWD_BOB * math.sin(2 * math.pi * i / SINE_STEPS))
+                           for i in range(SINE_STEPS)]
+        self.crowd_dots = {}
+        self.animate_crowd = True
+        
+        # Optional camera; the static layer is scaled once per zoom step to the camera's
+        # render scale, and the scaled layers are dropped when the render scale changes
+        self.camera = camera
+        self.zoomed_bg = {}
+        self.layer_scale = None
+        self.resize(width, height)
+    
+    def resize(self, width, height):
+        """Lay out the coliseum for an arena size and drop the baked layers"""
+        self.width = width
+        self.height = height
+        # Keep the coliseum size fixed while allowing for wider window
+        self.coliseum_width = min(1000, width)  # Fixed coliseum width
+        self.center_x = width // 2  # Center of the window
+        
+        # Create the base background with a gradient sunset sky
+        self.base_bg = pygame.Surface((width, height))
+        self.create_gradient((255, 164, 27), (135, 206, 235))  # Sunset orange to sky blue
+        
         self.crowd_positions = self.generate_crowd()
+        self.build_crowd()
+        
+        # Everything except the crowd never moves, so it is baked once
+        self.static_bg = None
+        self.zoomed_bg = {}
     
     def create_gradient(self, color1, color2):
         """Create a vertical gradient from color1 to color2"""
@@ -66,15 +91,139 @@ class ColiseumBackground:
         pygame.draw.rect(surface, self.arch_color, (x, y + height//2, width, height//2))
         pygame.draw.arc(surface, self.arch_color, (x, y, width, height), 0, math.pi, 3)
     
+    def crowd_dot(self, color, radius=CROWD_RADIUS):
+        """Pre-rendered spectator, the same pixels as a circle of the radius"""
+        dot = self.crowd_dots.get((color, radius))
+        if dot is None:
+            size = radius * 2
+            dot = pygame.Surface((size, size))
+            dot.set_colorkey((0, 0, 0))
+            pygame.draw.circle(dot, color, (radius, radius), radius)
+            if pygame.display.get_surface() is not None:
+                dot = dot.convert()
+            self.crowd_dots[(color, radius)] = dot
+        return dot
+    
+    def build_crowd(self):
+        """Flatten the crowd into parallel lists for the per-frame animation"""
+        offset_x = (self.width - self.coliseum_width) // 2
+        self.crowd_colors_by_seat = [person['color'] for person in self.crowd_positions]
+        self.crowd_surfaces = [self.crowd_dot(color) for color in self.crowd_colors_by_seat]
+        self.crowd_x = [int(offset_x + person['x']) - CROWD_RADIUS for person in self.crowd_positions]
+        self.crowd_base_y = [int(person['y']) - CROWD_RADIUS for person in self.crowd_positions]
+        self.crowd_phase = [int(person['wave_offset'] / (2 * math.pi) * SINE_STEPS)
+                            for person in self.crowd_positions]
+        self.crowd_blits = []
+        
+        # The crowd never leaves this band, so it is all that needs redrawing
+        if self.crowd_positions:
+            top = min(self.crowd_base_y) - CROWD_BOB
+            bottom = max(self.crowd_base_y) + CROWD_BOB + CROWD_RADIUS * 2
+            left = min(self.crowd_x)
+            right = max(self.crowd_x) + CROWD_RADIUS * 2
+            self.crowd_rect = pygame.Rect(left, top, right - left, bottom - top)
+        else:
+            self.crowd_rect = pygame.Rect(0, 0, 0, 0)
+    
+    def set_crowd_animation(self, animate):
+        """Turn the bobbing crowd on or off; a still crowd is baked into the static layer"""
+        if animate != self.animate_crowd:
+            self.animate_crowd = animate
+            self.crowd_blits = []
+            self.static_bg = None
+            self.zoomed_bg = {}
+    
     def update(self):
         """Update any animated elements"""
-        # Update crowd animation
+        if not self.animate_crowd:
+            return
+        # Each spectator bobs on a sine wave around a fixed seat, one table lookup each
         current_time = pygame.time.get_ticks() / 1000
-        for person in self.crowd_positions:
-            person['y'] = person['y'] + math.sin(current_time + person['wave_offset']) * 0.2
+        step = int(current_time / (2 * math.pi) * SINE_STEPS)
+        mask = SINE_STEPS - 1
+        table = self.sine_table
+        if self.camera is not None and not self.camera.untransformed:
+            self.update_zoomed_crowd(step)
+            return
+        self.crowd_blits = [(dot, (x, base_y + table[(step + phase) & mask]))
+                            for dot, x, base_y, phase in zip(self.crowd_surfaces, self.crowd_x,
+                                                             self.crowd_base_y, self.crowd_phase)]
+    
+    def update_zoomed_crowd(self, step):
+        """Place the crowd through the camera, with spectators scaled to match"""
+        radius = max(1, round(CROWD_RADIUS * self.camera.magnification))
+        mask = SINE_STEPS - 1
+        table = self.sine_table
+        to_screen = self.camera.to_screen
+        # Seats whose spectator can't bob into view are skipped
+        view = self.camera.visible_rect().inflate(2 * (CROWD_RADIUS + CROWD_BOB), 2 * (CROWD_RADIUS + CROWD_BOB))
+        self.crowd_blits = []
+        for color, x, base_y, phase in zip(self.crowd_colors_by_seat, self.crowd_x,
+                                           self.crowd_base_y, self.crowd_phase):
+            if not view.collidepoint(x + CROWD_RADIUS, base_y + CROWD_RADIUS):
+                continue
+            screen_x, screen_y = to_screen(x + CROWD_RADIUS, base_y + CROWD_RADIUS + table[(step + phase) & mask])
+            self.crowd_blits.append((self.crowd_dot(color, radius), (screen_x - radius, screen_y - radius)))
+    
+    def static_layer(self):
+        """The background without the crowd as the camera sees it, rendered on first use"""
+        if self.camera is not None and not self.camera.untransformed:
+            return self.zoomed_layer(self.camera.zoom)
+        return self.unzoomed_layer()
+    
+    def zoomed_layer(self, zoom):
+        """The static layer as the camera sees it at a zoom step and the render scale.
+
+        The whole arena is magnified once per zoom step and kept, so wherever
+        the camera's focus is, the view is only a window into it.
+        """
+        if self.layer_scale != self.camera.scale:
+            self.zoomed_bg = {}
+            self.layer_scale = self.camera.scale
+        magnification = zoom * self.camera.scale
+        layer = self.zoomed_bg.get(zoom)
+        if layer is None:
+            size = (round(self.width * magnification), round(self.height * magnification))
+            layer = pygame.transform.smoothscale(self.unzoomed_layer(), size)
+            self.zoomed_bg[zoom] = layer
+        left, top = self.camera.origin(zoom)
+        view = pygame.Rect(round(left * magnification), round(top * magnification), *self.camera.render_size)
+        return layer.subsurface(view.clamp(layer.get_rect()))
+    
+    def unzoomed_layer(self):
+        if self.static_bg is None:
+            self.static_bg = pygame.Surface((self.width, self.height))
+            self.draw_static(self.static_bg)
+            if not self.animate_crowd:
+                # Seat the still crowd for good
+                self.static_bg.blits(list(zip(self.crowd_surfaces, zip(self.crowd_x, self.crowd_base_y))),
+                                     doreturn=False)
+            if pygame.display.get_surface() is not None:
+                self.static_bg = self.static_bg.convert()
+        return self.static_bg
     
     def draw(self, surface):
         """Draw the complete coliseum background"""
+        surface.blit(self.static_layer(), (0, 0))
+        return self.draw_crowd(surface)
+    
+    def draw_crowd(self, surface):
+        """Draw the animated crowd in one batch; returns the screen rects it covers"""
+        if not self.animate_crowd:
+            return []
+        if not self.crowd_blits:
+            self.update()
+        surface.blits(self.crowd_blits, doreturn=False)
+        if self.camera is not None and not self.camera.untransformed:
+            # The band through the camera, with room for the scaled spectators
+            left, top = self.camera.to_screen(*self.crowd_rect.topleft)
+            right, bottom = self.camera.to_screen(*self.crowd_rect.bottomright)
+            pad = round(CROWD_RADIUS * 2 * max(1, self.camera.magnification))
+            return [pygame.Rect(left, top, right - left, bottom - top).inflate(pad, pad)]
+        return [self.crowd_rect.copy()]
+    
+    def draw_static(self, surface):
+        """Draw the parts of the coliseum that never move: sky, mountains, stands and arena"""
         # Calculate offset to center the coliseum
         offset_x = (self.width - self.coliseum_width) // 2
         
@@ -106,11 +255,6 @@ class ColiseumBackground:
             self.draw_pillar(surface, offset_x + i * section_width - 10, self.height * 0.3,
                            20, self.height * 0.5)
         
-        # Draw crowd
-        for person in self.crowd_positions:
-            pygame.draw.circle(surface, person['color'],
-                             (int(offset_x + person['x']), int(person['y'])), 5)
-        
         # Draw ground
         pygame.draw.rect(surface, self.ground_color,
                         (0, self.height * 0.7, self.width, self.height * 0.3))
@@ -0,0 +1,148 @@
+import hashlib
+import io
+import mmap
+import os
+import struct
+import sys
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))  # Loose assets, wherever the game is started from
+BUNDLE_PATH = os.path.join(ASSET_DIR, 'assets.bundle')
+BUNDLE_MAGIC = b'MGBUNDL1'
+HEADER = struct.Struct('<8sI')  # Magic, entry count
+ENTRY = struct.Struct('<QQ32sH')  # Data offset, data length, SHA-256 of the data, name length
+DATA_ALIGN = 16
+DEV_ENV = 'MEDIEVAL_DEV_ASSETS'  # Set to read loose files from assets/ instead of the bundle
+
+class AssetBundle:
+    """Every asset packed into one memory-mapped file, looked up by name.
+
+    The file starts with an index of (name, offset, length, hash) entries
+    followed by the data. In developer mode, or when no bundle has been
+    built, the same names are read as loose files from the assets folder
+    so edits show up without rebuilding.
+    """
+    def __init__(self, path=BUNDLE_PATH, loose_dir=ASSET_DIR, developer_mode=None):
+        self.path = path
+        self.loose_dir = loose_dir
+        if developer_mode is None:
+            developer_mode = bool(os.environ.get(DEV_ENV))
+        self.developer_mode = developer_mode
+        self.file = None
+        self.mapping = None
+        self.entries = {}  # Name -> (offset, length, hash)
+
+    def open(self):
+        """Map the bundle; returns (success, message) and falls back to loose files on failure"""
+        self.close()
+        if self.developer_mode:
+            return True, f"Developer mode: reading loose assets from {self.loose_dir}"
+        if not os.path.exists(self.path):
+            self.developer_mode = True
+            return True, f"No asset bundle at {self.path}, reading loose assets"
+        try:
+            self.file = open(self.path, 'rb')
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count = HEADER.unpack_from(self.mapping, 0)
+            if magic != BUNDLE_MAGIC:
+                raise ValueError("not an asset bundle")
+            position = HEADER.size
+            for _ in range(count):
+                offset, length, digest, name_length = ENTRY.unpack_from(self.mapping, position)
+                position += ENTRY.size
+                name = bytes(self.mapping[position:position + name_length]).decode('utf-8')
+                position += name_length
+                self.entries[name] = (offset, length, digest)
+        except (OSError, ValueError, struct.error) as e:
+            self.close()
+            self.developer_mode = True
+            return False, f"Could not open asset bundle {self.path} ({e}), reading loose assets"
+        return True, f"Mapped {len(self.entries)} assets from {self.path}"
+
+    def loose_path(self, name):
+        return os.path.join(self.loose_dir, name)
+
+    def exists(self, name):
+        if self.developer_mode:
+            return os.path.exists(self.loose_path(name))
+        return name in self.entries
+
+    def read(self, name):
+        """An asset's bytes: a zero-copy view into the bundle, or the loose file's contents"""
+        if self.developer_mode:
+            with open(self.loose_path(name), 'rb') as f:
+                return f.read()
+        offset, length, digest = self.entries[name]
+        return memoryview(self.mapping)[offset:offset + length]
+
+    def open_asset(self, name):
+        """A file object over an asset, for loaders such as pygame.mixer.Sound(file=...)"""
+        if self.developer_mode:
+            return open(self.loose_path(name), 'rb')
+        return io.BytesIO(self.read(name))
+
+    def stamp(self, name):
+        """32 bytes that change whenever the asset does, for caches built from it"""
+        if self.developer_mode:
+            stat = os.stat(self.loose_path(name))
+            return hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).digest()
+        return self.entries[name][2]
+
+    def verify(self):
+        """Names of bundled assets whose data no longer matches their hash"""
+        return [name for name, (offset, length, digest) in self.entries.items()
+                if hashlib.sha256(self.read(name)).digest() != digest]
+
+    def close(self):
+        self.entries = {}
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def build_bundle(names, loose_dir=ASSET_DIR, path=BUNDLE_PATH):
+    """Pack loose assets into a bundle; returns (success, message)"""
+    assets = []
+    for name in names:
+        with open(os.path.join(loose_dir, name), 'rb') as f:
+            data = f.read()
+        assets.append((name.encode('utf-8'), data, hashlib.sha256(data).digest()))
+
+    # Index first, then each asset's data at an aligned offset
+    offset = HEADER.size + sum(ENTRY.size + len(name) for name, data, digest in assets)
+    index = []
+    for name, data, digest in assets:
+        offset = -(-offset // DATA_ALIGN) * DATA_ALIGN
+        index.append((name, data, digest, offset))
+        offset += len(data)
+
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(BUNDLE_MAGIC, len(index)))
+            for name, data, digest, offset in index:
+                f.write(ENTRY.pack(offset, len(data), digest, len(name)))
+                f.write(name)
+            for name, data, digest, offset in index:
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(data)
+        os.replace(temp_path, path)
+    except OSError as e:
+        return False, f"Could not write asset bundle: {e}"
+    return True, f"Packed {len(index)} assets into {path}"
+
+if __name__ == '__main__':
+    # python assets/bundle.py [names...] packs the given assets (default: every WAV in assets/);
+    # python assets/bundle.py --verify checks an existing bundle against its hashes
+    if sys.argv[1:] == ['--verify']:
+        bundle = AssetBundle(developer_mode=False)
+        success, message = bundle.open()
+        print(message)
+        if not bundle.developer_mode:
+            damaged = bundle.verify()
+            print(f"Damaged assets: {', '.join(damaged)}" if damaged else "All assets match their hashes")
+    else:
+        names = sys.argv[1:] or sorted(name for name in os.listdir(ASSET_DIR) if name.endswith('.wav'))
+        success, message = build_bundle(names)
+        print(message)
@@ -0,0 +1,75 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import pygame
+
+LOADER_THREADS = 4  # Sounds decoded at once
+
+class AssetLoader:
+    """Decodes sounds from the asset bundle on a small thread pool, each name only once.
+
+    Asking for a name that is already loading or loaded hands back the same
+    job, so one sound is never decoded twice. The game keeps drawing while
+    the pool works and polls progress() to show how far along it is.
+    
+    With an AudioCache, sounds still valid in the cache skip decoding
+    altogether, and save_cache() writes back any that had to be decoded.
+    """
+    def __init__(self, bundle, threads=LOADER_THREADS, cache=None):
+        self.bundle = bundle
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.jobs = {}  # Asset name -> future
+        self.cache = cache
+        self.cache_stale = False
+
+    def load_sound(self, name):
+        """Start decoding a sound; returns its future (shared by every request for the name)"""
+        job = self.jobs.get(name)
+        if job is None:
+            sound = None
+            if self.cache is not None and self.bundle.exists(name):
+                sound = self.cache.sound(name, self.bundle.stamp(name))
+            if sound is not None:
+                job = Future()
+                job.set_result(sound)
+            else:
+                job = self.executor.submit(self._decode, name)
+                self.cache_stale = True
+            self.jobs[name] = job
+        return job
+
+    def _decode(self, name):
+        if not self.bundle.exists(name):
+            print(f"Sound file not found: {name}")
+            return None
+        try:
+            with self.bundle.open_asset(name) as f:
+                return pygame.mixer.Sound(file=f)
+        except Exception as e:
+            print(f"Error loading sound {name}: {str(e)}")
+            return None
+
+    def progress(self):
+        """(finished, total) jobs so far"""
+        finished = sum(1 for job in self.jobs.values() if job.done())
+        return finished, len(self.jobs)
+
+    def done(self):
+        finished, total = self.progress()
+        return finished == total
+
+    def sound(self, name):
+        """The decoded sound for a name, waiting for it if needed; None if it failed"""
+        return self.load_sound(name).result()
+
+    def save_cache(self):
+        """Rewrite the audio cache if any sound had to be decoded; call once loading is done"""
+        if self.cache is None or not self.cache_stale:
+            return
+        sounds = {name: (self.bundle.stamp(name), job.result())
+                  for name, job in self.jobs.items() if job.result() is not None}
+        success, message = self.cache.write(sounds)
+        print(message)
+        self.cache_stale = False
+        self.cache.open()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -1,55 +1,134 @@
 import pygame
 import os
 
+# Mixer channels reserved for each group of sounds, so one group can never crowd out another
+CHANNEL_GROUPS = {
+    'impact': 6,  # Hits, blocks and clashes
+    'swing': 4,
+    'ui': 2,
+}
+
+# How each sound may use its group: most voices at once, priority when stealing a
+# voice (higher wins) and the least time between two starts of the same sound
+SOUND_VOICES = {
+    'sword-clash': {'group': 'impact', 'max_voices': 1, 'priority': 3, 'retrigger_ms': 100},
+    'hit': {'group': 'impact', 'max_voices': 3, 'priority': 2, 'retrigger_ms': 30},
+    'shield-block': {'group': 'impact', 'max_voices': 2, 'priority': 2, 'retrigger_ms': 30},
+    'swing': {'group': 'swing', 'max_voices': 3, 'priority': 1, 'retrigger_ms': 40},
+    'victory': {'group': 'ui', 'max_voices': 1, 'priority': 4, 'retrigger_ms': 500},
+}
+DEFAULT_VOICE = {'group': 'ui', 'max_voices': 1, 'priority': 1, 'retrigger_ms': 50}
+
 class SoundManager:
-    def __init__(self):
+    def __init__(self, bundle):
         # Make sure mixer is initialized
         if not pygame.mixer.get_init():
             pygame.mixer.init(44100, -16, 2, 2048)
         
+        self.bundle = bundle  # Assets are loaded by name from here
         self.sounds = {}
         self.current_music = None
+        self.music_file = None  # Kept open while the mixer streams from it
         self.music_volume = 0.5
         self.sound_volume = 0.7
-        self.background_music = pygame.mixer.Sound("assets/background-music.wav")
+        
+        # Every channel belongs to a group and is reserved, so Sound.play() never picks one
+        total = sum(CHANNEL_GROUPS.values())
+        pygame.mixer.set_num_channels(total)
+        pygame.mixer.set_reserved(total)
+        self.channel_groups = {}
+        index = 0
+        for group, count in CHANNEL_GROUPS.items():
+            self.channel_groups[group] = [pygame.mixer.Channel(i) for i in range(index, index + count)]
+            index += count
+        self.voices = {}  # Channel -> (sound name, priority, start time in ms)
+        self.last_started = {}  # Sound name -> start time in ms
         print("Sound manager initialized")
     
-    def load_sound(self, name, path):
+    def load_sound(self, name, asset):
         """Load a sound effect"""
         try:
-            if not os.path.exists(path):
-                print(f"Sound file not found: {path}")
+            if not self.bundle.exists(asset):
+                print(f"Sound file not found: {asset}")
                 return False
                 
-            sound = pygame.mixer.Sound(path)
-            sound.set_volume(self.sound_volume)
-            self.sounds[name] = sound
+            with self.bundle.open_asset(asset) as f:
+                self.add_sound(name, pygame.mixer.Sound(file=f))
             return True
         except Exception as e:
-            print(f"Error loading sound {path}: {str(e)}")
+            print(f"Error loading sound {asset}: {str(e)}")
             return False
     
+    def add_sound(self, name, sound):
+        """Register an already decoded sound effect"""
+        sound.set_volume(self.sound_volume)
+        self.sounds[name] = sound
+    
     def play_sound(self, name):
-        """Play a loaded sound effect"""
-        if name in self.sounds:
-            try:
-                self.sounds[name].play()
-            except Exception as e:
-                print(f"Error playing sound {name}: {str(e)}")
+        """Play a loaded sound effect on a voice from its group; returns True if it started"""
+        if name not in self.sounds:
+            return False
+        voice = SOUND_VOICES.get(name, DEFAULT_VOICE)
+        now = pygame.time.get_ticks()
+        
+        # Ignore retriggers fired within a few milliseconds of the last start
+        last = self.last_started.get(name)
+        if last is not None and now - last < voice['retrigger_ms']:
+            return False
+        
+        channel = self.pick_channel(name, voice)
+        if channel is None:
+            return False
+        try:
+            channel.play(self.sounds[name])
+        except Exception as e:
+            print(f"Error playing sound {name}: {str(e)}")
+            return False
+        self.voices[channel] = (name, voice['priority'], now)
+        self.last_started[name] = now
+        return True
+    
+    def pick_channel(self, name, voice):
+        """Free channel in the sound's group, or the voice it may steal; None to drop the sound"""
+        busy = []
+        free = None
+        for channel in self.channel_groups[voice['group']]:
+            if channel.get_busy() and channel in self.voices:
+                busy.append((channel, self.voices[channel]))
+            elif free is None:
+                free = channel
+        
+        # At its voice limit a sound restarts its own oldest voice
+        own = [(start, channel) for channel, (playing, priority, start) in busy if playing == name]
+        if len(own) >= voice['max_voices']:
+            return min(own, key=lambda entry: entry[0])[1]
+        if free is not None:
+            return free
+        
+        # Group full: steal the oldest of the lowest-priority voices, never a higher one
+        candidates = [(priority, start, channel) for channel, (playing, priority, start) in busy
+                      if priority <= voice['priority']]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda entry: entry[:2])[2]
     
-    def load_music(self, path):
+    def load_music(self, asset):
         """Load and play background music"""
         try:
-            if not os.path.exists(path):
-                print(f"Music file not found: {path}")
+            if not self.bundle.exists(asset):
+                print(f"Music file not found: {asset}")
                 return False
                 
-            pygame.mixer.music.load(path)
+            music_file = self.bundle.open_asset(asset)
+            pygame.mixer.music.load(music_file, asset)
             pygame.mixer.music.set_volume(self.music_volume)
-            self.current_music = path
+            if self.music_file is not None:
+                self.music_file.close()
+            self.music_file = music_file
+            self.current_music = asset
             return True
         except Exception as e:
-            print(f"Error loading music {path}: {str(e)}")
+            print(f"Error loading music {asset}: {str(e)}")
             return False
     
     def play_music(self, loop=True):
@@ -76,4 +155,4 @@ class SoundManager:
             sound.set_volume(self.sound_volume)
 
     def play_background_music(self):
-        self.background_music.play(-1)  # Loop indefinitely
+        self.play_music(loop=True)  # Streamed from disk, looping indefinitely
@@ -0,0 +1,110 @@
+import json
+import os
+import platform
+import pygame
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_THRESHOLD = 0.2  # Share a result may get worse than its baseline before it counts as a regression
+CALIBRATION_SIZE = (640, 360)  # Surface the calibration work blits
+CALIBRATION_LOOPS = 2000  # Interpreter loop iterations in the calibration work
+
+_calibration_surfaces = []
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def machine():
+    """What the numbers were measured on; baselines only compare fairly on the same setup"""
+    return {'platform': platform.platform(), 'python': platform.python_version(),
+            'pygame': pygame.version.ver}
+
+def calibration_work():
+    """A fixed mix of blitting and interpreter work for benchmarks to time alongside their cases.
+
+    No change to the game makes it faster or slower, so its time says how
+    fast the machine itself is running: a shared machine can slow everything
+    down by half again for minutes at a time.
+    """
+    if not _calibration_surfaces:
+        _calibration_surfaces.extend([pygame.Surface(CALIBRATION_SIZE), pygame.Surface(CALIBRATION_SIZE)])
+    target, source = _calibration_surfaces
+    target.blit(source, (0, 0))
+    total = 0
+    for i in range(CALIBRATION_LOOPS):
+        total += i * i % 7
+    return total
+
+def save(name, results, speed_us=None):
+    """Write results ({case: {metric: value}}) as the named baseline; returns (success, message).
+
+    speed_us is the calibration_work time measured with the results, if any.
+    """
+    path = baseline_path(name)
+    data = {'machine': machine(), 'results': results}
+    if speed_us is not None:
+        data['speed_us'] = speed_us
+    try:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
+    except OSError as e:
+        return False, f"Could not save baseline: {e}"
+    return True, f"Saved baseline to {path}"
+
+def load(name):
+    """The named baseline as {'machine': ..., 'results': ...}, or None if there is none"""
+    try:
+        with open(baseline_path(name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def compare(name, results, metrics, threshold=DEFAULT_THRESHOLD, slack=None, speed_us=None, timed=()):
+    """Check results against the named baseline; returns (passed, report lines).
+
+    metrics maps each gated metric to True when higher is better (ticks per
+    second) or False when lower is better (microseconds per call). To gate
+    cases differently, it can instead map each case to such a dict; cases
+    it leaves out aren't gated. Cases or metrics the baseline doesn't have
+    are reported but never fail. slack maps metrics to an absolute amount
+    they may worsen by on top of the threshold, for results so small that
+    timer and scheduler noise outweigh any share of them. A baseline of zero
+    allows no more than that slack.
+
+    When both runs timed calibration_work, the baseline's timed metrics
+    (times and rates, not sizes) are first scaled to the machine's speed now.
+    """
+    slack = slack or {}
+    baseline = load(name)
+    if baseline is None:
+        return False, [f"No baseline at {baseline_path(name)}, run with --save first"]
+    lines = []
+    if baseline['machine'] != machine():
+        lines.append(f"Warning: baseline was measured on {baseline['machine']}, this is {machine()}")
+    factor = 1.0
+    if speed_us and baseline.get('speed_us'):
+        factor = speed_us / baseline['speed_us']
+        lines.append(f"Machine speed: calibration took {speed_us:.1f} us against {baseline['speed_us']:.1f} us "
+                     f"for the baseline, so timings are compared at {factor:.2f}x")
+
+    per_case = all(isinstance(gated, dict) for gated in metrics.values())
+    passed = True
+    for case, values in results.items():
+        for metric, higher_is_better in (metrics.get(case, {}) if per_case else metrics).items():
+            if metric not in values:
+                continue
+            old = baseline['results'].get(case, {}).get(metric)
+            if old is None:
+                lines.append(f"  {case} {metric}: {values[metric]:.2f} (new)")
+                continue
+            if metric in timed:
+                old = old / factor if higher_is_better else old * factor
+            allowed = abs(old) * threshold + slack.get(metric, 0)
+            worse = (old - values[metric] if higher_is_better else values[metric] - old) > allowed
+            change = f" ({(values[metric] - old) / old:+.0%})" if old else ""
+            lines.append(f"  {case} {metric}: {old:.2f} -> {values[metric]:.2f}{change} "
+                         f"{'REGRESSED' if worse else 'ok'}")
+            if worse:
+                passed = False
+    return passed, lines
@@ -0,0 +1,334 @@
+import argparse
+import os
+import pickle
+import queue
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main
+from desync import CHECKSUM_INTERVAL
+from networking import HEADER, HOST_SLOT, NetworkManager
+import baseline
+
+TICK_RATE = 60  # Snapshots per second per side, as in a match
+SNAPSHOT_SECONDS = 5.0  # Length of the 60 Hz run
+BURST_MESSAGES = 2000  # Messages each side sends back-to-back in the burst run
+SETTLE_SECONDS = 0.5  # Wait for stragglers before counting losses
+SNAPSHOT_RUNS = 3  # Runs of each kind; every stat is the median over them, so one
+BURST_RUNS = 5  # disturbed run can't move the gate
+ENCODE_SAMPLES = 20000  # Messages timed for the encode/decode cost
+ENCODE_REPEATS = 5  # Passes over them; the fastest is kept
+# Per case, True when higher is better. Snapshots are paced at TICK_RATE, so their
+# throughput is fixed and only the burst's is gated; at that pace nothing may overflow
+# the game's buffer, while the burst outpaces it on purpose and its drops are only reported.
+# CPU per paced snapshot is mostly thread wake-ups, and the snapshots' p99 is the worst
+# handful of messages, so both are only reported
+GATED_METRICS = {
+    'codec': {'encode_us': False, 'decode_us': False},
+    'snapshot': {'latency_p95_ms': False, 'loss_percent': False, 'dropped_percent': False},
+    'burst': {'messages_per_second': True, 'latency_p95_ms': False, 'latency_p99_ms': False,
+              'loss_percent': False, 'cpu_us_per_message': False},
+}
+# Loopback latencies are fractions of a millisecond and the codec a microsecond or two,
+# so scheduler noise alone moves them by more than a share of themselves
+GATE_SLACK = {'latency_p95_ms': 0.5, 'latency_p99_ms': 0.5, 'encode_us': 1.0, 'decode_us': 1.0}
+
+class LatencyProxy:
+    """Forwards loopback TCP connections to a port, holding every chunk back by a delay.
+
+    Chunks are released in order, each delay_ms plus up to jitter_ms after it
+    arrived, so the game's stream sees a slow link without being reordered.
+    """
+    def __init__(self, target_port, delay_ms, jitter_ms=0.0):
+        self.target_port = target_port
+        self.delay = delay_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.running = True
+        self.sockets = []
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                downstream, addr = self.listener.accept()
+                upstream = socket.create_connection(('127.0.0.1', self.target_port))
+            except OSError:
+                break
+            for sock in (downstream, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.sockets.append(sock)
+            self._pipe(downstream, upstream)
+            self._pipe(upstream, downstream)
+
+    def _pipe(self, source, destination):
+        chunks = queue.Queue()
+        threading.Thread(target=self._read, args=(source, chunks), daemon=True).start()
+        threading.Thread(target=self._write, args=(destination, chunks), daemon=True).start()
+
+    def _read(self, source, chunks):
+        due = 0.0
+        while self.running:
+            try:
+                data = source.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                chunks.put((0.0, None))
+                return
+            # Never earlier than the chunk before it, so jitter can't reorder the stream
+            due = max(due, time.perf_counter() + self.delay + random.uniform(0, self.jitter))
+            chunks.put((due, data))
+
+    def _write(self, destination, chunks):
+        while True:
+            due, data = chunks.get()
+            if data is None:
+                break
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                destination.sendall(data)
+            except OSError:
+                break
+        try:
+            destination.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def close(self):
+        self.running = False
+        for sock in [self.listener] + self.sockets:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class Pair:
+    """A host and a client NetworkManager connected over loopback, optionally through a LatencyProxy"""
+    def __init__(self):
+        self.host = NetworkManager()
+        self.host.host = '127.0.0.1'
+        self.host.port = free_port()
+        self.client = NetworkManager()
+        self.proxy = None
+        self.fighters = {self.host: main.Player(400, 540), self.client: main.Player(1500, 540)}
+        self.received = {self.host: [], self.client: []}  # Latency of each message when it arrived, in ms
+        self.drained = {self.host: 0, self.client: 0}
+        for manager in (self.host, self.client):
+            self._watch(manager)
+
+    def _watch(self, manager):
+        # Stamp every message as the receive thread hands it to the game
+        store = manager._store
+        latencies = self.received[manager]
+        def timed_store(slot, data):
+            if isinstance(data, dict) and 'sent' in data:
+                latencies.append((time.perf_counter() - data['sent']) * 1000)
+            store(slot, data)
+        manager._store = timed_store
+
+    def connect(self, delay_ms=0.0, jitter_ms=0.0):
+        success, message = self.host.start_server()
+        if not success:
+            return False, message
+        port = self.host.port
+        if delay_ms or jitter_ms:
+            self.proxy = LatencyProxy(port, delay_ms, jitter_ms)
+            port = self.proxy.port
+        self.client.port = port
+        success, message = self.client.connect_to_server('127.0.0.1')
+        if not success:
+            return False, message
+        deadline = time.perf_counter() + 5.0
+        while not (self.host.client_connected and self.client.player_slot is not None):
+            if time.perf_counter() > deadline:
+                return False, "Timed out waiting for the welcome message"
+            time.sleep(0.01)
+        return True, "Connected"
+
+    def snapshot(self, manager, tick):
+        """The message a fighter sends on this tick, moving it along as a match would"""
+        fighter = self.fighters[manager]
+        fighter.x = 400 + (tick * 3) % 1100
+        fighter.direction = (tick // 20) % 8 * 45
+        fighter.is_attacking = tick % 60 < 20
+        fighter.attack_frame = tick % 60 if fighter.is_attacking else 0
+        data = main.prepare_player_data(fighter)
+        data['tick'] = tick
+        if tick % CHECKSUM_INTERVAL == 0:
+            data['checksum'] = (tick, random.getrandbits(64))
+        data['sent'] = time.perf_counter()
+        return data
+
+    def drain(self):
+        """Take buffered messages as the game does once per frame"""
+        for manager in (self.host, self.client):
+            for messages in manager.get_player_streams().values():
+                self.drained[manager] += len(messages)
+
+    def close(self):
+        for manager in (self.client, self.host):
+            manager.close()
+        if self.proxy is not None:
+            self.proxy.close()
+
+def codec_cost(samples=ENCODE_SAMPLES, repeats=ENCODE_REPEATS):
+    """Microseconds to encode and to decode one snapshot, and its size on the wire"""
+    pair = Pair()
+    messages = [pair.snapshot(pair.host, tick) for tick in range(samples)]
+    encode_us = decode_us = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frames = [NetworkManager._encode(HOST_SLOT, data) for data in messages]
+        elapsed = (time.perf_counter() - start) / samples * 1e6
+        encode_us = elapsed if encode_us is None else min(encode_us, elapsed)
+        start = time.perf_counter()
+        for frame in frames:
+            pickle.loads(frame[HEADER.size:])
+        elapsed = (time.perf_counter() - start) / samples * 1e6
+        decode_us = elapsed if decode_us is None else min(decode_us, elapsed)
+    return {'encode_us': round(encode_us, 3), 'decode_us': round(decode_us, 3),
+            'bytes_per_message': round(statistics.mean(len(frame) for frame in frames), 1)}
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+def run_traffic(pairs, burst):
+    """Drive every pair both ways, 60 Hz snapshots or a back-to-back burst; returns the stats"""
+    sent = 0
+    frame = 1 / TICK_RATE
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    if burst:
+        for tick in range(BURST_MESSAGES):
+            for pair in pairs:
+                for manager in (pair.host, pair.client):
+                    manager.send_data(pair.snapshot(manager, tick))
+                    sent += 1
+            if tick % 10 == 0:
+                for pair in pairs:
+                    pair.drain()
+    else:
+        ticks = int(SNAPSHOT_SECONDS * TICK_RATE)
+        for tick in range(ticks):
+            for pair in pairs:
+                for manager in (pair.host, pair.client):
+                    manager.send_data(pair.snapshot(manager, tick))
+                    sent += 1
+                pair.drain()
+            # Hold the tick rate like the game's clock
+            wait = start + (tick + 1) * frame - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+    # Wait for everything in flight to arrive
+    deadline = time.perf_counter() + SETTLE_SECONDS + 1.0
+    while sum(len(latencies) for pair in pairs for latencies in pair.received.values()) < sent:
+        if time.perf_counter() > deadline:
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    for pair in pairs:
+        pair.drain()
+
+    latencies = [latency for pair in pairs for received in pair.received.values() for latency in received]
+    received = len(latencies)
+    drained = sum(sum(pair.drained.values()) for pair in pairs)
+    stats = {
+        'sent': sent,
+        'received': received,
+        'loss_percent': round((sent - received) / sent * 100, 2),
+        'dropped_percent': round((received - drained) / sent * 100, 2),  # Overflowed the game's buffer
+        'messages_per_second': round(received / elapsed, 1),
+        'cpu_us_per_message': round(cpu / max(received, 1) * 1e6, 2),
+    }
+    if latencies:
+        stats.update({
+            'latency_p50_ms': round(percentile(latencies, 0.50), 3),
+            'latency_p95_ms': round(percentile(latencies, 0.95), 3),
+            'latency_p99_ms': round(percentile(latencies, 0.99), 3),
+            'latency_max_ms': round(max(latencies), 3),
+        })
+    for pair in pairs:
+        for received in pair.received.values():
+            received.clear()
+        pair.drained = dict.fromkeys(pair.drained, 0)
+    return stats
+
+def median_stats(runs):
+    """Each stat's median over several runs of run_traffic"""
+    return {metric: round(statistics.median(stats[metric] for stats in runs), 3)
+            for metric in runs[0] if all(metric in stats for stats in runs)}
+
+def benchmark(pair_count=1, delay_ms=0.0, jitter_ms=0.0):
+    """Codec cost plus snapshot and burst traffic over pair_count connections; returns {case: stats}"""
+    results = {'codec': codec_cost()}
+    pairs = []
+    try:
+        for _ in range(pair_count):
+            pair = Pair()
+            pairs.append(pair)
+            success, message = pair.connect(delay_ms, jitter_ms)
+            if not success:
+                raise RuntimeError(message)
+        results['snapshot'] = median_stats([run_traffic(pairs, burst=False) for _ in range(SNAPSHOT_RUNS)])
+        results['burst'] = median_stats([run_traffic(pairs, burst=True) for _ in range(BURST_RUNS)])
+    finally:
+        for pair in pairs:
+            pair.close()
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time NetworkManager traffic between host/client pairs over loopback")
+    parser.add_argument('--pairs', type=int, default=1, help="concurrent host/client pairs (default: %(default)s)")
+    parser.add_argument('--delay', type=float, default=0.0, help="one-way delay added by a proxy, in ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random one-way delay, up to this many ms")
+    parser.add_argument('--save', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="fail if worse than the baseline")
+    parser.add_argument('--threshold', type=float, default=baseline.DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    results = benchmark(args.pairs, args.delay, args.jitter)
+    for case, stats in results.items():
+        print(f"{case}:")
+        for metric, value in stats.items():
+            print(f"  {metric:<20} {value}")
+    if results['burst']['dropped_percent']:
+        print(f"Note: {results['burst']['dropped_percent']}% of burst messages overflowed the game's "
+              f"{NetworkManager().max_buffer_size}-message buffer between drains; the burst sends faster "
+              f"than a frame takes them, so this is expected and not gated")
+
+    # Baselines are kept per setup, since pairs and delay change every number
+    name = f"network_{args.pairs}pair"
+    if args.delay or args.jitter:
+        name += f"_{args.delay:g}ms_{args.jitter:g}jitter"
+    if args.save:
+        success, message = baseline.save(name, results)
+        print(message)
+    if args.compare:
+        passed, lines = baseline.compare(name, results, GATED_METRICS, args.threshold, GATE_SLACK)
+        print('\n'.join(lines))
+        print("Network benchmark passed" if passed else "Network benchmark regressed")
+        sys.exit(0 if passed else 1)
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# Headless: nothing is shown and no audio device is opened
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+import main
+from assets.background import ColiseumBackground
+from camera import Camera
+from sword_arc import DIRECTIONS
+import baseline
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080), '4k': (3840, 2160)}
+HEAVY_HIT_EFFECTS = 40  # Live effects of each kind in the heavy-load cases
+HEAVY_BLOOD_EFFECTS = 40
+HEAVY_DAMAGE_EFFECTS = 40
+RUNS = 5  # Fresh processes; blit speed depends on where surfaces land in memory, so the median is kept
+REPEATS = 10  # Timed batches per case; the fastest is kept as the least disturbed
+WARMUP_SECONDS = 0.2  # Untimed running first, so caches fill and the CPU settles
+BATCH_SECONDS = 0.05  # Rough length of each timed batch
+GATED_METRICS = {'us_per_call': False}  # Lower is better
+
+def warm_up(fn):
+    """Run fn untimed for a while so caches fill; returns calls per timed batch"""
+    # Counting calls sizes the batches so timer overhead doesn't matter
+    warmup_calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < WARMUP_SECONDS:
+        fn()
+        warmup_calls += 1
+    return max(1, int(warmup_calls * BATCH_SECONDS / WARMUP_SECONDS))
+
+def time_batch(fn, calls):
+    """Microseconds per call over one batch of calls"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def time_cases(cases, repeats=REPEATS):
+    """Microseconds per call of each case, from the fastest of several timed batches.
+
+    The batches go round the cases in turn rather than one case at a time,
+    so each case is sampled across the whole run and a stretch of the
+    machine being busy slows every case a little instead of one a lot.
+    """
+    sizes = {case: warm_up(call) for case, call in cases.items()}
+    best = {}
+    for _ in range(repeats):
+        for case, call in cases.items():
+            us = time_batch(call, sizes[case])
+            best[case] = min(us, best.get(case, us))
+    return best
+
+def cycle(fn, items):
+    """A call that runs fn on the next item each time, round and round"""
+    state = {'index': 0}
+    def call():
+        fn(items[state['index']])
+        state['index'] = (state['index'] + 1) % len(items)
+    return call
+
+def effect_pool(make, count, draw):
+    """A call that updates count live effects, replacing each as it expires, then draws them with draw(effects)"""
+    effects = [make() for _ in range(count)]
+    def call():
+        for i, effect in enumerate(effects):
+            if not effect.update():
+                effects[i] = make()
+        draw(effects)
+    return call
+
+def draw_each(effects):
+    for effect in effects:
+        effect.draw(main.screen)
+
+def draw_batched(effects):
+    main.draw_particle_effects(main.screen, [effects])
+
+def setup_resolution(size):
+    """Point the game's screen, camera and background at a screen of this size.
+
+    The arena stays the game's fixed size; the camera's render scale maps it
+    onto the screen, as the renderer does when the render size changes.
+    """
+    main.screen = pygame.Surface(size).convert()
+    main.camera = Camera(main.width, main.height)
+    main.camera.set_scale(size[0] / main.width)
+    main.background = ColiseumBackground(main.width, main.height, main.camera)
+    main.fighter_sprites.clear()
+    main.fighter_sprites.set_scale(main.camera.magnification)
+
+def render_cases():
+    """{case: call} for every draw hot path at the current resolution"""
+    screen = main.screen
+    background = main.background
+    center_x, center_y = main.width // 2, main.height // 2
+    cases = {
+        'background.update': background.update,
+        'background.draw': lambda: background.draw(screen),
+    }
+
+    # Every direction, guard and attack frame, in turn
+    player = main.Player(center_x, center_y)
+    poses = [(direction, frame, guarding) for direction in DIRECTIONS for guarding in (False, True)
+             for frame in range(-1, player.attack_duration + 1)]
+    def draw_pose(pose):
+        player.direction, frame, player.is_guarding = pose
+        player.is_attacking = frame >= 0
+        player.attack_frame = max(frame, 0)
+        player.swing_effects = []
+        player.draw(screen)
+    cases['player.draw'] = cycle(draw_pose, poses)
+
+    # A bar draining from full, as after a hit
+    bar_player = main.Player(center_x, center_y)
+    def draw_bar(health):
+        bar_player.health = health
+        bar_player.draw_health_bar(screen, 20, 20)
+    cases['player.draw_health_bar'] = cycle(draw_bar, list(range(bar_player.health, -1, -1)))
+
+    cases['hit_effects.heavy'] = effect_pool(lambda: main.HitEffect(center_x, center_y), HEAVY_HIT_EFFECTS,
+                                             draw_batched)
+    cases['blood_effects.heavy'] = effect_pool(lambda: main.BloodEffect(center_x, center_y, 0),
+                                               HEAVY_BLOOD_EFFECTS, draw_batched)
+    cases['damage_effects.heavy'] = effect_pool(lambda: main.DamageEffect(center_x, center_y, 20),
+                                                HEAVY_DAMAGE_EFFECTS, draw_each)
+
+    clash = main.ClashBattle(main.Player(0, 0), main.Player(0, 0), main.width, main.height)
+    cases['clash_battle.draw'] = lambda: clash.draw(screen)
+    return cases
+
+def run_cases(resolutions):
+    """Time every case at every resolution in this process.
+
+    Returns ({case@resolution: us per call}, us per baseline.calibration_work),
+    the calibration timed in turn with the cases so it sees the same machine.
+    """
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    results = {}
+    speed_us = None
+    for label, size in resolutions.items():
+        setup_resolution(size)
+        # Effects scatter their particles at random; the same seed gives every run the same work
+        random.seed(0)
+        cases = render_cases()
+        cases['calibration'] = baseline.calibration_work
+        for case, us in time_cases(cases).items():
+            if case == 'calibration':
+                speed_us = us if speed_us is None else min(speed_us, us)
+            else:
+                results[f"{case}@{label}"] = us
+    pygame.quit()
+    return results, speed_us
+
+def benchmark(resolutions=RESOLUTIONS, runs=RUNS):
+    """Median time of every case over several fresh processes.
+
+    Returns ({case: {metric: value}}, median calibration time in us).
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--child']
+    for label in resolutions:
+        command += ['--resolution', label]
+    times = {}
+    speeds = []
+    for _ in range(runs):
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        child_results, speed_us = json.loads(result.stdout.strip().splitlines()[-1])
+        for case, us in child_results.items():
+            times.setdefault(case, []).append(us)
+        speeds.append(speed_us)
+    medians = {case: statistics.median(values) for case, values in times.items()}
+    results = {case: {'us_per_call': round(us, 2), 'fps_equivalent': round(1e6 / us, 1)}
+               for case, us in medians.items()}
+    return results, round(statistics.median(speeds), 2)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time the game's draw hot paths without a window")
+    parser.add_argument('--resolution', choices=RESOLUTIONS, action='append',
+                        help="only these resolutions (default: all)")
+    parser.add_argument('--runs', type=int, default=RUNS, help="fresh processes to take the median of")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--save', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="fail if slower than the baseline")
+    parser.add_argument('--threshold', type=float, default=baseline.DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    resolutions = {label: RESOLUTIONS[label] for label in args.resolution} if args.resolution else RESOLUTIONS
+    if args.child:
+        print(json.dumps(run_cases(resolutions)))
+        sys.exit()
+    results, speed_us = benchmark(resolutions, args.runs)
+    for case, values in results.items():
+        print(f"{case:<36} {values['us_per_call']:10.1f} us {values['fps_equivalent']:12.1f} /s")
+
+    if args.save:
+        success, message = baseline.save('rendering', results, speed_us)
+        print(message)
+    if args.compare:
+        passed, lines = baseline.compare('rendering', results, GATED_METRICS, args.threshold,
+                                         speed_us=speed_us, timed=GATED_METRICS)
+        print('\n'.join(lines))
+        print("Render benchmark passed" if passed else "Render benchmark regressed")
+        sys.exit(0 if passed else 1)
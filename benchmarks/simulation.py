@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+import main
+import baseline
+
+# Keys in a recorded input stream, one bit each in this order
+CONTROL_KEYS = [pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d, pygame.K_SPACE, pygame.K_g]
+# The duel plays by the match's rules, with clash battles and rounds to the death; the arena is
+# endless, its fighters never dying or stopping for a clash battle, so all of them keep fighting
+SCENARIOS = {
+    'duel': {'fighters': 2, 'ticks': 20000, 'endless': False},
+    'arena': {'fighters': main.ARENA_MAX_PLAYERS, 'ticks': 4000, 'endless': True},
+}
+CLASH_TICKS = 36000  # Ticks of back-to-back clash mini-games
+CLASH_CLOSE_TICKS = 60  # The game's one-second timer between a clash battle ending and play resuming
+HOLD_TICKS = (3, 12)  # Generated inputs are held this long, like a player's keys
+CLOSE_RANGE = 80  # Generated fighters fight rather than close in within this distance
+ATTACK_CHANCE = 0.6  # Chance a fighter in range swings, else it may guard or sidestep
+GUARD_CHANCE = 0.2
+MASH_CHANCE = 0.5  # Chance a generated fighter in a clash battle holds its mash key
+RUNS = 5  # Fresh processes; speed varies between processes, so the median is kept
+REPEATS = 5  # Timed replays per scenario in each process; the median is kept
+CALIBRATION_CALLS = 200  # baseline.calibration_work calls timed before each replay
+SEED = 1
+GATED_METRICS = {'ticks_per_second': True, 'alloc_kb_per_tick': False}
+TIMED_METRICS = ('ticks_per_second',)  # Gated metrics that follow the machine's speed
+
+class Match:
+    """Headless fighters played the way MatchScene plays them: a clash battle
+    starts when resolve_hits reports one and holds up play until it closes,
+    and a new round starts as soon as one fighter or none is left standing"""
+    def __init__(self, count, endless=False):
+        self.count = count
+        self.endless = endless
+        self.tick = 0
+        self.clash = None
+        self.close_ticks = 0
+        self.mashing = [False] * count
+        self.rounds = 0
+        self.clashes = 0
+        self.new_round()
+    
+    def new_round(self):
+        self.fighters = fresh_fighters(self.count, self.endless)
+        self.clash = None
+    
+    def step(self, controls):
+        """Advance one tick; controls maps fighter index to a control dictionary"""
+        self.tick += 1
+        # Each new press of the attack key is a mash press, like the game's key-down events
+        presses = []
+        for i in range(self.count):
+            held = controls[i][pygame.K_SPACE]
+            presses.append(held and not self.mashing[i])
+            self.mashing[i] = held
+        
+        clash = self.clash
+        if clash is not None and clash.active:
+            for side, player in ((1, clash.player1), (2, clash.player2)):
+                clash.add_presses(side, self.tick, int(presses[self.fighters.index(player)]))
+            clash.update(self.tick)
+            if clash.battle_ended:
+                self.close_ticks += 1
+                if self.close_ticks >= CLASH_CLOSE_TICKS:
+                    clash.active = False
+            return
+        
+        pair = main.simulate_step(self.fighters, controls)
+        if pair:
+            self.clash = main.ClashBattle(pair[0], pair[1], main.width, main.height)
+            self.clash.start_tick = self.tick
+            self.close_ticks = 0
+            self.clashes += 1
+        if sum(1 for fighter in self.fighters if not fighter.is_dead) <= 1:
+            self.rounds += 1
+            self.new_round()
+
+def pick_mask(fighter, fighters, rng):
+    """Controls for a generated fighter: close in on the nearest opponent, then swing, guard or sidestep"""
+    opponents = [other for other in fighters if other is not fighter and not other.is_dead]
+    if not opponents:
+        return 0
+    target = min(opponents, key=lambda other: (other.x - fighter.x) ** 2 + (other.y - fighter.y) ** 2)
+    dx = target.x - fighter.x
+    dy = target.y - fighter.y
+    mask = 0
+    if dx * dx + dy * dy < CLOSE_RANGE * CLOSE_RANGE:
+        roll = rng.random()
+        if roll < ATTACK_CHANCE:
+            mask |= 1 << 4
+        elif roll < ATTACK_CHANCE + GUARD_CHANCE:
+            mask |= 1 << 5
+        else:
+            mask |= 1 << rng.randrange(4)
+    else:
+        # W, S, A, D toward the target, ignoring axes it is nearly lined up on
+        if dy < -20:
+            mask |= 1 << 0
+        elif dy > 20:
+            mask |= 1 << 1
+        if dx < -20:
+            mask |= 1 << 2
+        elif dx > 20:
+            mask |= 1 << 3
+    return mask
+
+def generate_inputs(fighters, ticks, endless=False, seed=SEED):
+    """A recorded input stream: per tick, one control bitmask per fighter.
+
+    Fighters are played by a simple seeded policy while the simulation runs,
+    so the stream holds real fights; replaying it gives the same fights again.
+    """
+    rng = random.Random(seed)
+    match = Match(fighters, endless)
+    masks = [0] * fighters
+    held = [0] * fighters
+    stream = []
+    for _ in range(ticks):
+        clash = match.clash if match.clash is not None and match.clash.active else None
+        for i, player in enumerate(match.fighters):
+            if clash is not None:
+                # Mash: tap the attack key on and off
+                masks[i] = 1 << 4 if rng.random() < MASH_CHANCE else 0
+            elif held[i] <= 0 and not player.is_dead:
+                masks[i] = pick_mask(player, match.fighters, rng)
+                held[i] = rng.randint(*HOLD_TICKS)
+            held[i] -= 1
+        stream.append(list(masks))
+        match.step(control_frames([masks])[0])
+    return stream
+
+def load_inputs(path):
+    """An input stream saved by save_inputs: {"fighters": n, "ticks": [[mask, ...], ...]}"""
+    with open(path) as f:
+        return json.load(f)['ticks']
+
+def save_inputs(path, ticks):
+    with open(path, 'w') as f:
+        json.dump({'fighters': len(ticks[0]), 'keys': [pygame.key.name(key) for key in CONTROL_KEYS],
+                   'ticks': ticks}, f)
+
+def control_frames(ticks):
+    """Per tick, {fighter index: control dictionary}, as simulate_step takes them"""
+    dicts = {}
+    frames = []
+    for masks in ticks:
+        frame = {}
+        for i, mask in enumerate(masks):
+            controls = dicts.get(mask)
+            if controls is None:
+                controls = {key: bool(mask >> bit & 1) for bit, key in enumerate(CONTROL_KEYS)}
+                dicts[mask] = controls
+            frame[i] = controls
+        frames.append(frame)
+    return frames
+
+def fresh_fighters(count, endless=False):
+    """Headless fighters at their spawn points; endless ones never die or start a clash battle,
+    so the load stays the same"""
+    fighters = main.copy_fighters(main.create_players(count), lookahead=endless)
+    if endless:
+        for fighter in fighters:
+            fighter.health = 10 ** 9
+    return fighters
+
+def replay(frames, count, endless=False, on_tick=None):
+    """Play a fresh match through every frame, calling on_tick after each; returns the match"""
+    match = Match(count, endless)
+    for controls in frames:
+        match.step(controls)
+        if on_tick is not None:
+            on_tick()
+    return match
+
+def generate_clash_presses(ticks, seed=SEED):
+    """Mash presses per tick for each side of a clash"""
+    rng = random.Random(seed)
+    return [(int(rng.random() < 0.4), int(rng.random() < 0.4)) for _ in range(ticks)]
+
+def run_clashes(presses, on_tick=None):
+    """Back-to-back clashes: side 1 mashes locally, side 2's presses arrive in network batches"""
+    fighters = fresh_fighters(2, endless=True)
+    clash = None
+    batch = []
+    for tick, (local, remote) in enumerate(presses):
+        if clash is None or clash.battle_ended:
+            clash = main.ClashBattle(fighters[0], fighters[1], main.width, main.height)
+            batch = []
+        clash.add_presses(1, tick, local)
+        if remote:
+            batch.append((2, tick, remote))
+        if tick % main.CLASH_BATCH_TICKS == 0:
+            clash.receive({'clash_presses': batch})
+            batch = []
+        clash.update(tick)
+        if on_tick is not None:
+            on_tick()
+    return fighters
+
+def time_runs(runs, repeats=REPEATS):
+    """Seconds per run of each case, the median of several timed runs, and us per
+    baseline.calibration_work, the median of a batch timed before each run.
+
+    The runs go round the cases in turn rather than one case at a time, so a
+    stretch of the machine being busy slows every case a little instead of
+    one a lot, and the calibration batches sample it through the same stretch.
+    """
+    times = {}
+    speeds = []
+    for _ in range(repeats):
+        for case, run in runs.items():
+            start = time.perf_counter()
+            for _ in range(CALIBRATION_CALLS):
+                baseline.calibration_work()
+            speeds.append((time.perf_counter() - start) / CALIBRATION_CALLS * 1e6)
+            start = time.perf_counter()
+            run()
+            times.setdefault(case, []).append(time.perf_counter() - start)
+    return {case: statistics.median(elapsed) for case, elapsed in times.items()}, statistics.median(speeds)
+
+def measure_memory(run, ticks):
+    """Memory per tick from one traced run, which is separate since tracing slows everything down.
+
+    CPython keeps no count of allocations, so each tick's allocations are
+    measured as how far traced memory rose above where the tick started:
+    temporaries freed within the tick still show up, while memory reused
+    from the tick before doesn't.
+    """
+    trace = {'allocated': 0, 'peak': 0}
+    def on_tick():
+        current, peak = tracemalloc.get_traced_memory()
+        trace['allocated'] += peak - trace['last']
+        trace['peak'] = max(trace['peak'], peak)
+        trace['last'] = current
+        tracemalloc.reset_peak()
+    tracemalloc.start()
+    start_memory, _ = tracemalloc.get_traced_memory()
+    trace['last'] = start_memory
+    outcome = run(on_tick)
+    end_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = {
+        'alloc_kb_per_tick': round(trace['allocated'] / ticks / 1024, 3),
+        'retained_kb': round((end_memory - start_memory) / 1024, 1),
+        'peak_memory_kb': round(trace['peak'] / 1024, 1),
+    }
+    if isinstance(outcome, Match):
+        stats['rounds'] = outcome.rounds
+        stats['clash_battles'] = outcome.clashes
+    return stats
+
+def run_scenarios(inputs=None):
+    """Replay input streams through the simulation in this process.
+
+    Returns ({scenario: stats}, us per baseline.calibration_work).
+    """
+    runs = {}
+    ticks = {}
+    for name, scenario in SCENARIOS.items():
+        stream = inputs if inputs is not None and len(inputs[0]) == scenario['fighters'] else \
+            generate_inputs(scenario['fighters'], scenario['ticks'], scenario['endless'])
+        frames = control_frames(stream)
+        runs[name] = lambda on_tick=None, frames=frames, scenario=scenario: \
+            replay(frames, scenario['fighters'], scenario['endless'], on_tick)
+        ticks[name] = len(frames)
+    presses = generate_clash_presses(CLASH_TICKS)
+    runs['clash'] = lambda on_tick=None: run_clashes(presses, on_tick)
+    ticks['clash'] = len(presses)
+
+    times, speed_us = time_runs(runs)
+    results = {}
+    for name, run in runs.items():
+        results[name] = {
+            'ticks': ticks[name],
+            'ticks_per_second': round(ticks[name] / times[name], 1),
+            'us_per_tick': round(times[name] / ticks[name] * 1e6, 2),
+        }
+        results[name].update(measure_memory(run, ticks[name]))
+    return results, speed_us
+
+def benchmark(inputs_path=None, runs=RUNS):
+    """Median of every scenario's results over several fresh processes.
+
+    Returns ({scenario: stats}, median calibration time in us).
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--child']
+    if inputs_path:
+        command += ['--inputs', inputs_path]
+    runs_stats = {}
+    speeds = []
+    for _ in range(runs):
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        child_results, speed_us = json.loads(result.stdout.strip().splitlines()[-1])
+        for name, stats in child_results.items():
+            runs_stats.setdefault(name, []).append(stats)
+        speeds.append(speed_us)
+    results = {name: {metric: statistics.median(stats[metric] for stats in all_stats) for metric in all_stats[0]}
+               for name, all_stats in runs_stats.items()}
+    return results, round(statistics.median(speeds), 2)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time the combat simulation without rendering")
+    parser.add_argument('--inputs', help="replay this input stream in the scenario with its number of fighters")
+    parser.add_argument('--save-inputs', metavar='PATH', help="write the generated duel input stream here")
+    parser.add_argument('--runs', type=int, default=RUNS, help="fresh processes to take the median of")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--save', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="fail if slower than the baseline")
+    parser.add_argument('--threshold', type=float, default=baseline.DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.save_inputs:
+        duel = SCENARIOS['duel']
+        save_inputs(args.save_inputs, generate_inputs(duel['fighters'], duel['ticks'], duel['endless']))
+        print(f"Saved input stream to {args.save_inputs}")
+    if args.child:
+        print(json.dumps(run_scenarios(load_inputs(args.inputs) if args.inputs else None)))
+        sys.exit()
+    results, speed_us = benchmark(args.inputs, args.runs)
+    for name, stats in results.items():
+        print(f"{name}:")
+        for metric, value in stats.items():
+            print(f"  {metric:<18} {value}")
+
+    if args.save:
+        success, message = baseline.save('simulation', results, speed_us)
+        print(message)
+    if args.compare:
+        passed, lines = baseline.compare('simulation', results, GATED_METRICS, args.threshold,
+                                         speed_us=speed_us, timed=TIMED_METRICS)
+        print('\n'.join(lines))
+        print("Simulation benchmark passed" if passed else "Simulation benchmark regressed")
+        sys.exit(0 if passed else 1)
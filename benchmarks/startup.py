@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5  # Fresh game processes timed per benchmark
+TIMEOUT = 60  # Seconds before a run that never reaches the menu is given up on
+PHASES = {'import': 'import_ms', 'window': 'window_ms', 'menu': 'menu_ms', 'process': 'process_ms'}
+GATED_METRICS = {'median_ms': False}  # Lower is better; the median shrugs off one slow launch
+
+def child():
+    """Time one launch of the game in this process and print the timings as JSON"""
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import main
+    import pygame
+    timings = {'import_ms': (time.perf_counter() - start) * 1000}
+
+    # Time-to-window: init_display returns once the window is open
+    init_display = main.init_display
+    def timed_init_display():
+        init_display()
+        timings['window_ms'] = (time.perf_counter() - start) * 1000
+    main.init_display = timed_init_display
+
+    # Time-to-interactive-menu: the loading screen hands over to the menu, then we quit
+    change_scene = main.change_scene
+    def timed_change_scene(new_scene):
+        change_scene(new_scene)
+        if new_scene is main.menu_scene:
+            timings['menu_ms'] = (time.perf_counter() - start) * 1000
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+    main.change_scene = timed_change_scene
+
+    main.main()
+    print(json.dumps(timings))
+
+def run_once(env):
+    """Launch one fresh game process; returns its timings"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=TIMEOUT)
+    process_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Game process failed:\n{result.stdout}{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_ms'] = process_ms
+    return timings
+
+def benchmark(runs=RUNS, headless=True):
+    """Launch the game runs times; returns {phase: {'min_ms': ..., 'median_ms': ..., 'max_ms': ...}}"""
+    env = dict(os.environ)
+    if headless:
+        env.setdefault('SDL_VIDEODRIVER', 'dummy')
+        env.setdefault('SDL_AUDIODRIVER', 'dummy')
+    env['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    samples = [run_once(env) for _ in range(runs)]
+    results = {}
+    for phase, metric in PHASES.items():
+        values = [sample[metric] for sample in samples]
+        results[phase] = {'min_ms': round(min(values), 1), 'median_ms': round(statistics.median(values), 1),
+                          'max_ms': round(max(values), 1)}
+    return results
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        child()
+        sys.exit()
+
+    # Only the parent compares results; baseline imports pygame, which the child must time itself
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    import baseline
+
+    parser = argparse.ArgumentParser(description="Time the game's launch up to the main menu")
+    parser.add_argument('runs', nargs='?', type=int, default=RUNS,
+                        help="fresh game processes to time (default: %(default)s)")
+    parser.add_argument('--window', action='store_true',
+                        help="open a real window instead of the dummy video and audio drivers")
+    parser.add_argument('--save', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="fail if slower than the baseline")
+    parser.add_argument('--threshold', type=float, default=baseline.DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    results = benchmark(args.runs, headless=not args.window)
+    print(f"Startup over {args.runs} runs (min / median / max):")
+    for phase, values in results.items():
+        print(f"  {phase:<8} {values['min_ms']:8.1f} {values['median_ms']:8.1f} {values['max_ms']:8.1f} ms")
+
+    # Windowed launches take longer than headless ones, so they keep their own baseline
+    name = 'startup_window' if args.window else 'startup'
+    if args.save:
+        success, message = baseline.save(name, results)
+        print(message)
+    if args.compare:
+        passed, lines = baseline.compare(name, results, GATED_METRICS, args.threshold)
+        print('\n'.join(lines))
+        print("Startup benchmark passed" if passed else "Startup benchmark regressed")
+        sys.exit(0 if passed else 1)
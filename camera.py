@@ -0,0 +1,82 @@
+import pygame
+
+ZOOM_STEP = 0.125  # Zoom snaps to these steps so each level's background is scaled only once
+
+class Camera:
+    """Maps arena coordinates to the surface the world is drawn on.
+
+    That surface is the arena at the render scale, magnified around a focus
+    point while zoomed in. The focus is held back from the edges so the view
+    never leaves the arena. At zoom 1 and render scale 1 every
+    method hands coordinates and sprites back untouched, so the normal game
+    pays nothing for it.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.focus_x = width / 2
+        self.focus_y = height / 2
+        self.zoom = 1.0
+        self.scale = 1.0  # Render scale: world surface pixels per arena unit at zoom 1
+
+    @property
+    def untransformed(self):
+        """True when arena coordinates are world surface coordinates"""
+        return self.zoom == 1 and self.scale == 1
+
+    @property
+    def magnification(self):
+        """World surface pixels per arena unit"""
+        return self.zoom * self.scale
+
+    @property
+    def render_size(self):
+        """Size of the surface the world is drawn on"""
+        return round(self.width * self.scale), round(self.height * self.scale)
+
+    def set_zoom(self, zoom):
+        """Snap to the nearest zoom step; returns True when the view changed"""
+        zoom = max(1.0, round(zoom / ZOOM_STEP) * ZOOM_STEP)
+        if zoom == self.zoom:
+            return False
+        self.zoom = zoom
+        return True
+
+    def set_scale(self, scale):
+        self.scale = scale
+
+    def set_focus(self, x, y):
+        """Pivot the zoom on arena (x, y)"""
+        self.focus_x = x
+        self.focus_y = y
+
+    def origin(self, zoom=None):
+        """Arena position of the world surface's top-left corner"""
+        zoom = self.zoom if zoom is None else zoom
+        half_width = self.width / (2 * zoom)
+        half_height = self.height / (2 * zoom)
+        # Near an edge the view stops at the arena's border rather than centering on the focus
+        x = min(max(self.focus_x, half_width), self.width - half_width)
+        y = min(max(self.focus_y, half_height), self.height - half_height)
+        return x - half_width, y - half_height
+
+    def to_screen(self, x, y):
+        if self.untransformed:
+            return x, y
+        left, top = self.origin()
+        magnification = self.zoom * self.scale
+        return (x - left) * magnification, (y - top) * magnification
+
+    def visible_rect(self, zoom=None):
+        """The arena rect the camera shows, at its zoom or another"""
+        zoom = self.zoom if zoom is None else zoom
+        left, top = self.origin(zoom)
+        return pygame.Rect(round(left), round(top), round(self.width / zoom), round(self.height / zoom))
+
+    def blit(self, screen, sprite, x, y, offset=(0, 0)):
+        """Blit a sprite already scaled to the magnification, its top-left offset
+        pixels from arena (x, y); returns the rect drawn"""
+        if self.untransformed:
+            return screen.blit(sprite, (x + offset[0], y + offset[1]))
+        screen_x, screen_y = self.to_screen(x, y)
+        return screen.blit(sprite, (round(screen_x) + offset[0], round(screen_y) + offset[1]))
@@ -0,0 +1,169 @@
+import json
+import os
+import struct
+import zlib
+
+CHECKSUM_INTERVAL = 30  # Ticks between checksums sent to peers
+CHECKSUM_WINDOW = 6  # Peers are not in lockstep, so match against nearby ticks
+DESYNC_CONFIRMATIONS = 2  # Consecutive mismatches before we call it a desync
+HISTORY_TICKS = 240  # Ticks of local state kept for comparisons and dumps
+DUMP_FRAMES = 30  # Ticks either side of the desync written to the dump
+
+def canonical_state(players, clash_battle):
+    """Gameplay state both peers must agree on.
+
+    Positions are left out on purpose: they are streamed continuously and
+    always lag by the network latency, while health, deaths, clash counts
+    and the clash mini-game should settle to the same values everywhere.
+    Clash powers only settle once the host has decided the result, so a
+    clash still being fought is compared by who is in it.
+    """
+    fighters = tuple((int(p.health), int(p.is_dead), p.clash_count) for p in players)
+    clash = None
+    if clash_battle and clash_battle.active:
+        clash = (players.index(clash_battle.player1), players.index(clash_battle.player2), -1, -1, -1, 0)
+        if clash_battle.battle_ended:
+            clash = clash[:2] + (int(clash_battle.player1.clash_power), int(clash_battle.player2.clash_power),
+                                 clash_battle.duration, 1)
+    return fighters, clash
+
+def state_checksum(state):
+    """CRC32 over the packed canonical state"""
+    fighters, clash = state
+    values = [value for fighter in fighters for value in fighter]
+    values.extend(clash if clash is not None else (-1,))
+    return zlib.crc32(struct.pack(f"!{len(values)}i", *values))
+
+class DesyncDetector:
+    """Exchanges periodic state checksums with peers and reports divergence.
+
+    The local side records a checksum every tick. Every CHECKSUM_INTERVAL
+    ticks it sends one to its peers, and checks each peer checksum against
+    its own history. On a confirmed mismatch both sides dump their recent
+    frames, and the host can broadcast its state to resync everyone.
+    """
+    def __init__(self, fighter, is_host, auto_resync=True, dump_dir="desync_dumps"):
+        self.fighter = fighter  # Index of our fighter, as every peer numbers them
+        self.is_host = is_host
+        self.auto_resync = auto_resync
+        self.dump_dir = dump_dir
+        self.history = {}
+        self.oldest_tick = 0  # Everything before this has been pruned from history
+        self.tick = 0
+        self.remote_checks = []
+        self.mismatches = {}
+        self.dumped_ticks = set()
+        self.outgoing_fields = {}
+
+    def record(self, tick, players, clash_battle):
+        """Checksum this tick's state and check any peer checksums that are due"""
+        self.tick = tick
+        state = canonical_state(players, clash_battle)
+        checksum = state_checksum(state)
+        self.history[tick] = (checksum, state)
+        self._prune(tick - HISTORY_TICKS)
+
+        if tick % CHECKSUM_INTERVAL == 0:
+            self.outgoing_fields['checksum'] = (tick, checksum)
+
+        # Peer checksums can only be judged once our window around them is complete
+        due = [check for check in self.remote_checks if check[1] + CHECKSUM_WINDOW <= tick]
+        if due:
+            self.remote_checks = [check for check in self.remote_checks if check[1] + CHECKSUM_WINDOW > tick]
+            for fighter, remote_tick, remote_checksum in due:
+                self._compare(fighter, remote_tick, remote_checksum)
+
+    def _prune(self, cutoff):
+        """Forget history and dumps from before cutoff.
+
+        A client's tick jumps forward when it catches up with the host, so
+        every tick skipped over has to go, not just the one that fell out.
+        """
+        if cutoff <= self.oldest_tick:
+            return
+        if cutoff - self.oldest_tick > len(self.history):
+            self.history = {tick: entry for tick, entry in self.history.items() if tick >= cutoff}
+        else:
+            for tick in range(self.oldest_tick, cutoff):
+                self.history.pop(tick, None)
+        self.oldest_tick = cutoff
+        if self.dumped_ticks:
+            self.dumped_ticks = {tick for tick in self.dumped_ticks if tick >= cutoff}
+
+    def outgoing(self):
+        """Extra fields to attach to our next snapshot, cleared once taken"""
+        fields = self.outgoing_fields
+        self.outgoing_fields = {}
+        return fields
+
+    def receive(self, fighter, message):
+        """Handle desync fields in a snapshot from the peer playing fighter; returns a resync state to apply, if any"""
+        if 'checksum' in message:
+            remote_tick, remote_checksum = message['checksum']
+            self.remote_checks.append((fighter, remote_tick, remote_checksum))
+
+        if 'desync' in message:
+            # A peer saw us diverge: keep our side of the story too
+            self.dump(message['desync'], fighter, None)
+            if self.is_host and self.auto_resync:
+                self._queue_resync()
+
+        if 'resync' in message and not self.is_host:
+            self.mismatches.clear()
+            return message['resync']
+        return None
+
+    def _compare(self, fighter, remote_tick, remote_checksum):
+        for tick in range(remote_tick - CHECKSUM_WINDOW, remote_tick + CHECKSUM_WINDOW + 1):
+            entry = self.history.get(tick)
+            if entry and entry[0] == remote_checksum:
+                self.mismatches.pop(fighter, None)
+                return
+
+        # Ignore checksums from before our own history started
+        if remote_tick - CHECKSUM_WINDOW < min(self.history, default=remote_tick):
+            return
+
+        self.mismatches[fighter] = self.mismatches.get(fighter, 0) + 1
+        if self.mismatches[fighter] < DESYNC_CONFIRMATIONS:
+            return
+
+        print(f"Desync with player {fighter + 1} detected at tick {remote_tick}")
+        self.mismatches.pop(fighter, None)
+        self.dump(remote_tick, fighter, remote_checksum)
+        self.outgoing_fields['desync'] = remote_tick
+        if self.is_host and self.auto_resync:
+            self._queue_resync()
+
+    def _queue_resync(self):
+        """Host only: send our canonical state for every peer to adopt"""
+        latest = self.history.get(self.tick)
+        if latest:
+            fighters, clash = latest[1]
+            self.outgoing_fields['resync'] = {'tick': self.tick, 'fighters': fighters, 'clash': clash}
+
+    def dump(self, tick, fighter, remote_checksum):
+        """Write our frames around a diverging tick to a JSON file for debugging"""
+        if tick in self.dumped_ticks:
+            return None
+        self.dumped_ticks.add(tick)
+
+        frames = []
+        for frame_tick in range(tick - DUMP_FRAMES, tick + DUMP_FRAMES + 1):
+            entry = self.history.get(frame_tick)
+            if entry:
+                checksum, (fighters, clash) = entry
+                frames.append({'tick': frame_tick, 'checksum': checksum,
+                               'fighters': fighters, 'clash': clash})
+
+        path = os.path.join(self.dump_dir, f"desync_t{tick}_p{self.fighter + 1}.json")
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({'tick': tick, 'local_player': self.fighter + 1, 'peer_player': fighter + 1,
+                           'peer_checksum': remote_checksum, 'frames': frames}, f, indent=2)
+            print(f"Desync frames written to {path}")
+            return path
+        except OSError as e:
+            print(f"Error writing desync dump: {str(e)}")
+            return None
@@ -0,0 +1,137 @@
+import pygame
+from text_cache import render_text
+
+# Health bar dimensions
+BAR_WIDTH = 200
+BAR_HEIGHT = 25
+BORDER_WIDTH = 4
+FRAME = BORDER_WIDTH + 2  # Outer border around the bar itself
+NUM_SEGMENTS = 10
+
+# Colors
+BORDER_COLOR = (101, 67, 33)
+BG_COLOR = (80, 0, 0)
+HEALTH_COLORS = [
+    (200, 0, 0),
+    (200, 150, 0),
+    (0, 200, 0)
+]
+DRAIN_COLOR = (230, 190, 150)  # Health just lost, shrinking away
+DRAIN_SPEED = 3  # Least health points the drain slice loses per frame
+DRAIN_RATE = 0.1  # Share of the remaining slice lost per frame, so big hits drain quickly too
+
+class HealthBar:
+    """One fighter's health bar, composed into a cached surface.
+
+    The bar is only redrawn when the health it shows changes. Recently lost
+    health drains away as a pale slice drawn over just that part of the bar.
+    """
+    def __init__(self, max_health=500):
+        self.max_health = max_health
+        self.surface = None
+        self.health = None
+        self.shine = None
+        self.drain_health = None
+        self.text = None  # Health text and where it sits on the bar surface
+
+    def width_for(self, health):
+        return BAR_WIDTH * max(0, health) / self.max_health
+
+    def draw(self, screen, x, y, health, shine=True):
+        """Blit the bar with its top-left at (x, y); returns the screen rects drawn"""
+        health = int(health)
+        if health != self.health or shine != self.shine:
+            self.surface = self._compose(health, shine)
+            self.shine = shine
+            if self.drain_health is None or health > self.drain_health:
+                self.drain_health = health
+            self.health = health
+        dirty = [screen.blit(self.surface, (x - FRAME, y - FRAME))]
+
+        if self.drain_health > health:
+            drop = max(DRAIN_SPEED, (self.drain_health - health) * DRAIN_RATE)
+            self.drain_health = max(health, self.drain_health - drop)
+            self._draw_drain(screen, x, y, health)
+        return dirty
+
+    def _draw_drain(self, screen, x, y, health):
+        left = self.width_for(health)
+        right = self.width_for(self.drain_health)
+        if right - left < 1:
+            return
+        slice_rect = pygame.draw.rect(screen, DRAIN_COLOR, (x + left, y, right - left, BAR_HEIGHT))
+
+        # Put back the segment lines and the part of the text the slice covered
+        segment_width = BAR_WIDTH / NUM_SEGMENTS
+        for i in range(1, NUM_SEGMENTS):
+            seg_x = i * segment_width
+            if left - 1 <= seg_x <= right + 1:
+                pygame.draw.line(screen, BORDER_COLOR,
+                               (x + seg_x, y), (x + seg_x, y + BAR_HEIGHT), 2)
+        text_surface, (text_x, text_y) = self.text
+        text_pos = (x - FRAME + text_x, y - FRAME + text_y)
+        clip = screen.get_clip()
+        screen.set_clip(slice_rect)
+        screen.blit(text_surface, text_pos)
+        screen.set_clip(clip)
+
+    def _compose(self, health, shine=True):
+        """Draw the whole bar for a health value onto a new surface"""
+        surface = pygame.Surface((BAR_WIDTH + FRAME * 2, BAR_HEIGHT + FRAME * 2))
+        x = y = FRAME
+
+        # Calculate health percentage
+        health_percent = health / self.max_health
+        health_width = self.width_for(health)
+
+        # Determine health bar color based on percentage
+        if health_percent > 0.6:
+            health_color = HEALTH_COLORS[2]
+        elif health_percent > 0.3:
+            health_color = HEALTH_COLORS[1]
+        else:
+            health_color = HEALTH_COLORS[0]
+
+        # Draw decorative outer border
+        surface.fill(BORDER_COLOR)
+
+        # Draw inner black border
+        pygame.draw.rect(surface, (0, 0, 0),
+                        (x - BORDER_WIDTH, y - BORDER_WIDTH,
+                         BAR_WIDTH + (BORDER_WIDTH * 2),
+                         BAR_HEIGHT + (BORDER_WIDTH * 2)))
+
+        # Draw background
+        pygame.draw.rect(surface, BG_COLOR, (x, y, BAR_WIDTH, BAR_HEIGHT))
+
+        # Draw health
+        if health_width > 0:
+            pygame.draw.rect(surface, health_color, (x, y, health_width, BAR_HEIGHT))
+
+        # Add shine effect
+        if health_width > 0 and shine:
+            shine_height = BAR_HEIGHT // 3
+            shine_alpha = 128
+            shine_surface = pygame.Surface((int(health_width), shine_height), pygame.SRCALPHA)
+            pygame.draw.rect(shine_surface, (*health_color, shine_alpha),
+                           (0, 0, int(health_width), shine_height))
+            surface.blit(shine_surface, (x, y))
+
+        # Draw segments
+        segment_width = BAR_WIDTH / NUM_SEGMENTS
+        for i in range(1, NUM_SEGMENTS):
+            seg_x = x + (i * segment_width)
+            pygame.draw.line(surface, BORDER_COLOR,
+                           (seg_x, y), (seg_x, y + BAR_HEIGHT), 2)
+
+        # Draw health text with its shadow; center the text itself, the shadow
+        # hangs 2 px off its bottom right
+        text_surface = render_text(f"{health}/{self.max_health}", 28, (255, 255, 255), shadow=((0, 0, 0), (2, 2)))
+        text_x = x + (BAR_WIDTH - text_surface.get_width() + 2) // 2
+        text_y = y + (BAR_HEIGHT - text_surface.get_height() + 2) // 2
+        surface.blit(text_surface, (text_x, text_y))
+        self.text = (text_surface, (text_x, text_y))
+
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
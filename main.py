@@ -2,63 +2,155 @@ import pygame
 import sys
 import math
 import random
+import copy
 from assets.background import ColiseumBackground
 from assets.sound_manager import SoundManager
+from assets.loader import AssetLoader
+from assets.audio_cache import AudioCache
+from assets.bundle import AssetBundle
 import os
-from networking import NetworkManager  
+import time
+from networking import NetworkManager, HOST_SLOT
+from spatial_hash import SpatialHash
+from sword_arc import DIRECTIONS, get_arc_table, segment_distance_sq, view_for_direction
+from ai import AIController, DIFFICULTIES
+from desync import DesyncDetector
+from sprite_cache import SpriteCache
+from particles import ParticleAtlas
+from render import DirtyRenderer
+from camera import Camera, ZOOM_STEP
+from text_cache import get_font, render_text, render_faded_text
+from hud import HealthBar
+from quality import QualityGovernor
+from profiler import FrameProfiler
 import socket
 import pickle
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
-pygame.mixer.music.load('assets/background-music.wav')
-pygame.mixer.music.play(-1)  
+# Startup is timed up to the first frame on screen
+startup_time = time.perf_counter()
 
-# Create sound manager
-sound_manager = SoundManager()
+# The arena's size in gameplay coordinates, the same for every peer whatever their
+# monitor or render scale. The HUD and menus are laid out in the same space
+ARENA_WIDTH = 1920
+ARENA_HEIGHT = 1080
+width, height = ARENA_WIDTH, ARENA_HEIGHT
 
-# Set up game window
-info = pygame.display.Info()
-width, height = info.current_w, info.current_h
-screen = pygame.display.set_mode((width, height), pygame.NOFRAME)  
-pygame.display.set_caption("Medieval Fighting Game")
+# Optional share of full resolution to draw the world at, e.g. 0.75 on slow machines;
+# the quality governor only lowers it from there
+RENDER_SCALE_ENV = 'MEDIEVAL_RENDER_SCALE'
 
-# Create background
-background = ColiseumBackground(width, height)
+# Nothing touches the display or the mixer on import; main() brings up the window
+# and the loading screen brings up the audio, so the game's code can be imported
+# on its own by tools and benchmarks
+window = None
+screen = None
+camera = None
+background = None
+renderer = None
+max_render_scale = 1.0
+asset_bundle = None
+sound_manager = None
+audio_cache = None
+asset_loader = None
+
+# Pre-rendered fighter poses, shared by every fighter
+fighter_sprites = SpriteCache()
+
+# Sheds effect detail and render resolution when frames run long so the game keeps its 60 Hz
+quality_governor = QualityGovernor()
+show_debug_overlay = False
+
+# Per-phase frame timings, only collected while the graph is up or a trace is recording
+profiler = FrameProfiler()
+show_profiler = False
+
+def mouse_position():
+    """Mouse position in render coordinates"""
+    return renderer.window_to_screen(pygame.mouse.get_pos())
+
+def init_display():
+    """Open the window and set up drawing; does nothing if it is already open"""
+    global window, screen, camera, background, renderer, max_render_scale
+    if window is not None:
+        return
+    pygame.display.init()
+    
+    # Set up game window at the monitor's native size
+    info = pygame.display.Info()
+    window_width, window_height = info.current_w, info.current_h
+    window = pygame.display.set_mode((window_width, window_height), pygame.NOFRAME)  
+    pygame.display.set_caption("Medieval Fighting Game")
+    
+    # Everything is drawn at the arena's size and scaled once when presented
+    if (window_width, window_height) == (width, height):
+        screen = window
+    else:
+        screen = pygame.Surface((width, height)).convert()
+    
+    # Camera from the arena to the world surface, for the clash zoom and the render scale;
+    # the background scales with it
+    camera = Camera(width, height)
+    
+    # Create background
+    background = ColiseumBackground(width, height, camera)
+    
+    # Only redraw and present what changes between frames
+    renderer = DirtyRenderer(screen, background, window, camera)
+    render_scale = os.environ.get(RENDER_SCALE_ENV)
+    if render_scale:
+        try:
+            max_render_scale = float(render_scale)
+        except ValueError:
+            print(f"Ignoring {RENDER_SCALE_ENV}={render_scale!r}, expected a number such as 0.75")
+    apply_render_scale()
+
+def apply_render_scale():
+    """Draw the arena at the quality level's render scale, never above the one asked for at launch"""
+    changed = renderer.set_render_scale(min(quality_governor.settings['render_scale'], max_render_scale))
+    fighter_sprites.set_scale(camera.magnification)
+    return changed
 
 # Load sounds 
 sound_files = {
-    'hit': 'assets/hit.wav',
-    'swing': 'assets/swing.wav',
-    'victory': 'assets/victory.wav',
-    'music': 'assets/background-music.wav',
-    'shield-block': 'assets/shield-block.wav',
-    'sword-clash': 'assets/sword-clash.wav'
+    'hit': 'hit.wav',
+    'swing': 'swing.wav',
+    'victory': 'victory.wav',
+    'music': 'background-music.wav',
+    'shield-block': 'shield-block.wav',
+    'sword-clash': 'sword-clash.wav'
 }
 
-# Try to load default sounds, but continue if files don't exist
-print("Loading sound files...")
-for name, path in sound_files.items():
-    print(f"Attempting to load {name} from {path}")
-    if os.path.exists(path):
-        print(f"Found {path}")
-        try:
-            if name == 'music':
-                if sound_manager.load_music(path):
-                    print("Successfully loaded music")
-                    sound_manager.play_music(loop=True)
-                else:
-                    print("Failed to load music")
+def init_audio():
+    """Start the mixer and begin loading sounds; does nothing if already started"""
+    global asset_bundle, sound_manager, audio_cache, asset_loader
+    if sound_manager is not None:
+        return
+    pygame.mixer.init()
+    
+    # Every asset is read by name from the packed bundle (or loose files in developer mode)
+    asset_bundle = AssetBundle()
+    success, message = asset_bundle.open()
+    print(message)
+    
+    # Create sound manager
+    sound_manager = SoundManager(asset_bundle)
+    
+    # Sound effects come from the pre-decoded audio cache, or decode on background
+    # threads while the loading screen shows; the music is streamed by the mixer
+    # rather than decoded up front
+    audio_cache = AudioCache()
+    audio_cache.open()
+    asset_loader = AssetLoader(asset_bundle, cache=audio_cache)
+    print("Loading sound files...")
+    for name, path in sound_files.items():
+        if name == 'music':
+            if sound_manager.load_music(path):
+                print("Successfully loaded music")
+                sound_manager.play_music(loop=True)
             else:
-                if sound_manager.load_sound(name, path):
-                    print(f"Successfully loaded {name} sound")
-                else:
-                    print(f"Failed to load {name} sound")
-        except Exception as e:
-            print(f"Error loading {name}: {str(e)}")
-    else:
-        print(f"File not found: {path}")
+                print("Failed to load music")
+        else:
+            asset_loader.load_sound(path)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -75,6 +167,34 @@ CLASH_BATTLE_BAR_WIDTH = 300
 CLASH_BATTLE_BAR_HEIGHT = 30
 CLASH_DAMAGE = 100
 CLASHES_NEEDED = 10
+CLASH_PRESS_POWER = 10  # Power gained per mash press
+CLASH_BATCH_TICKS = 6  # Ticks between batched mash messages over the network
+CLASH_KEYS = {1: pygame.K_SPACE, 2: pygame.K_RETURN}  # Mash key for each side of a clash
+CLASH_ZOOM = 1.5  # Camera zoom while fighters are locked in a clash
+
+# Free-for-all arena
+ARENA_MAX_PLAYERS = 16
+SWORD_REACH = 128  # Sword tip reach plus hitbox, rounded up to a grid cell
+
+# Fighter color schemes (armor, body); the first two are the classic duel colors
+FIGHTER_COLORS = [
+    (DARK_BLUE, BLUE),
+    ((255, 192, 203), (219, 112, 147)),
+    ((144, 238, 144), (34, 139, 34)),
+    ((255, 218, 120), (218, 165, 32)),
+    ((221, 160, 221), (148, 0, 211)),
+    ((175, 238, 238), (0, 139, 139)),
+    ((255, 160, 122), (178, 34, 34)),
+    ((211, 211, 211), (105, 105, 105)),
+    ((240, 230, 140), (128, 128, 0)),
+    ((255, 228, 196), (160, 82, 45)),
+    ((176, 196, 222), (25, 25, 112)),
+    ((152, 251, 152), (0, 100, 0)),
+    ((255, 182, 193), (199, 21, 133)),
+    ((230, 230, 250), (72, 61, 139)),
+    ((250, 128, 114), (128, 0, 0)),
+    ((64, 64, 64), (0, 0, 0))
+]
 
 class SwingEffect:
     def __init__(self, x, y, angle):
@@ -91,12 +211,31 @@ class SwingEffect:
         return self.lifetime > 0
 
     def draw(self, screen):
+        if self.size <= 0:
+            return []
         alpha = int((self.lifetime / 10) * 255)
-        effect_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        # Only as big as the arc itself
+        effect_surface = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
         pygame.draw.arc(effect_surface, (*self.color, alpha),
                        (0, 0, self.size * 2, self.size * 2),
                        math.radians(self.angle - 30), math.radians(self.angle + 30), 4)
-        screen.blit(effect_surface, (self.x - self.size, self.y - self.size))
+        return [screen.blit(effect_surface, (self.x - self.size, self.y - self.size))]
+
+# Pre-rendered spark, flash and blood sprites shared by every effect
+particle_atlas = ParticleAtlas()
+
+# Small translucent dots (swing trails), one surface per color and alpha
+_effect_dots = {}
+
+def effect_dot(color, radius, alpha):
+    """Cached dot surface, blitted at the dot's bounds instead of via a screen-sized layer"""
+    key = (color, radius, alpha)
+    dot = _effect_dots.get(key)
+    if dot is None:
+        dot = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(dot, (*color, alpha), (radius, radius), radius)
+        _effect_dots[key] = dot
+    return dot
 
 class Button:
     def __init__(self, x, y, width, height, text, color):
@@ -113,10 +252,10 @@ class Button:
         pygame.draw.rect(screen, BLACK, self.rect, 2)
         
         # Draw text
-        font = pygame.font.Font(None, 36)
-        text = font.render(self.text, True, BLACK)
+        text = render_text(self.text, 36, BLACK)
         text_rect = text.get_rect(center=self.rect.center)
         screen.blit(text, text_rect)
+        return [self.rect.copy()]
         
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
@@ -133,7 +272,6 @@ class DamageEffect:
         self.amount = amount
         self.lifetime = 30
         self.velocity_y = -3
-        self.font = pygame.font.Font(None, 36)
         # Red color for damage
         self.color = (180, 0, 0)
         
@@ -143,10 +281,11 @@ class DamageEffect:
         return self.lifetime > 0
         
     def draw(self, screen):
-        alpha = min(255, self.lifetime * 8)
-        text = self.font.render(str(self.amount), True, self.color)
-        text.set_alpha(alpha)
-        screen.blit(text, (self.x - text.get_width()//2, self.y))
+        # Faded copies are cached at a few alpha steps rather than made every frame
+        text = render_faded_text(str(self.amount), round(36 * camera.magnification), self.color,
+                                 min(255, self.lifetime * 8))
+        x, y = camera.to_screen(self.x, self.y)
+        return [screen.blit(text, (x - text.get_width()//2, y))]
 
 class HitEffect:
     def __init__(self, x, y):
@@ -155,7 +294,7 @@ class HitEffect:
         self.lifetime = 20
         self.particles = []
         # Create spark particles
-        for _ in range(8):
+        for _ in range(quality_governor.settings['hit_particles']):
             angle = random.uniform(0, 2 * math.pi)
             speed = random.uniform(2, 6)
             self.particles.append({
@@ -176,21 +315,17 @@ class HitEffect:
             p['dy'] += 0.2
         return self.lifetime > 0
     
-    def draw(self, screen):
-        # Draw flash
+    def add_blits(self, batch):
+        """Queue the flash, then the golden sparks on top, for draw_particle_effects"""
         flash_alpha = int((self.lifetime / 20) * 128)
-        flash_surface = pygame.Surface((40, 40), pygame.SRCALPHA)
-        pygame.draw.circle(flash_surface, (255, 255, 200, flash_alpha), (20, 20), 20)
-        screen.blit(flash_surface, (self.x - 20, self.y - 20))
-        
-        # Draw sparks
         spark_alpha = int((self.lifetime / 20) * 255)
+        zoom = camera.magnification
+        x, y = camera.to_screen(self.x, self.y)
+        batch.append((particle_atlas.get('flash', 20 * zoom, flash_alpha), (x - 20 * zoom, y - 20 * zoom)))
         for p in self.particles:
-            spark_surface = pygame.Surface((int(p['size'] * 2), int(p['size'] * 2)), pygame.SRCALPHA)
-            # Golden sparks
-            pygame.draw.circle(spark_surface, (255, 215, 0, spark_alpha), 
-                             (p['size'], p['size']), p['size'])
-            screen.blit(spark_surface, (p['x'] - p['size'], p['y'] - p['size']))
+            x, y = camera.to_screen(p['x'], p['y'])
+            size = p['size'] * zoom
+            batch.append((particle_atlas.get('spark', size, spark_alpha), (x - size, y - size)))
 
 class BloodEffect:
     def __init__(self, x, y, direction=None):
@@ -199,7 +334,7 @@ class BloodEffect:
         self.lifetime = 60  
         self.particles = []
         # Create blood particles
-        num_particles = random.randint(8, 12)
+        num_particles = random.randint(*quality_governor.settings['blood_particles'])
         for _ in range(num_particles):
             if direction is None:
                 angle = random.uniform(0, 2 * math.pi)
@@ -243,37 +378,35 @@ class BloodEffect:
         
         return self.lifetime > 0
     
-    def draw(self, screen):
+    def add_blits(self, batch):
+        """Queue elongated splats on the ground and round drops in the air, for draw_particle_effects"""
         alpha = min(255, self.lifetime * 4)
+        zoom = camera.magnification
         for p in self.particles:
-            particle_surface = pygame.Surface((int(p['size'] * 2), int(p['size'] * 2)), pygame.SRCALPHA)
-            
-            if p['splat']:
-                # Draw elongated splat
-                color = (140, 0, 0, alpha)  
-                height = p['size'] * 0.6
-                pygame.draw.ellipse(particle_surface, color,
-                                  (0, p['size'] - height/2,
-                                   p['size'] * 2, height))
-            else:
-                # Draw round drop
-                color = (180, 0, 0, alpha)  
-                pygame.draw.circle(particle_surface, color,
-                                 (p['size'], p['size']), p['size'])
-            
-            screen.blit(particle_surface, 
-                       (p['x'] - p['size'], p['y'] - p['size']))
+            x, y = camera.to_screen(p['x'], p['y'])
+            size = p['size'] * zoom
+            batch.append((particle_atlas.get('splat' if p['splat'] else 'drop', size, alpha), (x - size, y - size)))
+
+def draw_particle_effects(screen, effect_lists):
+    """Draw every effect in the lists with a single blits call; returns the screen rects drawn"""
+    batch = []
+    for effects in effect_lists:
+        for effect in effects:
+            effect.add_blits(batch)
+    return screen.blits(batch) if batch else []
 
 class Player:
-    def __init__(self, x, y, color=DARK_BLUE, body_color=BLUE):
+    def __init__(self, x, y, color=DARK_BLUE, body_color=BLUE, name="Player"):
         self.x = x
         self.y = y
+        self.name = name
         self.size = 20
         self.speed = 5
         self.color = color
         self.body_color = body_color
         self.direction = 0  
         self.health = 500
+        self.health_bar = HealthBar(self.health)
         self.is_dead = False
         self.hit_cooldown = 0
         self.hit_cooldown_duration = 20
@@ -292,6 +425,12 @@ class Player:
         self.attack_cooldown = 0
         self.attack_cooldown_duration = 30
         
+        # Frames of the swing that can hit (the same window as the swing trail)
+        self.attack_active_start = int(self.attack_duration * 0.2)
+        self.attack_active_end = int(self.attack_duration * 0.8)
+        self.swing_targets = []  # Fighters already hit by the current swing
+        self.sword_arcs = get_arc_table(self.handle_length, self.sword_length, self.attack_duration)
+        
         # Medieval warrior details
         self.helmet_size = self.size * 0.8
         self.armor_plates = 4
@@ -318,10 +457,75 @@ class Player:
         self.clash_count = 0
         self.clash_power = 0  
         
+        # Headless fighters (simulation copies) skip sounds and effects;
+        # lookahead copies also never start a clash battle
+        self.headless = False
+        self.lookahead = False
+        
+    def sim_copy(self, lookahead=True):
+        """Headless copy of this fighter's gameplay state for lookahead simulation"""
+        clone = copy.copy(self)
+        clone.headless = True
+        clone.lookahead = lookahead
+        clone.damage_numbers = []
+        clone.swing_effects = []
+        clone.hit_effects = []
+        clone.blood_effects = []
+        clone.damage_effects = []
+        clone.swing_targets = list(self.swing_targets)
+        return clone
+    
+    def play_sound(self, name):
+        if not self.headless:
+            sound_manager.play_sound(name)
+        
+    def sprite_key(self, direction, frame, guarding):
+        """Everything a cached pose depends on; frame is -1 when not attacking"""
+        return (direction, frame, guarding, self.color, self.body_color, self.size)
+    
+    def sprite_entries(self):
+        """Every pose this fighter can show, for warming the sprite cache"""
+        for direction in DIRECTIONS:
+            for guarding in (False, True):
+                for frame in range(-1, self.attack_duration + 1):
+                    yield (self.sprite_key(direction, frame, guarding),
+                           lambda surface, x, y, d=direction, f=frame, g=guarding:
+                               self.render_pose(surface, x, y, d, f, g))
+    
     def draw(self, screen):
+        # Body, sword and helmet are one pre-rendered sprite
+        frame = self.attack_frame if self.is_attacking else -1
+        key = self.sprite_key(self.direction, frame, self.is_guarding)
+        # Cached at the camera's magnification, so the offset is in world surface pixels
+        sprite, offset = fighter_sprites.get(
+            key, lambda surface, x, y: self.render_pose(surface, x, y, self.direction, frame, self.is_guarding))
+        dirty = [camera.blit(screen, sprite, int(self.x), int(self.y), offset)]
+        
+        # Add swing trail
+        if self.is_attacking and len(self.swing_effects) < quality_governor.settings['trail_length']:
+            pose = self.sword_arcs.swing_pose(self.direction, self.attack_frame)
+            self.swing_effects.append({
+                'x': self.x + pose.tip_dx,
+                'y': self.y + pose.tip_dy,
+                'alpha': 255,
+                'width': self.sword_width
+            })
+        
+        # Draw swing effects
+        radius = max(1, round(5 * camera.magnification))
+        for effect in self.swing_effects:
+            dot = effect_dot(self.color, radius, effect['alpha'])
+            x, y = camera.to_screen(int(effect['x']), int(effect['y']))
+            dirty.append(screen.blit(dot, (int(x) - radius, int(y) - radius)))
+        
+        # Clean up old effects
+        self.swing_effects = [e for e in self.swing_effects if e['alpha'] > 0]
+        return dirty
+
+    def render_pose(self, surface, x, y, direction, frame, guarding):
+        """Draw the fighter centered on (x, y); frame is -1 when not attacking"""
         # Get view angle
-        is_side_view = 135 <= self.direction <= 225 or (self.direction >= 315 or self.direction <= 45)
-        facing_left = 135 <= self.direction <= 225
+        is_side_view, facing_left = view_for_direction(direction)
         
         # Base measurements
         helmet_size = self.size * 0.8
@@ -329,222 +533,96 @@ class Player:
         shoulder_width = self.size * 1.4
         
         # Calculate positions
-        body_y = self.y
+        body_y = y
         
         # Draw shield (if not attacking)
-        if not self.is_attacking and is_side_view:
-            shield_x = self.x + (-20 if facing_left else 20)
-            pygame.draw.circle(screen, self.body_color, (int(shield_x), int(body_y)), 
+        if frame < 0 and is_side_view:
+            shield_x = x + (-20 if facing_left else 20)
+            pygame.draw.circle(surface, self.body_color, (int(shield_x), int(body_y)), 
                              int(self.shield_size))
-            pygame.draw.circle(screen, self.color, (int(shield_x), int(body_y)), 
+            pygame.draw.circle(surface, self.color, (int(shield_x), int(body_y)), 
                              int(self.shield_size - 4))
         
         # Draw body
         if is_side_view:
             # Side view body
             body_width = shoulder_width * 0.8
-            body_x = self.x + (body_width * 0.2 if facing_left else -body_width * 0.2)
+            body_x = x + (body_width * 0.2 if facing_left else -body_width * 0.2)
             
             # Draw armor plates
             for i in range(self.armor_plates):
                 plate_y = body_y - body_length/2 + (body_length * i / self.armor_plates)
-                pygame.draw.rect(screen, self.color,
+                pygame.draw.rect(surface, self.color,
                                (body_x - body_width/2, plate_y,
                                 body_width, body_length/self.armor_plates))
         else:
             # Front/back view body
-            pygame.draw.rect(screen, self.color,
-                           (self.x - shoulder_width/2, body_y - body_length/2,
+            pygame.draw.rect(surface, self.color,
+                           (x - shoulder_width/2, body_y - body_length/2,
                             shoulder_width, body_length))
         
-        # Draw sword
-        if self.is_attacking:
-            # Calculate sword angle for attack
-            swing_progress = self.attack_frame / self.attack_duration
-            swing_range = 180  
-            
-            # Adjust swing for view
-            if is_side_view:
-                base_angle = -90 if facing_left else 90
-            else:
-                base_angle = self.direction
-            
-            # Use easing function for smoother swing
-            swing_offset = swing_range * (1 - (1 - swing_progress) ** 2)
-            sword_angle = math.radians(base_angle - swing_offset)
-            
-            # Draw sword with handle
-            handle_x = self.x + math.cos(sword_angle) * self.handle_length
-            handle_y = self.y + math.sin(sword_angle) * self.handle_length
-            
-            blade_x = handle_x + math.cos(sword_angle) * self.sword_length
-            blade_y = handle_y + math.sin(sword_angle) * self.sword_length
-            
-            # Draw handle
-            pygame.draw.line(screen, (139, 69, 19), 
-                           (self.x, self.y), (handle_x, handle_y), 6)
-            
-            # Draw blade
-            pygame.draw.line(screen, (192, 192, 192), 
-                           (handle_x, handle_y), (blade_x, blade_y), self.sword_width)
-            
-            # Add swing trail
-            if len(self.swing_effects) < 5:
-                self.swing_effects.append({
-                    'x': blade_x,
-                    'y': blade_y,
-                    'alpha': 255,
-                    'width': self.sword_width
-                })
+        # Draw sword from the precomputed arc table
+        if frame >= 0:
+            pose = self.sword_arcs.swing_pose(direction, frame)
         else:
-            # Draw sword in rest position
-            if is_side_view:
-                sword_angle = math.radians(-45 if facing_left else 45)
-            else:
-                sword_angle = math.radians(self.direction + 45)
-            
-            handle_x = self.x + math.cos(sword_angle) * self.handle_length
-            handle_y = self.y + math.sin(sword_angle) * self.handle_length
-            
-            blade_x = handle_x + math.cos(sword_angle) * self.sword_length
-            blade_y = handle_y + math.sin(sword_angle) * self.sword_length
-            
-            pygame.draw.line(screen, (139, 69, 19), 
-                           (self.x, self.y), (handle_x, handle_y), 6)
-            pygame.draw.line(screen, (192, 192, 192), 
-                           (handle_x, handle_y), (blade_x, blade_y), self.sword_width)
+            pose = self.sword_arcs.rest_pose(direction)
+        
+        handle_x = x + pose.handle_dx
+        handle_y = y + pose.handle_dy
+        blade_x = x + pose.tip_dx
+        blade_y = y + pose.tip_dy
+        
+        # Draw handle
+        pygame.draw.line(surface, (139, 69, 19), 
+                       (x, y), (handle_x, handle_y), 6)
+        
+        # Draw blade
+        pygame.draw.line(surface, (192, 192, 192), 
+                       (handle_x, handle_y), (blade_x, blade_y), self.sword_width)
         
         # Draw guard symbol when guarding
-        if self.is_guarding:
+        if guarding:
             shield_radius = 15
-            shield_y = self.y - self.size - 30  
+            shield_y = y - self.size - 30  
             # Draw shield circle
-            pygame.draw.circle(screen, (192, 192, 192), (int(self.x), int(shield_y)), shield_radius)
+            pygame.draw.circle(surface, (192, 192, 192), (int(x), int(shield_y)), shield_radius)
             # Draw shield cross
-            pygame.draw.line(screen, (128, 128, 128), 
-                           (self.x - shield_radius, shield_y),
-                           (self.x + shield_radius, shield_y), 3)
-            pygame.draw.line(screen, (128, 128, 128),
-                           (self.x, shield_y - shield_radius),
-                           (self.x, shield_y + shield_radius), 3)
+            pygame.draw.line(surface, (128, 128, 128), 
+                           (x - shield_radius, shield_y),
+                           (x + shield_radius, shield_y), 3)
+            pygame.draw.line(surface, (128, 128, 128),
+                           (x, shield_y - shield_radius),
+                           (x, shield_y + shield_radius), 3)
         
         # Draw helmet
         helmet_y = body_y - body_length/2 - helmet_size * 0.6
         if is_side_view:
             # Side view helmet
-            helmet_x = self.x + (helmet_size * 0.2 if facing_left else -helmet_size * 0.2)
+            helmet_x = x + (helmet_size * 0.2 if facing_left else -helmet_size * 0.2)
             
             # Draw helmet shape
-            pygame.draw.ellipse(screen, self.color,
+            pygame.draw.ellipse(surface, self.color,
                               (helmet_x - helmet_size/2, helmet_y - helmet_size/2,
                                helmet_size, helmet_size))
             
             # Draw helmet details (visor)
             visor_y = helmet_y - helmet_size * 0.1
-            pygame.draw.line(screen, self.body_color,
+            pygame.draw.line(surface, self.body_color,
                            (helmet_x - helmet_size/3, visor_y),
                            (helmet_x + helmet_size/3, visor_y), 3)
         else:
             # Front view helmet
-            pygame.draw.circle(screen, self.color,
-                             (int(self.x), int(helmet_y)), int(helmet_size))
+            pygame.draw.circle(surface, self.color,
+                             (int(x), int(helmet_y)), int(helmet_size))
             # Draw helmet details
             visor_y = helmet_y - helmet_size * 0.1
-            pygame.draw.line(screen, self.body_color,
-                           (self.x - helmet_size/2, visor_y),
-                           (self.x + helmet_size/2, visor_y), 3)
-        
-        # Draw swing effects
-        effect_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-        for effect in self.swing_effects:
-            pygame.draw.circle(effect_surface, (*self.color, effect['alpha']),
-                             (int(effect['x']), int(effect['y'])), 5)
-        screen.blit(effect_surface, (0, 0))
-        
-        # Draw hit effects
-        for effect in self.hit_effects:
-            effect.draw(screen)
-        
-        # Draw blood effects
-        for effect in self.blood_effects:
-            effect.draw(screen)
-        
-        # Clean up old effects
-        self.swing_effects = [e for e in self.swing_effects if e['alpha'] > 0]
+            pygame.draw.line(surface, self.body_color,
+                           (x - helmet_size/2, visor_y),
+                           (x + helmet_size/2, visor_y), 3)
 
     def draw_health_bar(self, screen, x, y):
-        # Health bar dimensions
-        bar_width = 200  
-        bar_height = 25  
-        border_width = 4
-        
-        # Calculate health percentage
-        health_percent = self.health / 500
-        health_width = bar_width * health_percent
-        
-        # Colors
-        border_color = (101, 67, 33)  
-        bg_color = (80, 0, 0)  
-        health_colors = [
-            (200, 0, 0),    
-            (200, 150, 0),  
-            (0, 200, 0)     
-        ]
-        
-        # Determine health bar color based on percentage
-        if health_percent > 0.6:
-            health_color = health_colors[2]  
-        elif health_percent > 0.3:
-            health_color = health_colors[1]  
-        else:
-            health_color = health_colors[0]  
-        
-        # Draw decorative outer border
-        pygame.draw.rect(screen, border_color, 
-                        (x - border_width - 2, y - border_width - 2,
-                         bar_width + (border_width * 2) + 4, 
-                         bar_height + (border_width * 2) + 4))
-        
-        # Draw inner black border
-        pygame.draw.rect(screen, (0, 0, 0),
-                        (x - border_width, y - border_width,
-                         bar_width + (border_width * 2),
-                         bar_height + (border_width * 2)))
-        
-        # Draw background
-        pygame.draw.rect(screen, bg_color, (x, y, bar_width, bar_height))
-        
-        # Draw health
-        if health_width > 0:
-            pygame.draw.rect(screen, health_color, (x, y, health_width, bar_height))
-            
-            # Add shine effect
-            shine_height = bar_height // 3
-            shine_alpha = 128
-            shine_surface = pygame.Surface((int(health_width), shine_height), pygame.SRCALPHA)
-            pygame.draw.rect(shine_surface, (*health_color, shine_alpha), 
-                           (0, 0, int(health_width), shine_height))
-            screen.blit(shine_surface, (x, y))
-        
-        # Draw segments
-        num_segments = 10
-        segment_width = bar_width / num_segments
-        for i in range(1, num_segments):
-            seg_x = x + (i * segment_width)
-            pygame.draw.line(screen, border_color, 
-                           (seg_x, y), (seg_x, y + bar_height), 2)
-        
-        # Draw health text
-        font = pygame.font.Font(None, 28)
-        health_text = f"{int(self.health)}/500"
-        text_surface = font.render(health_text, True, (255, 255, 255))
-        text_x = x + (bar_width - text_surface.get_width()) // 2
-        text_y = y + (bar_height - text_surface.get_height()) // 2
-        
-        # Draw text shadow
-        shadow_surface = font.render(health_text, True, (0, 0, 0))
-        screen.blit(shadow_surface, (text_x + 2, text_y + 2))
-        screen.blit(text_surface, (text_x, text_y))
+        # The bar is a cached surface that only changes with health
+        return self.health_bar.draw(screen, x, y, self.health, quality_governor.settings['bar_shine'])
 
     def update(self):
         if self.hit_cooldown > 0:
@@ -563,25 +641,17 @@ class Player:
         # Update attack animation
         if self.is_attacking:
             self.attack_frame += 1
-            # Make the sword swing faster and more responsive
-            swing_speed = 15  
             
-            # Calculate sword angle based on attack frame
-            progress = self.attack_frame / self.attack_duration
-            if progress <= 0.5:
-                # Wind up
-                self.sword_angle = self.base_sword_angle - (90 * progress * 2)
-            else:
-                # Swing through
-                self.sword_angle = self.base_sword_angle - 90 + (180 * (progress - 0.5) * 2)
+            # Sword angle comes from the same arc table used for drawing and hits
+            pose = self.sword_arcs.swing_pose(self.direction, self.attack_frame)
+            self.sword_angle = pose.angle
             
-            # Add trail effect during the swing
-            if 0.2 <= progress <= 0.8:
-                sword_tip_x = self.x + math.cos(math.radians(self.sword_angle)) * self.sword_length
-                sword_tip_y = self.y + math.sin(math.radians(self.sword_angle)) * self.sword_length
+            # Add trail effect during the active part of the swing
+            if (not self.headless and self.attack_active_start <= self.attack_frame <= self.attack_active_end
+                    and len(self.swing_effects) < quality_governor.settings['trail_length']):
                 self.swing_effects.append({
-                    'x': sword_tip_x,
-                    'y': sword_tip_y,
+                    'x': self.x + pose.tip_dx,
+                    'y': self.y + pose.tip_dy,
                     'alpha': 200
                 })
             
@@ -589,6 +659,7 @@ class Player:
                 self.is_attacking = False
                 self.attack_frame = 0
                 self.sword_angle = self.base_sword_angle
+                self.swing_targets = []
         
         # Update damage numbers
         self.damage_numbers = [d for d in self.damage_numbers if d.update()]
@@ -628,7 +699,8 @@ class Player:
         if controls[attack_key] and not self.is_attacking and self.attack_cooldown == 0:
             self.is_attacking = True
             self.attack_frame = 0
-            sound_manager.play_sound('swing')
+            self.swing_targets = []
+            self.play_sound('swing')
 
         # Diagonal movement
         if dx != 0 and dy != 0:
@@ -663,7 +735,7 @@ class Player:
         if self.hit_cooldown <= 0:
             if self.is_guarding:
                 # Successful block
-                sound_manager.play_sound('shield-block')
+                self.play_sound('shield-block')
                 # Minimal knockback when blocking
                 if hit_angle is not None:
                     self.knockback_dx = math.cos(math.radians(hit_angle)) * 2
@@ -672,6 +744,11 @@ class Player:
                 self.health = max(0, self.health - amount)
                 self.hit_cooldown = self.hit_cooldown_duration
                 
+                if self.health <= 0:
+                    self.is_dead = True
+                if self.headless:
+                    return
+                
                 # Create multiple smaller damage numbers
                 num_effects = 3
                 spread = 20
@@ -688,69 +765,76 @@ class Player:
                 
                 # Add blood effect with direction
                 self.blood_effects.append(BloodEffect(self.x, self.y, hit_angle))
-                
-                if self.health <= 0:
-                    self.is_dead = True
 
     def check_hit(self, other_player):
-        if self.is_attacking and self.attack_frame == self.attack_duration // 2:
-            # Calculate sword tip position based on player's direction
-            attack_angle = math.radians(self.direction)
-            if self.attack_frame <= self.attack_duration // 2:
-                # During wind-up and strike
-                swing_progress = self.attack_frame / (self.attack_duration // 2)
-                attack_angle = math.radians(self.direction - 45 + swing_progress * 90)
-            
-            sword_tip_x = self.x + math.cos(attack_angle) * (self.size * 1.1 + self.sword_length)
-            sword_tip_y = self.y + math.sin(attack_angle) * (self.size * 1.1 + self.sword_length)
-            
-            # Create a larger hitbox area around the sword
-            hitbox_size = 40
+        if not self.is_attacking or other_player in self.swing_targets:
+            return None
+        if not self.attack_active_start <= self.attack_frame <= self.attack_active_end:
+            return None
+        
+        # Blade this frame and the tip's path since last frame, from the arc table
+        pose = self.sword_arcs.swing_pose(self.direction, self.attack_frame)
+        last_pose = self.sword_arcs.swing_pose(self.direction, self.attack_frame - 1)
+        handle_x = self.x + pose.handle_dx
+        handle_y = self.y + pose.handle_dy
+        sword_tip_x = self.x + pose.tip_dx
+        sword_tip_y = self.y + pose.tip_dy
+        
+        # Capsule tests: the opponent's body against the blade and the swept tip
+        reach = self.sword_width / 2 + other_player.size
+        reach_sq = reach * reach
+        if (segment_distance_sq(other_player.x, other_player.y,
+                                handle_x, handle_y, sword_tip_x, sword_tip_y) > reach_sq and
+                segment_distance_sq(other_player.x, other_player.y,
+                                    self.x + last_pose.tip_dx, self.y + last_pose.tip_dy,
+                                    sword_tip_x, sword_tip_y) > reach_sq):
+            return None
+        
+        # One hit per opponent per swing
+        self.swing_targets.append(other_player)
+        dx = other_player.x - sword_tip_x
+        dy = other_player.y - sword_tip_y
+        hit_angle = math.degrees(math.atan2(dy, dx))
+        
+        # Check for sword clash
+        if other_player.is_attacking and other_player.attack_frame > 0:
+            # Sword clash occurred! Count it once for both swings
+            self.play_sound('sword-clash')
+            other_player.swing_targets.append(self)
+            self.clash_count += 1
+            other_player.clash_count += 1
             
-            # Calculate distance from sword tip to opponent's center
-            dx = other_player.x - sword_tip_x
-            dy = other_player.y - sword_tip_y
-            distance = math.sqrt(dx * dx + dy * dy)
-            
-            # If opponent is within hitbox range
-            if distance < hitbox_size + other_player.size/2:
-                hit_angle = math.degrees(math.atan2(dy, dx))
-                
-                # Check for sword clash
-                if other_player.is_attacking and other_player.attack_frame > 0:
-                    # Sword clash occurred!
-                    sound_manager.play_sound('sword-clash')
-                    self.clash_count += 1
-                    other_player.clash_count += 1
-                    
-                    # Check if this is the tenth clash
-                    if self.clash_count >= CLASHES_NEEDED and other_player.clash_count >= CLASHES_NEEDED:
-                        return ClashBattle(self, other_player, 
-                                        pygame.display.get_surface().get_width(),
-                                        pygame.display.get_surface().get_height())
-                        
-                    # Strong knockback for both players
-                    knockback_force = 10
-                    self.knockback_dx = -math.cos(math.radians(hit_angle)) * knockback_force
-                    self.knockback_dy = -math.sin(math.radians(hit_angle)) * knockback_force
-                    other_player.knockback_dx = math.cos(math.radians(hit_angle)) * knockback_force
-                    other_player.knockback_dy = math.sin(math.radians(hit_angle)) * knockback_force
-                else:
-                    # Normal hit
-                    other_player.take_damage(20, hit_angle)
-                    sound_manager.play_sound('hit')
+            # Check if this is the tenth clash (lookahead copies never start the mini-game);
+            # the pair is returned so the authoritative side can start the clash battle
+            if (self.clash_count >= CLASHES_NEEDED and other_player.clash_count >= CLASHES_NEEDED
+                    and not self.lookahead):
+                return self, other_player
                 
-                # Add swing effect at the hit location
-                hit_x = (sword_tip_x + other_player.x) / 2
-                hit_y = (sword_tip_y + other_player.y) / 2
-                self.swing_effects.append({
-                    'x': hit_x,
-                    'y': hit_y,
-                    'alpha': 255
-                })
+            # Strong knockback for both players
+            knockback_force = 10
+            self.knockback_dx = -math.cos(math.radians(hit_angle)) * knockback_force
+            self.knockback_dy = -math.sin(math.radians(hit_angle)) * knockback_force
+            other_player.knockback_dx = math.cos(math.radians(hit_angle)) * knockback_force
+            other_player.knockback_dy = math.sin(math.radians(hit_angle)) * knockback_force
+        else:
+            # Normal hit
+            other_player.take_damage(20, hit_angle)
+            self.play_sound('hit')
+        
+        if self.headless:
+            return None
+        
+        # Add swing effect at the hit location
+        hit_x = (sword_tip_x + other_player.x) / 2
+        hit_y = (sword_tip_y + other_player.y) / 2
+        self.swing_effects.append({
+            'x': hit_x,
+            'y': hit_y,
+            'alpha': 255
+        })
 
 class ClashBattle:
-    def __init__(self, player1, player2, screen_width, screen_height):
+    def __init__(self, player1, player2, screen_width, screen_height, authoritative=True):
         self.player1 = player1
         self.player2 = player2
         self.duration = CLASH_BATTLE_DURATION
@@ -758,6 +842,19 @@ class ClashBattle:
         self.winner = None
         self.battle_ended = False
         
+        # Only the authoritative side (host or offline game) decides the result
+        self.authoritative = authoritative
+        self.result_pending = False
+        
+        # Mash presses per side as {tick: count}; powers are replayed from these
+        # so presses arriving late over the network land on the tick they happened
+        self.start_tick = None
+        self.presses = {1: {}, 2: {}}
+        self.outbox = []  # Our presses not yet sent to peers
+        self.announcement = None  # Host only: the clash start, until it has been sent
+        self.power_history = []
+        self.dirty_tick = 0
+        
         # Center positions
         self.center_x = screen_width // 2
         self.center_y = screen_height // 2
@@ -777,49 +874,103 @@ class ClashBattle:
         
         # Camera zoom effect
         self.zoom = 1.0
-        self.target_zoom = 1.5
+        self.target_zoom = CLASH_ZOOM
         
-        # Initialize font for timer and instructions
-        self.font = pygame.font.Font(None, 36)
         
-    def update(self, keys):
+    def label(self, player):
+        """Short on-screen name, e.g. P1"""
+        return player.name.replace("Player ", "P")
+    
+    def side_of(self, player):
+        """1 or 2 for the fighters in this clash, None for anyone else"""
+        if player is self.player1:
+            return 1
+        if player is self.player2:
+            return 2
+        return None
+        
+    def add_presses(self, side, tick, count, local=True):
+        """Record mash presses for a side at a simulation tick"""
+        if count <= 0 or self.battle_ended:
+            return
+        if self.start_tick is None:
+            self.start_tick = tick
+        tick = max(tick, self.start_tick)
+        self.dirty_tick = min(self.dirty_tick, tick - self.start_tick)
+        events = self.presses[side]
+        events[tick] = events.get(tick, 0) + count
+        if local:
+            self.outbox.append((side, tick, count))
+    
+    def outgoing(self):
+        """Batched presses (and the result, once decided) to send to peers"""
+        fields = {}
+        if self.announcement:
+            fields['clash_start'] = self.announcement
+            self.announcement = None
+        if self.outbox:
+            fields['clash_presses'] = self.outbox
+            self.outbox = []
+        if self.result_pending:
+            fields['clash_result'] = {'powers': (self.player1.clash_power, self.player2.clash_power)}
+            self.result_pending = False
+        return fields
+    
+    def receive(self, message):
+        """Apply a peer's batched presses and the authoritative result"""
+        for side, tick, count in message.get('clash_presses', ()):
+            self.add_presses(side, tick, count, local=False)
+        if 'clash_result' in message and not self.authoritative:
+            self.end_battle(message['clash_result'])
+        
+    def update(self, tick):
         if not self.active:
             return
+        if self.start_tick is None:
+            self.start_tick = tick
             
         # Update zoom
         self.zoom += (self.target_zoom - self.zoom) * 0.1
         
-        # Update clash powers based on button mashing 
-        if keys[pygame.K_SPACE]:
-            self.player1.clash_power += 2
-        if keys[pygame.K_RETURN]:
-            self.player2.clash_power += 2
-            
-        # Natural decay of power 
-        self.player1.clash_power -= 1
-        self.player2.clash_power -= 1
-            
-        # Keep powers within bounds
-        self.player1.clash_power = min(max(0, self.player1.clash_power), CLASH_BATTLE_BAR_WIDTH)
-        self.player2.clash_power = min(max(0, self.player2.clash_power), CLASH_BATTLE_BAR_WIDTH)
+        if self.battle_ended:
+            return
         
-        # Update duration
-        if not self.battle_ended:
-            self.duration -= 1
-            if self.duration <= 0:
-                self.end_battle()
+        # Replay powers from the earliest tick that gained new presses
+        elapsed = tick - self.start_tick
+        del self.power_history[self.dirty_tick:]
+        if self.power_history:
+            power1, power2 = self.power_history[-1]
+        else:
+            power1 = power2 = CLASH_BATTLE_BAR_WIDTH // 2
+        for step in range(len(self.power_history), elapsed + 1):
+            step_tick = self.start_tick + step
+            # Button mashing adds power, with natural decay every tick
+            power1 += self.presses[1].get(step_tick, 0) * CLASH_PRESS_POWER - 1
+            power2 += self.presses[2].get(step_tick, 0) * CLASH_PRESS_POWER - 1
+            # Keep powers within bounds
+            power1 = min(max(0, power1), CLASH_BATTLE_BAR_WIDTH)
+            power2 = min(max(0, power2), CLASH_BATTLE_BAR_WIDTH)
+            self.power_history.append((power1, power2))
+        self.dirty_tick = len(self.power_history)
+        self.player1.clash_power = power1
+        self.player2.clash_power = power2
+        
+        # Update duration; peers wait for the authoritative side's result
+        self.duration = CLASH_BATTLE_DURATION - elapsed
+        if self.duration <= 0 and self.authoritative:
+            self.end_battle()
             
     def draw(self, screen):
         if not self.active:
-            return
+            return []
             
         # Draw the clash power bar
         bar_x = (screen.get_width() - CLASH_BATTLE_BAR_WIDTH) // 2
         bar_y = screen.get_height() // 4
         
         # Background bar
-        pygame.draw.rect(screen, (50, 50, 50), 
-                        (bar_x, bar_y, CLASH_BATTLE_BAR_WIDTH, CLASH_BATTLE_BAR_HEIGHT))
+        dirty = [pygame.draw.rect(screen, (50, 50, 50), 
+                                  (bar_x, bar_y, CLASH_BATTLE_BAR_WIDTH, CLASH_BATTLE_BAR_HEIGHT))]
         
         # Calculate power percentages with safeguard against division by zero
         total_power = self.player1.clash_power + self.player2.clash_power
@@ -839,11 +990,11 @@ class ClashBattle:
         
         # Create a black background for text to make it more readable
         def draw_text_with_background(text, position):
-            text_surface = self.font.render(text, True, (255, 255, 255))
+            text_surface = render_text(text, 36, (255, 255, 255))
             text_rect = text_surface.get_rect(center=position)
             padding = 5
             bg_rect = text_rect.inflate(padding * 2, padding * 2)
-            pygame.draw.rect(screen, (0, 0, 0), bg_rect)
+            dirty.append(pygame.draw.rect(screen, (0, 0, 0), bg_rect))
             pygame.draw.rect(screen, (255, 255, 255), bg_rect, 2)
             screen.blit(text_surface, text_rect)
             return text_rect.bottom + padding
@@ -857,35 +1008,41 @@ class ClashBattle:
         # Draw instructions with background
         if not self.battle_ended:
             instruction_y = bar_y + CLASH_BATTLE_BAR_HEIGHT + 20
-            draw_text_with_background("P1: Mash SPACE!", 
+            draw_text_with_background(f"{self.label(self.player1)}: Mash SPACE!", 
                                    (bar_x + 100, instruction_y))
-            draw_text_with_background("P2: Mash ENTER!", 
+            draw_text_with_background(f"{self.label(self.player2)}: Mash ENTER!", 
                                    (bar_x + CLASH_BATTLE_BAR_WIDTH - 100, instruction_y))
         
         # Draw who's winning with background
         if not self.battle_ended:
             status_y = bar_y + CLASH_BATTLE_BAR_HEIGHT + 60
             if self.player1.clash_power > self.player2.clash_power:
-                status_text = "P1 is winning!"
+                status_text = f"{self.label(self.player1)} is winning!"
                 status_color = self.player1.color
             elif self.player2.clash_power > self.player1.clash_power:
-                status_text = "P2 is winning!"
+                status_text = f"{self.label(self.player2)} is winning!"
                 status_color = self.player2.color
             else:
                 status_text = "It's even!"
                 status_color = (255, 255, 255)
             
-            text_surface = self.font.render(status_text, True, status_color)
+            text_surface = render_text(status_text, 36, status_color)
             text_rect = text_surface.get_rect(center=(bar_x + CLASH_BATTLE_BAR_WIDTH // 2, status_y))
             padding = 5
             bg_rect = text_rect.inflate(padding * 2, padding * 2)
-            pygame.draw.rect(screen, (0, 0, 0), bg_rect)
+            dirty.append(pygame.draw.rect(screen, (0, 0, 0), bg_rect))
             pygame.draw.rect(screen, (255, 255, 255), bg_rect, 2)
             screen.blit(text_surface, text_rect)
+        return dirty
         
-    def end_battle(self):
+    def end_battle(self, result=None):
         if not self.battle_ended:  
             self.battle_ended = True
+            if result is not None:
+                # Adopt the authoritative side's final powers
+                self.player1.clash_power, self.player2.clash_power = result['powers']
+            elif self.authoritative:
+                self.result_pending = True
             # Determine winner and deal damage
             if self.player1.clash_power > self.player2.clash_power:
                 self.winner = self.player1
@@ -898,23 +1055,23 @@ class ClashBattle:
             self.player1.clash_count = 0
             self.player2.clash_count = 0
             
-            # Set a short delay before deactivating
-            pygame.time.set_timer(pygame.USEREVENT + 1, 1000)  
-
-# Initialize Pygame font
-pygame.font.init()
+            # Set a short delay before deactivating, easing the camera back out meanwhile;
+            # headless clashes (simulation only) have nothing on screen to clear
+            if not self.player1.headless:
+                pygame.time.set_timer(pygame.USEREVENT + 1, 1000)  
+            self.target_zoom = 1.0
 
-# Game states
+# Match phases
 PLAYING = 0
 GAME_OVER = 1
 ROUND_OVER = 2
-MENU = 3  
-WAITING_CONNECTION = 4  
-game_state = MENU  
 
 # Network variables
 network_manager = NetworkManager()
 is_host = False
+arena_mode = False
+local_index = 0  # Our fighter in players
+slot_fighters = {0: 0, 1: 1}  # Fighter index of each player slot in the match
 remote_data = None
 connection_status = "Disconnected"
 opponent_ip = ""
@@ -924,43 +1081,205 @@ ROUND_TIME = 5 * 60
 timer = ROUND_TIME
 last_second = pygame.time.get_ticks() // 1000
 
-# Score tracking
-player1_wins = 0
-player2_wins = 0
+# Score tracking, one entry per fighter
+player_wins = [0, 0]
+
+# CPU opponents by fighter index
+ai_controllers = {}
+ai_difficulty = 'normal'
+
+# Simulation tick (clients follow the host's) and desync checks against peers
+sim_tick = 0
+desync_detector = DesyncDetector(0, False)
+
+# Broadphase grid for hit and clash detection
+hit_grid = SpatialHash(cell_size=SWORD_REACH)
+
+def spawn_positions(count):
+    """Starting positions for each fighter"""
+    if count <= 2:
+        return [(width // 4, height // 2), (3 * width // 4, height // 2)][:count]
+    
+    # Spread arena fighters evenly around an ellipse
+    positions = []
+    for i in range(count):
+        angle = 2 * math.pi * i / count
+        positions.append((width // 2 + math.cos(angle) * width * 0.3,
+                          height // 2 + math.sin(angle) * height * 0.3))
+    return positions
+
+def create_players(count):
+    """Create one fighter per player slot, each with its own colors"""
+    fighters = []
+    for i, (x, y) in enumerate(spawn_positions(count)):
+        color, body_color = FIGHTER_COLORS[i % len(FIGHTER_COLORS)]
+        fighters.append(Player(x, y, color=color, body_color=body_color,
+                               name=f"Player {i + 1}"))
+    return fighters
+
+def start_match(slots, slot):
+    """Start a fresh match with a fighter for each player slot in slots, controlling the one in slot.
+
+    Slots freed by departed clients are reused, so they can have gaps; every
+    peer gets the same list from the host and numbers the fighters by it.
+    """
+    global players, player_wins, local_index, slot_fighters, clash_battle, ai_controllers
+    global sim_tick, desync_detector
+    players = create_players(len(slots))
+    player_wins = [0] * len(slots)
+    slot_fighters = {player_slot: index for index, player_slot in enumerate(slots)}
+    local_index = slot_fighters[slot]
+    ai_controllers = {}
+    sim_tick = 0
+    desync_detector = DesyncDetector(local_index, is_host)
+    clash_battle = None
+    match_scene.phase = PLAYING
+    change_scene(match_scene)
+    
+    # Render the fighters' poses now rather than mid-fight
+    fighter_sprites.warm(entry for player in players for entry in player.sprite_entries())
+    
+    # Every particle sprite a hit can need, at the sizes the effects pick from
+    particle_atlas.warm('flash', [20])
+    particle_atlas.warm('spark', [2 + i / 2 for i in range(5)])
+    particle_atlas.warm('drop', [2 + i / 2 for i in range(7)])
+    particle_atlas.warm('splat', [3 + i / 2 for i in range(20)])
+    
+    # Scale the background for each step of the clash zoom ahead of the first clash
+    zoom = 1.0 + ZOOM_STEP
+    while zoom <= CLASH_ZOOM:
+        background.zoomed_layer(zoom)
+        zoom += ZOOM_STEP
+
+def start_cpu_match():
+    """Single player: we control player 1 and the CPU controls player 2"""
+    global ai_controllers
+    start_match([0, 1], 0)
+    ai_controllers = {1: AIController(copy_fighters, simulate_step, ai_difficulty)}
+
+def apply_controls(player, controls):
+    """Drive a fighter from a control dictionary (keyboard or CPU)"""
+    player.move(controls, pygame.K_SPACE)
+    player.is_guarding = controls[pygame.K_g] and player.guard_cooldown <= 0
+
+def copy_fighters(fighters, lookahead=True):
+    """Headless copies of fighters that still recognise each other as swing targets"""
+    clones = [player.sim_copy(lookahead) for player in fighters]
+    originals = {id(player): clone for player, clone in zip(fighters, clones)}
+    for clone in clones:
+        clone.swing_targets = [originals.get(id(target), target) for target in clone.swing_targets]
+    return clones
+
+def simulate_step(fighters, controls):
+    """Advance headless fighters one tick; controls maps fighter index to a control dictionary.
+    Returns the pair of fighters that locked into a clash battle, if any"""
+    for i, player in enumerate(fighters):
+        if not player.is_dead and i in controls:
+            apply_controls(player, controls[i])
+    clash = resolve_hits(fighters)
+    for player in fighters:
+        player.update()
+    return clash
+
+def resolve_hits(fighters):
+    """Check hits only between fighters close enough to reach each other; returns the
+    pair of fighters that locked into a clash battle, if any"""
+    clash = None
+    hit_grid.rebuild(p for p in fighters if not p.is_dead)
+    for a, b in hit_grid.pairs(SWORD_REACH):
+        for attacker, defender in ((a, b), (b, a)):
+            result = attacker.check_hit(defender)
+            if result:
+                clash = result
+    return clash
+
+def start_announced_clash(start):
+    """Client: begin the clash battle the host announced, from the host's start tick"""
+    global clash_battle
+    if clash_battle and clash_battle.active and not clash_battle.battle_ended:
+        return
+    index1, index2 = start['fighters']
+    clash_battle = ClashBattle(players[index1], players[index2], width, height, authoritative=False)
+    clash_battle.start_tick = start['tick']
+
+def apply_resync(state):
+    """Adopt the host's canonical state after a desync"""
+    global clash_battle
+    for player, (health, is_dead, clash_count) in zip(players, state['fighters']):
+        player.health = health
+        player.is_dead = bool(is_dead)
+        player.clash_count = clash_count
+    
+    clash = state['clash']
+    if clash is None:
+        if clash_battle and clash_battle.active:
+            clash_battle.active = False
+        return
+    
+    index1, index2, power1, power2, duration, battle_ended = clash
+    if not (clash_battle and clash_battle.active):
+        # Powers replay from the mash presses the host keeps sending
+        clash_battle = ClashBattle(players[index1], players[index2], width, height,
+                                   authoritative=False)
+    if battle_ended:
+        clash_battle.end_battle({'powers': (power1, power2)})
 
 def reset_round():
-    global player1, player2, game_state, timer
-    pygame.mixer.music.stop()  
-    player1 = Player(width // 4, height // 2)
-    player2 = Player(3 * width // 4, height // 2, 
-                    color=(255, 192, 203),  
-                    body_color=(219, 112, 147))  
-    game_state = PLAYING
+    global players, timer
+    sound_manager.stop_music()
+    players = create_players(len(players))
+    for controller in ai_controllers.values():
+        controller.reset()
+    match_scene.phase = PLAYING
     timer = ROUND_TIME
-    pygame.mixer.music.load('assets/background-music.wav')
-    pygame.mixer.music.play(-1)  
+    sound_manager.play_music(loop=True)
 
 def draw_timer(screen):
     minutes = timer // 60
     seconds = timer % 60
-    font = pygame.font.Font(None, 74)
-    timer_text = font.render(f"{minutes:02d}:{seconds:02d}", True, (0, 0, 0))
+    timer_text = render_text(f"{minutes:02d}:{seconds:02d}", 74, (0, 0, 0))
     timer_rect = timer_text.get_rect(center=(width//2, 40))
-    screen.blit(timer_text, timer_rect)
+    return [screen.blit(timer_text, timer_rect)]
+
+def draw_debug_overlay(screen):
+    """Frame rate, frame time, quality level and render scale in the bottom-left corner"""
+    # Changes every frame, so it is rendered directly instead of filling the text cache
+    text = (f"{clock.get_fps():.0f} FPS  {quality_governor.average_ms:.1f} ms  "
+            f"Quality: {quality_governor.settings['name']}  Scale: {float(renderer.render_scale):g}")
+    text_surface = get_font(24).render(text, True, (255, 255, 255), (0, 0, 0))
+    return [screen.blit(text_surface, (10, height - text_surface.get_height() - 10))]
+
+def health_bar_positions(count, screen_width):
+    """Top-left corner of each fighter's health bar"""
+    if count <= 2:
+        return [(10, 10), (screen_width - 210, 10)][:count]
+    
+    # Arena: wrap the bars into rows across the top of the screen
+    per_row = max(1, (screen_width - 20) // 230)
+    positions = []
+    for i in range(count):
+        row, col = divmod(i, per_row)
+        positions.append((10 + col * 230, 10 + row * 80))
+    return positions
+
+def draw_health_bars(screen):
+    dirty = []
+    for player, (bar_x, bar_y) in zip(players, health_bar_positions(len(players), screen.get_width())):
+        dirty.extend(player.draw_health_bar(screen, bar_x, bar_y))
+    return dirty
 
 def draw_score(screen):
-    font = pygame.font.Font(None, 48)
-    # Player 1 score
-    score1_text = font.render(f"P1 Wins: {player1_wins}", True, DARK_BLUE)
-    screen.blit(score1_text, (20, 60))
-    # Player 2 score
-    score2_text = font.render(f"P2 Wins: {player2_wins}", True, (219, 112, 147))
-    score2_rect = score2_text.get_rect(right=width-20, top=60)
-    screen.blit(score2_text, score2_rect)
+    size = 48 if len(players) <= 2 else 36
+    # One score line under each fighter's health bar
+    positions = health_bar_positions(len(players), screen.get_width())
+    dirty = []
+    for i, (player, wins, (bar_x, bar_y)) in enumerate(zip(players, player_wins, positions)):
+        score_text = render_text(f"P{i + 1} Wins: {wins}", size, player.color)
+        dirty.append(screen.blit(score_text, (bar_x, bar_y + 40)))
+    return dirty
 
 def draw_game_over(screen, winner):
-    font = pygame.font.Font(None, 74)
-    text = font.render(f"{winner} Wins!", True, (255, 255, 255))
+    text = render_text(f"{winner} Wins!", 74, (255, 255, 255))
     text_rect = text.get_rect(center=(screen.get_width()//2, screen.get_height()//2))
     
     # Draw text background
@@ -972,14 +1291,12 @@ def draw_game_over(screen, winner):
     screen.blit(text, text_rect)
     
     # Draw restart instruction
-    font_small = pygame.font.Font(None, 36)
-    restart_text = font_small.render("Press R to Restart", True, (255, 255, 255))
+    restart_text = render_text("Press R to Restart", 36, (255, 255, 255))
     restart_rect = restart_text.get_rect(center=(screen.get_width()//2, text_rect.bottom + 40))
-    screen.blit(restart_text, restart_rect)
+    return [bg_rect, screen.blit(restart_text, restart_rect)]
 
 def draw_round_over(screen, winner):
-    font = pygame.font.Font(None, 74)
-    text = font.render("Round Over!", True, (255, 255, 255))
+    text = render_text("Round Over!", 74, (255, 255, 255))
     text_rect = text.get_rect(center=(screen.get_width()//2, screen.get_height()//2))
     
     # Draw text background
@@ -989,35 +1306,31 @@ def draw_round_over(screen, winner):
     pygame.draw.rect(screen, (255, 255, 255), bg_rect, 2)
     
     screen.blit(text, text_rect)
+    dirty = [bg_rect]
     
     # Draw winner text if there is one
     if winner:
-        font_small = pygame.font.Font(None, 48)
-        winner_text = font_small.render(f"{winner} wins the round!", True, (255, 255, 255))
+        winner_text = render_text(f"{winner} wins the round!", 48, (255, 255, 255))
         winner_rect = winner_text.get_rect(center=(screen.get_width()//2, text_rect.bottom + 40))
-        screen.blit(winner_text, winner_rect)
+        dirty.append(screen.blit(winner_text, winner_rect))
     
     # Draw restart instruction
-    font_small = pygame.font.Font(None, 36)
-    restart_text = font_small.render("Press R to Continue", True, (255, 255, 255))
+    restart_text = render_text("Press R to Continue", 36, (255, 255, 255))
     restart_rect = restart_text.get_rect(center=(screen.get_width()//2, text_rect.bottom + 80))
-    screen.blit(restart_text, restart_rect)
+    dirty.append(screen.blit(restart_text, restart_rect))
+    return dirty
 
 # Create try again button
 try_again_btn = Button(width//2 - 100, height//2 - 25, 200, 50, "Next Round!", (102, 255, 102))
 
 # Create players
-player1 = Player(width // 4, height // 2)
-player2 = Player(3 * width // 4, height // 2, 
-                color=(255, 192, 203),  
-                body_color=(219, 112, 147))  
+players = create_players(2)
 
 # Create a menu button class that's more visually appealing
 class MenuButton(Button):
     def __init__(self, x, y, width, height, text, color):
         super().__init__(x, y, width, height, text, color)
         self.hover_color = (min(color[0] + 30, 255), min(color[1] + 30, 255), min(color[2] + 30, 255))
-        self.font = pygame.font.Font(None, 36)
         self.is_hovered = False
         
     def draw(self, screen):
@@ -1027,9 +1340,10 @@ class MenuButton(Button):
         pygame.draw.rect(screen, (255, 255, 255), self.rect, 2)  
         
         # Draw text
-        text_surf = self.font.render(self.text, True, (255, 255, 255))
+        text_surf = render_text(self.text, 36, (255, 255, 255))
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
+        return [self.rect.copy()]
         
     def update(self, mouse_pos):
         self.is_hovered = self.rect.collidepoint(mouse_pos)
@@ -1039,95 +1353,89 @@ class MenuButton(Button):
 
 # Function to draw the menu
 def draw_menu(screen):
-    # Background
-    screen.fill((0, 0, 0))
-    background.draw(screen)
-    
     # Title
-    font_title = pygame.font.Font(None, 74)
-    title_text = font_title.render("Medieval Fighting Game", True, (255, 255, 255))
-    title_shadow = font_title.render("Medieval Fighting Game", True, (0, 0, 0))
+    title_text = render_text("Medieval Fighting Game", 74, (255, 255, 255), shadow=((0, 0, 0), (2, 2)))
     
-    # Draw shadow with offset
-    title_rect = title_text.get_rect(center=(width//2, height//4))
-    shadow_rect = title_shadow.get_rect(center=(width//2 + 2, height//4 + 2))
-    screen.blit(title_shadow, shadow_rect)
-    screen.blit(title_text, title_rect)
+    # The shadow offset grows the surface by 2 px, so center it 1 px lower right
+    title_rect = title_text.get_rect(center=(width//2 + 1, height//4 + 1))
+    dirty = [screen.blit(title_text, title_rect)]
     
     # Draw buttons
-    host_button.update(pygame.mouse.get_pos())
-    join_button.update(pygame.mouse.get_pos())
-    quit_button.update(pygame.mouse.get_pos())
+    cpu_button.update(mouse_position())
+    difficulty_button.update(mouse_position())
+    host_button.update(mouse_position())
+    arena_button.update(mouse_position())
+    join_button.update(mouse_position())
+    quit_button.update(mouse_position())
     
-    host_button.draw(screen)
-    join_button.draw(screen)
-    quit_button.draw(screen)
+    for button in (cpu_button, difficulty_button, host_button, arena_button, join_button, quit_button):
+        dirty.extend(button.draw(screen))
+    return dirty
 
 # Function to draw the connection screen
 def draw_connection_screen(screen, status_message):
-    # Background
-    screen.fill((0, 0, 0))
-    background.draw(screen)
-    
     # Title
-    font_title = pygame.font.Font(None, 48)
     if is_host:
-        title_text = font_title.render("Hosting Game - Waiting for Player...", True, (255, 255, 255))
+        title_text = render_text("Hosting Game - Waiting for Player...", 48, (255, 255, 255))
         
         # Show IP address for others to connect to
-        ip_font = pygame.font.Font(None, 36)
-        ip_text = ip_font.render(f"Your IP Address: {network_manager.get_server_ip()}", True, (255, 255, 255))
+        ip_text = render_text(f"Your IP Address: {network_manager.get_server_ip()}", 36, (255, 255, 255))
         ip_rect = ip_text.get_rect(center=(width//2, height//2))
-        screen.blit(ip_text, ip_rect)
+        dirty = [screen.blit(ip_text, ip_rect)]
+        
+        if arena_mode:
+            # Show how many fighters have joined the arena
+            count_text = render_text(f"Fighters: {network_manager.player_count()}/{ARENA_MAX_PLAYERS}",
+                                     36, (255, 255, 255))
+            count_rect = count_text.get_rect(center=(width//2, height//2 + 100))
+            dirty.append(screen.blit(count_text, count_rect))
+            
+            start_button.update(mouse_position())
+            dirty.extend(start_button.draw(screen))
     else:
-        title_text = font_title.render("Connecting to Host...", True, (255, 255, 255))
+        title_text = render_text("Connecting to Host...", 48, (255, 255, 255))
+        dirty = []
     
     title_rect = title_text.get_rect(center=(width//2, height//4))
-    screen.blit(title_text, title_rect)
+    dirty.append(screen.blit(title_text, title_rect))
     
     # Status message
-    status_font = pygame.font.Font(None, 36)
-    status_text = status_font.render(status_message, True, (255, 255, 255))
+    status_text = render_text(status_message, 36, (255, 255, 255))
     status_rect = status_text.get_rect(center=(width//2, height//2 + 50))
-    screen.blit(status_text, status_rect)
+    dirty.append(screen.blit(status_text, status_rect))
     
     # Back button
-    back_button.update(pygame.mouse.get_pos())
-    back_button.draw(screen)
+    back_button.update(mouse_position())
+    dirty.extend(back_button.draw(screen))
+    return dirty
 
 # Function to draw IP input box
 def draw_ip_input_screen(screen):
-    # Background
-    screen.fill((0, 0, 0))
-    background.draw(screen)
-    
     # Title
-    font_title = pygame.font.Font(None, 48)
-    title_text = font_title.render("Enter Host IP Address", True, (255, 255, 255))
+    title_text = render_text("Enter Host IP Address", 48, (255, 255, 255))
     title_rect = title_text.get_rect(center=(width//2, height//4))
-    screen.blit(title_text, title_rect)
+    dirty = [screen.blit(title_text, title_rect)]
     
     # IP input box
-    pygame.draw.rect(screen, (50, 50, 50), (width//2 - 150, height//2 - 25, 300, 50))
+    dirty.append(pygame.draw.rect(screen, (50, 50, 50), (width//2 - 150, height//2 - 25, 300, 50)))
     pygame.draw.rect(screen, (255, 255, 255), (width//2 - 150, height//2 - 25, 300, 50), 2)
     
     # IP text
-    ip_font = pygame.font.Font(None, 36)
-    ip_text = ip_font.render(opponent_ip, True, (255, 255, 255))
+    ip_text = render_text(opponent_ip, 36, (255, 255, 255))
     ip_rect = ip_text.get_rect(center=(width//2, height//2))
     screen.blit(ip_text, ip_rect)
     
     # Instruction
-    instruction_font = pygame.font.Font(None, 24)
-    instruction_text = instruction_font.render("Enter the IP address of the host and press Enter", True, (200, 200, 200))
+    instruction_text = render_text("Enter the IP address of the host and press Enter", 24, (200, 200, 200))
     instruction_rect = instruction_text.get_rect(center=(width//2, height//2 + 50))
-    screen.blit(instruction_text, instruction_rect)
+    dirty.append(screen.blit(instruction_text, instruction_rect))
     
     # Back button
-    back_button.update(pygame.mouse.get_pos())
-    back_button.draw(screen)
-    connect_button.update(pygame.mouse.get_pos())
-    connect_button.draw(screen)
+    back_button.update(mouse_position())
+    dirty.extend(back_button.draw(screen))
+    connect_button.update(mouse_position())
+    dirty.extend(connect_button.draw(screen))
+    return dirty
 
 # Function to prepare player data for network transmission
 def prepare_player_data(player):
@@ -1152,6 +1460,9 @@ def update_player_from_data(player, data):
     player.y = data['y']
     player.direction = data['direction']
     player.health = data['health']
+    # A new swing (or a restarted one) can hit everyone again
+    if data['is_attacking'] and (not player.is_attacking or data['attack_frame'] < player.attack_frame):
+        player.swing_targets = []
     player.is_attacking = data['is_attacking']
     player.attack_frame = data['attack_frame']
     player.is_guarding = data['is_guarding']
@@ -1162,198 +1473,459 @@ button_width, button_height = 300, 60
 menu_center_x = width // 2
 menu_start_y = height // 2
 
-host_button = MenuButton(menu_center_x - button_width//2, menu_start_y - 80, 
+cpu_button = MenuButton(menu_center_x - button_width//2, menu_start_y - 140, 
+                       button_width, button_height, "Play vs CPU", (128, 100, 160))
+difficulty_button = MenuButton(menu_center_x + button_width//2 + 10, menu_start_y - 140, 
+                              140, button_height, ai_difficulty.title(), (100, 100, 100))
+host_button = MenuButton(menu_center_x - button_width//2, menu_start_y - 70, 
                         button_width, button_height, "Host Game", (76, 175, 80))
-join_button = MenuButton(menu_center_x - button_width//2, menu_start_y, 
+arena_button = MenuButton(menu_center_x - button_width//2, menu_start_y, 
+                         button_width, button_height, "Host Arena", (205, 133, 63))
+join_button = MenuButton(menu_center_x - button_width//2, menu_start_y + 70, 
                         button_width, button_height, "Join Game", (70, 130, 180))
-quit_button = MenuButton(menu_center_x - button_width//2, menu_start_y + 80, 
+quit_button = MenuButton(menu_center_x - button_width//2, menu_start_y + 140, 
                         button_width, button_height, "Quit Game", (180, 70, 70))
 back_button = MenuButton(menu_center_x - button_width//2, height - 120, 
                         button_width, button_height, "Back to Menu", (180, 70, 70))
 connect_button = MenuButton(menu_center_x - button_width//2, height - 200, 
                            button_width, button_height, "Connect", (76, 175, 80))
+start_button = MenuButton(menu_center_x - button_width//2, height - 200, 
+                         button_width, button_height, "Start Arena", (76, 175, 80))
 
-# Game loop
-clock = pygame.time.Clock()
-running = True
-clash_battle = None
+class Scene:
+    """One screen of the game: the menu, a lobby or the match.
+
+    Each frame the main loop passes the scene its events, then calls update,
+    draw_world and draw. draw_world draws on the world surface through the
+    camera (fighters and effects) and draw draws the HUD on the screen; both
+    return the rects they covered. The background behind them is restored by
+    the renderer, so a scene never clears the screen itself. Scenes move on
+    explicitly with change_scene.
+    """
+    def enter(self):
+        """Called when the scene becomes the current one"""
+    
+    def handle_event(self, event):
+        pass
+    
+    def update(self):
+        pass
+    
+    def draw_world(self, world):
+        return []
+    
+    def draw(self, screen):
+        return []
+
+def change_scene(new_scene):
+    """Switch to another scene from the next frame on"""
+    global scene
+    scene = new_scene
+    scene.enter()
+
+def left_click(event):
+    return event.type == pygame.MOUSEBUTTONDOWN and event.button == 1
 
-while running:
-    current_time = pygame.time.get_ticks() // 1000
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_clicked = False
+class LoadingScene(Scene):
+    """Progress bar while the sound effects decode; moves on to the menu when they are ready"""
+    def enter(self):
+        init_audio()
     
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
+    def update(self):
+        if not asset_loader.done():
+            return
+        for name, path in sound_files.items():
+            if name == 'music':
+                continue
+            sound = asset_loader.sound(path)
+            if sound is not None:
+                sound_manager.add_sound(name, sound)
+                print(f"Successfully loaded {name} sound")
+            else:
+                print(f"Failed to load {name} sound")
+        asset_loader.save_cache()
+        print(f"Assets loaded after {(time.perf_counter() - startup_time) * 1000:.0f} ms")
+        change_scene(menu_scene)
+    
+    def draw(self, screen):
+        title_text = render_text("Loading...", 48, (255, 255, 255), shadow=((0, 0, 0), (2, 2)))
+        title_rect = title_text.get_rect(center=(width//2 + 1, height//2 - 40 + 1))
+        dirty = [screen.blit(title_text, title_rect)]
+        
+        # Progress bar
+        finished, total = asset_loader.progress()
+        bar = pygame.Rect(width//2 - 200, height//2, 400, 30)
+        dirty.append(pygame.draw.rect(screen, (50, 50, 50), bar))
+        if total:
+            pygame.draw.rect(screen, (76, 175, 80), (bar.x, bar.y, bar.width * finished // total, bar.height))
+        pygame.draw.rect(screen, (255, 255, 255), bar, 2)
+        return dirty
+
+class MenuScene(Scene):
+    def handle_event(self, event):
+        global is_host, arena_mode, connection_status, ai_difficulty, running
+        if not left_click(event):
+            return
+        mouse_pos = mouse_position()
+        if cpu_button.check_click(mouse_pos, True):
+            is_host = False
+            arena_mode = False
+            start_cpu_match()
+        elif difficulty_button.check_click(mouse_pos, True):
+            # Cycle through the CPU difficulty presets
+            names = list(DIFFICULTIES)
+            ai_difficulty = names[(names.index(ai_difficulty) + 1) % len(names)]
+            difficulty_button.text = ai_difficulty.title()
+        elif host_button.check_click(mouse_pos, True):
+            is_host = True
+            arena_mode = False
+            success, message = network_manager.start_server()
+            connection_status = message
+            change_scene(host_lobby_scene)
+        elif arena_button.check_click(mouse_pos, True):
+            is_host = True
+            arena_mode = True
+            success, message = network_manager.start_server(max_clients=ARENA_MAX_PLAYERS - 1)
+            connection_status = message
+            change_scene(host_lobby_scene)
+        elif join_button.check_click(mouse_pos, True):
+            is_host = False
+            arena_mode = False
+            change_scene(join_scene)
+        elif quit_button.check_click(mouse_pos, True):
             running = False
+    
+    def draw(self, screen):
+        return draw_menu(screen)
+
+class HostLobbyScene(Scene):
+    """Waiting for clients to join our game or arena"""
+    def handle_event(self, event):
+        if not left_click(event):
+            return
+        mouse_pos = mouse_position()
+        if arena_mode and start_button.check_click(mouse_pos, True) and network_manager.client_connected:
+            # Arena: the host decides when everyone has joined
+            slots = network_manager.player_slots()
+            network_manager.max_clients = len(slots) - 1  # Stop taking new fighters
+            network_manager.send_control({'type': 'start', 'slots': slots})
+            start_match(slots, network_manager.player_slot)
+        elif back_button.check_click(mouse_pos, True):
+            network_manager.close()
+            change_scene(menu_scene)
+    
+    def update(self):
+        # A duel starts as soon as the other player is in
+        if not arena_mode and network_manager.client_connected:
+            slots = network_manager.player_slots()
+            network_manager.send_control({'type': 'start', 'slots': slots})
+            start_match(slots, network_manager.player_slot)
+    
+    def draw(self, screen):
+        return draw_connection_screen(screen, connection_status)
+
+class JoinScene(Scene):
+    """Typing the host's IP, then waiting for the host to start the match"""
+    def handle_event(self, event):
+        global opponent_ip, connection_status
+        if event.type == pygame.KEYDOWN and not network_manager.connected:
+            # Handle text input for IP address
+            if event.key == pygame.K_RETURN:
+                # Try to connect with the entered IP; the host starts the match
+                success, message = network_manager.connect_to_server(opponent_ip)
+                connection_status = message
+            elif event.key == pygame.K_BACKSPACE:
+                opponent_ip = opponent_ip[:-1]
+            elif event.unicode.isprintable() and len(opponent_ip) < 15:
+                opponent_ip += event.unicode
+        elif left_click(event):
+            mouse_pos = mouse_position()
+            if back_button.check_click(mouse_pos, True):
+                network_manager.close()
+                change_scene(menu_scene)
+            elif not network_manager.connected and connect_button.check_click(mouse_pos, True):
+                success, message = network_manager.connect_to_server(opponent_ip)
+                connection_status = message
+    
+    def update(self):
+        if network_manager.connected:
+            for message in network_manager.get_control_messages():
+                if message.get('type') == 'start':
+                    start_match(message['slots'], network_manager.player_slot)
+    
+    def draw(self, screen):
+        if network_manager.connected:
+            return draw_connection_screen(screen, connection_status)
+        return draw_ip_input_screen(screen)
+
+class MatchScene(Scene):
+    """The fight itself, from the first tick through game over"""
+    def __init__(self):
+        self.phase = PLAYING
+        self.mash_presses = {pygame.K_SPACE: 0, pygame.K_RETURN: 0}
+    
+    def handle_event(self, event):
+        global clash_battle
         if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_r and (game_state == GAME_OVER or game_state == ROUND_OVER):
+            # Count clash mash presses (each press, not held keys)
+            if event.key in self.mash_presses:
+                self.mash_presses[event.key] += 1
+            if event.key == pygame.K_r and self.phase in (GAME_OVER, ROUND_OVER):
                 reset_round()
-                game_state = PLAYING
-            # Handle text input for IP address
-            if game_state == WAITING_CONNECTION and not is_host:
-                if event.key == pygame.K_RETURN:
-                    # Try to connect with the entered IP
-                    success, message = network_manager.connect_to_server(opponent_ip)
-                    connection_status = message
-                    if success:
-                        game_state = PLAYING
-                elif event.key == pygame.K_BACKSPACE:
-                    opponent_ip = opponent_ip[:-1]
-                elif event.unicode.isprintable() and len(opponent_ip) < 15:
-                    opponent_ip += event.unicode
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:  
-                mouse_clicked = True
-        # Add clash battle end timer event
+        # Clash battle end timer event
         if event.type == pygame.USEREVENT + 1:  
             if clash_battle:
                 clash_battle.active = False
                 pygame.time.set_timer(pygame.USEREVENT + 1, 0)  
-
-    # Update background
-    background.update()
-
-    # Clear the screen and draw background
-    screen.fill(BLACK)
-    background.draw(screen)
     
-    # Handle different game states
-    if game_state == MENU:
-        draw_menu(screen)
-        
-        # Check button clicks
-        if mouse_clicked:
-            if host_button.check_click(mouse_pos, mouse_clicked):
-                is_host = True
-                success, message = network_manager.start_server()
-                connection_status = message
-                game_state = WAITING_CONNECTION
-            elif join_button.check_click(mouse_pos, mouse_clicked):
-                is_host = False
-                game_state = WAITING_CONNECTION
-            elif quit_button.check_click(mouse_pos, mouse_clicked):
-                running = False
+    def update(self):
+        mash_presses = self.mash_presses
+        self.mash_presses = {pygame.K_SPACE: 0, pygame.K_RETURN: 0}
+        if self.phase == PLAYING:
+            self.step(mash_presses)
     
-    elif game_state == WAITING_CONNECTION:
-        if is_host:
-            # For host: check if client connected
-            draw_connection_screen(screen, connection_status)
-            if network_manager.client_connected:
-                game_state = PLAYING
-                
-            # Check back button
-            if mouse_clicked and back_button.check_click(mouse_pos, mouse_clicked):
-                network_manager.close()
-                game_state = MENU
-        else:
-            # For client: show IP input screen
-            draw_ip_input_screen(screen)
-            
-            # Check buttons
-            if mouse_clicked:
-                if back_button.check_click(mouse_pos, mouse_clicked):
-                    network_manager.close()
-                    game_state = MENU
-                elif connect_button.check_click(mouse_pos, mouse_clicked):
-                    success, message = network_manager.connect_to_server(opponent_ip)
-                    connection_status = message
-                    if success:
-                        game_state = PLAYING
-    
-    elif game_state == PLAYING:
+    def step(self, mash_presses):
+        """Advance the match one simulation tick"""
+        global sim_tick, clash_battle, winner
         keys = pygame.key.get_pressed()
-        
-        if clash_battle and clash_battle.active:
-            clash_battle.update(keys)
+        sim_tick += 1
+        local_player = players[local_index]
+        in_clash = clash_battle is not None and clash_battle.active
+        
+        if in_clash:
+            # Our mash presses count for our side; CPU fighters mash for theirs
+            local_side = clash_battle.side_of(local_player)
+            if local_side:
+                clash_battle.add_presses(local_side, sim_tick, mash_presses[CLASH_KEYS[local_side]])
+            for index, controller in ai_controllers.items():
+                side = clash_battle.side_of(players[index])
+                if side:
+                    clash_battle.add_presses(side, sim_tick, controller.mash())
         else:
             # Normal game updates
             if clash_battle and clash_battle.winner:
                 clash_battle = None  
                 
-            # Handle player movement based on whether we're host or client
-            if is_host:
-                # Host controls player1
-                if not player1.is_dead:
-                    # Create player 1's control dictionary
-                    player1_keys = {
-                        pygame.K_w: keys[pygame.K_w],
-                        pygame.K_s: keys[pygame.K_s],
-                        pygame.K_a: keys[pygame.K_a],
-                        pygame.K_d: keys[pygame.K_d],
-                        pygame.K_SPACE: keys[pygame.K_SPACE]  
-                    }
-                    player1.move(player1_keys, pygame.K_SPACE)
-                    player1.is_guarding = keys[pygame.K_g] and player1.guard_cooldown <= 0
-                
-                # Send player1 data and receive player2 data
-                network_manager.send_data(prepare_player_data(player1))
-                remote_data_list = network_manager.get_latest_data()
-                if remote_data_list:
-                    update_player_from_data(player2, remote_data_list[-1])  
-            else:
-                # Client controls player2
-                if not player2.is_dead:
-                    # Create player 2's control dictionary
-                    player2_keys = {
-                        pygame.K_w: keys[pygame.K_w],
-                        pygame.K_s: keys[pygame.K_s],
-                        pygame.K_a: keys[pygame.K_a],
-                        pygame.K_d: keys[pygame.K_d],
-                        pygame.K_SPACE: keys[pygame.K_SPACE]  
-                    }
-                    player2.move(player2_keys, pygame.K_SPACE)
-                    player2.is_guarding = keys[pygame.K_g] and player2.guard_cooldown <= 0
-                
-                # Send player2 data and receive player1 data
-                network_manager.send_data(prepare_player_data(player2))
-                remote_data_list = network_manager.get_latest_data()
-                if remote_data_list:
-                    update_player_from_data(player1, remote_data_list[-1])  
+            # We control the fighter in our network slot
+            if not local_player.is_dead:
+                # Create the local player's control dictionary
+                local_keys = {
+                    pygame.K_w: keys[pygame.K_w],
+                    pygame.K_s: keys[pygame.K_s],
+                    pygame.K_a: keys[pygame.K_a],
+                    pygame.K_d: keys[pygame.K_d],
+                    pygame.K_SPACE: keys[pygame.K_SPACE],
+                    pygame.K_g: keys[pygame.K_g]
+                }
+                apply_controls(local_player, local_keys)
             
-            # Check for hits and possible clash battle trigger locally 
-            result = player1.check_hit(player2)
-            if isinstance(result, ClashBattle):
-                clash_battle = result
-            result = player2.check_hit(player1)
-            if isinstance(result, ClashBattle):
-                clash_battle = result
+            # CPU fighters pick their controls within their own time budget
+            for index, controller in ai_controllers.items():
+                if not players[index].is_dead:
+                    apply_controls(players[index], controller.think(players, index))
+        profiler.lap('sim')
+        
+        # Send our data (with any desync checks due); during a clash only every few
+        # ticks, carrying the mash presses batched since the last message, except
+        # that the host announces a new clash straight away
+        if not in_clash or sim_tick % CLASH_BATCH_TICKS == 0 or clash_battle.announcement:
+            data = prepare_player_data(local_player)
+            data['tick'] = sim_tick
+            if in_clash:
+                data.update(clash_battle.outgoing())
+            data.update(desync_detector.outgoing())
+            network_manager.send_data(data)
+        profiler.lap('net_out')
+        
+        # Receive every other fighter's stream
+        for slot, stream in network_manager.get_player_streams().items():
+            index = slot_fighters.get(slot)
+            if index is None or index == local_index:
+                continue
+            for message in stream:
+                resync_state = desync_detector.receive(index, message)
+                if resync_state:
+                    apply_resync(resync_state)
+                if 'clash_start' in message and not is_host:
+                    start_announced_clash(message['clash_start'])
+                if clash_battle and clash_battle.active:
+                    clash_battle.receive(message)
+            update_player_from_data(players[index], stream[-1])  
+            # Clients follow the host's tick so checksums line up
+            if slot == HOST_SLOT and not is_host:
+                sim_tick = stream[-1].get('tick', sim_tick)
+        profiler.lap('net_in')
+        
+        # A clash the host just announced starts on this tick
+        in_clash = clash_battle is not None and clash_battle.active
+        if in_clash:
+            clash_battle.update(sim_tick)
+        else:
+            # Check for hits; only the host (or an offline game) starts a clash battle,
+            # clients wait for the host's announcement so everyone starts the same one
+            result = resolve_hits(players)
+            if result and (is_host or not network_manager.connected):
+                player1, player2 = result
+                clash_battle = ClashBattle(player1, player2, width, height)
+                clash_battle.start_tick = sim_tick
+                if network_manager.connected:
+                    clash_battle.announcement = {'tick': sim_tick,
+                                                 'fighters': (players.index(player1), players.index(player2))}
             
             # Update players
-            player1.update()
-            player2.update()
+            for player in players:
+                player.update()
             
-            # Check win condition
-            if player1.health <= 0:
-                player1.is_dead = True
-                game_state = GAME_OVER
-                winner = "Player 2"
-            elif player2.health <= 0:
-                player2.is_dead = True
-                game_state = GAME_OVER
-                winner = "Player 1"
-    
-    # Draw game elements
-    if game_state == PLAYING or game_state == GAME_OVER or game_state == ROUND_OVER:
-        player1.draw(screen)
-        player2.draw(screen)
+            # Check win condition: last fighter standing wins
+            for player in players:
+                if player.health <= 0:
+                    player.is_dead = True
+            alive = [player for player in players if not player.is_dead]
+            if len(alive) <= 1:
+                self.phase = GAME_OVER
+                if alive:
+                    winner = alive[0].name
+                    player_wins[players.index(alive[0])] += 1
+                else:
+                    winner = "Nobody"
         
+        desync_detector.record(sim_tick, players, clash_battle)
+        profiler.lap('sim')
+    
+    def draw_world(self, world):
+        dirty = []
+        for player in players:
+            dirty.extend(player.draw(world))
+        profiler.lap('fighters')
+        
+        # Every fighter's hit sparks in one batch, then all their blood in another
+        dirty.extend(draw_particle_effects(world, [player.hit_effects for player in players]))
+        dirty.extend(draw_particle_effects(world, [player.blood_effects for player in players]))
+
+        # Damage numbers float above the sparks and blood
+        for player in players:
+            for number in player.damage_numbers:
+                dirty.extend(number.draw(world))
+        profiler.lap('effects')
+        return dirty
+    
+    def draw(self, screen):
+        dirty = []
         if clash_battle and clash_battle.active:
-            clash_battle.draw(screen)
+            dirty.extend(clash_battle.draw(screen))
+        profiler.lap('effects')
         
         # Draw UI
-        player1.draw_health_bar(screen, 10, 10)
-        player2.draw_health_bar(screen, screen.get_width() - 210, 10)
+        dirty.extend(draw_health_bars(screen))
+        dirty.extend(draw_score(screen))
+        if self.phase == GAME_OVER:
+            dirty.extend(draw_game_over(screen, winner))
+        elif self.phase == ROUND_OVER:
+            dirty.extend(draw_round_over(screen, winner))
+        return dirty
+
+loading_scene = LoadingScene()
+menu_scene = MenuScene()
+host_lobby_scene = HostLobbyScene()
+join_scene = JoinScene()
+match_scene = MatchScene()
+scene = None
+clock = pygame.time.Clock()
+running = True
+clash_battle = None
+winner = None
+first_frame_ms = None
+
+def main():
+    """Open the window and run the game until it is closed"""
+    global show_debug_overlay, show_profiler, running, first_frame_ms
+    init_display()
+    change_scene(loading_scene)
+    
+    # Game loop
+    while running:
+        profiler.begin_frame()
+    
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    show_debug_overlay = not show_debug_overlay
+                if event.key == pygame.K_F4:
+                    show_profiler = not show_profiler
+                    profiler.set_enabled(show_profiler or profiler.recording)
+                if event.key == pygame.K_F5:
+                    # Record a frame trace until F5 is pressed again
+                    if profiler.recording:
+                        success, message = profiler.stop_recording(f"frame_trace_{int(time.time())}.csv")
+                        print(message)
+                        profiler.set_enabled(show_profiler)
+                    else:
+                        profiler.set_enabled(True)
+                        profiler.start_recording()
+                        print("Recording frame trace, press F5 again to save it")
+            scene.handle_event(event)
+        profiler.lap('events')
+
+        # Follow the clash camera; each zoom step has its own background, so redraw everything
+        zoom = clash_battle.zoom if clash_battle and clash_battle.active else 1.0
+        if camera.zoom == 1 and zoom > 1:
+            # Pivot on the fighters' midpoint as the zoom starts, held until it eases back out
+            camera.set_focus((clash_battle.player1.x + clash_battle.player2.x) / 2,
+                             (clash_battle.player1.y + clash_battle.player2.y) / 2)
+        if camera.set_zoom(zoom):
+            renderer.invalidate()
+            fighter_sprites.set_scale(camera.magnification)
+
+        # Update background
+        background.update()
+
+        # Restore what was drawn last frame from the cached background, then the crowd
+        renderer.begin()
+        renderer.mark_world(background.draw_crowd(renderer.world))
+        profiler.lap('background')
+    
+        # The current scene updates and draws only what it shows: the world at the
+        # render scale, then the HUD over it at full resolution
+        scene.update()
+        renderer.mark_world(scene.draw_world(renderer.world))
+        renderer.compose()
+        profiler.lap('present')
+        renderer.mark(scene.draw(screen))
+    
+        if show_debug_overlay:
+            renderer.mark(draw_debug_overlay(screen))
+        if show_profiler:
+            renderer.mark(profiler.draw(screen, width - 400, 100))
+        profiler.lap('hud')
+    
+        # Present only the areas that changed
+        renderer.present()
+        profiler.lap('present')
+        if first_frame_ms is None:
+            first_frame_ms = (time.perf_counter() - startup_time) * 1000
+            print(f"First frame after {first_frame_ms:.0f} ms")
+        profiler.end_frame()
+        clock.tick(60)
     
-    if game_state == GAME_OVER:
-        draw_game_over(screen, winner)
-    elif game_state == ROUND_OVER:
-        draw_round_over(screen, winner)
+        # Adapt effect detail to how long this frame's work took, not counting the wait
+        if quality_governor.record(clock.get_rawtime()):
+            settings = quality_governor.settings
+            print(f"Quality set to {settings['name']} ({quality_governor.average_ms:.1f} ms per frame)")
+            background.set_crowd_animation(settings['crowd_animation'])
+            # A new render scale redraws everything by itself
+            if not apply_render_scale():
+                renderer.invalidate()
     
-    pygame.display.flip()
-    clock.tick(60)
+    # Clean up before quitting
+    if asset_loader is not None:
+        asset_loader.shutdown()
+        audio_cache.close()
+        asset_bundle.close()
+    network_manager.close()
+    pygame.quit()
 
-# Clean up before quitting
-network_manager.close()
-pygame.quit()
-sys.exit()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
+    sys.exit()
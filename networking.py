@@ -1,8 +1,16 @@
 import socket
 import pickle
+import struct
 import threading
 import time
 
+# Every message on the wire is a length-prefixed pickle of (slot, data)
+HEADER = struct.Struct("!I")
+
+# Slot used for lobby/control messages rather than player streams
+CONTROL_SLOT = -1
+HOST_SLOT = 0
+
 class NetworkManager:
     def __init__(self):
         self.server = None
@@ -14,132 +22,272 @@ class NetworkManager:
         self.client_connected = False
         self.server_thread = None
         self.receive_thread = None
-        self.data_buffer = []
+        self.receive_threads = []
+        self.data_buffer = {}
+        self.control_buffer = []
         self.max_buffer_size = 10
         self.running = False
-        
-    def start_server(self):
-        """Start a game server that listens for one client"""
+        self.lock = threading.Lock()
+        self.send_locks = {}  # One per socket, so frames from different threads never interleave
+
+        # Player streams: the host is slot 0, clients get 1..max_clients
+        self.max_clients = 1
+        self.clients = {}
+        self.player_slot = None
+
+    def start_server(self, max_clients=1):
+        """Start a game server that listens for up to max_clients clients"""
         try:
             self.is_server = True
+            self.max_clients = max_clients
+            self.player_slot = HOST_SLOT
             self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server.bind((self.host, self.port))
             self.server.settimeout(1.0)  # Set timeout for accepting connections
-            self.server.listen(1)
+            self.server.listen(max_clients)
             self.running = True
-            
+
             # Start server thread
             self.server_thread = threading.Thread(target=self._server_loop)
             self.server_thread.daemon = True
             self.server_thread.start()
-            
+
             return True, "Server started successfully."
         except Exception as e:
             return False, f"Failed to start server: {str(e)}"
-    
+
     def connect_to_server(self, server_ip):
         """Connect to a game server as a client"""
         try:
             self.is_server = False
+            self.player_slot = None  # Assigned by the host's welcome message
             self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client.settimeout(5.0)  # 5 second timeout for connection
             self.client.connect((server_ip, self.port))
             self.client.settimeout(1.0)  # Set timeout for recv
+            self.send_locks[self.client] = threading.Lock()
             self.connected = True
             self.running = True
-            
+
             # Start receive thread
-            self.receive_thread = threading.Thread(target=self._client_receive_loop)
+            self.receive_thread = threading.Thread(target=self._receive_loop, args=(self.client, HOST_SLOT))
             self.receive_thread.daemon = True
             self.receive_thread.start()
-            
+
             return True, "Connected to server successfully."
         except Exception as e:
             return False, f"Failed to connect to server: {str(e)}"
-    
+
     def _server_loop(self):
-        """Background thread for server to accept and handle client connections"""
+        """Background thread for server to accept client connections"""
         try:
-            print("Waiting for client to connect...")
+            print("Waiting for clients to connect...")
             while self.running:
+                if len(self.clients) >= self.max_clients:
+                    time.sleep(0.1)
+                    continue
                 try:
-                    self.client, addr = self.server.accept()
-                    print(f"Client connected from {addr}")
+                    client, addr = self.server.accept()
+                    client.settimeout(1.0)
+                    slot = self._next_free_slot()
+                    print(f"Client connected from {addr} as player {slot + 1}")
+                    self.send_locks[client] = threading.Lock()
+                    with self.lock:
+                        self.clients[slot] = client
                     self.client_connected = True
                     self.connected = True
-                    
-                    # Start receiving data from client
-                    self._client_receive_loop()
-                    break
+                    self._send_message(client, CONTROL_SLOT, {'type': 'welcome', 'slot': slot})
+
+                    # Each client gets its own receive thread
+                    thread = threading.Thread(target=self._receive_loop, args=(client, slot))
+                    thread.daemon = True
+                    thread.start()
+                    self.receive_threads.append(thread)
                 except socket.timeout:
                     # This is expected due to the timeout we set
                     continue
                 except Exception as e:
-                    print(f"Error accepting client: {str(e)}")
+                    if self.running:
+                        print(f"Error accepting client: {str(e)}")
                     break
         except Exception as e:
             print(f"Server loop error: {str(e)}")
-        finally:
-            self.close()
-    
-    def _client_receive_loop(self):
-        """Background thread for receiving data from server or client"""
+
+    def _next_free_slot(self):
+        slot = HOST_SLOT + 1
+        while slot in self.clients:
+            slot += 1
+        return slot
+
+    def _receive_loop(self, sock, slot):
+        """Background thread for receiving framed messages from one peer"""
+        pending = b""
         try:
-            while self.running and self.connected:
+            while self.running:
                 try:
-                    data = self.client.recv(4096)
+                    data = sock.recv(4096)
                     if not data:
                         print("Connection closed by peer")
                         break
-                    
-                    # Deserialize the received data
-                    received_data = pickle.loads(data)
-                    
-                    # Add to buffer for game to process
-                    self.data_buffer.append(received_data)
-                    if len(self.data_buffer) > self.max_buffer_size:
-                        self.data_buffer.pop(0)  # Remove oldest data if buffer is full
+
+                    # Split the byte stream back into whole messages
+                    pending += data
+                    while len(pending) >= HEADER.size:
+                        (length,) = HEADER.unpack_from(pending)
+                        if len(pending) < HEADER.size + length:
+                            break
+                        payload = pending[HEADER.size:HEADER.size + length]
+                        pending = pending[HEADER.size + length:]
+                        sender, received_data = pickle.loads(payload)
+                        if self.is_server:
+                            # Clients can only speak for their own slot
+                            if sender == slot:
+                                frame = HEADER.pack(length) + payload
+                            else:
+                                sender = slot
+                                frame = self._encode(slot, received_data)
+                            self._relay(sender, frame)
+                        self._store(sender, received_data)
                 except socket.timeout:
                     # This is expected due to the timeout we set
                     continue
                 except Exception as e:
-                    print(f"Error receiving data: {str(e)}")
+                    if self.running:
+                        print(f"Error receiving data: {str(e)}")
                     break
         except Exception as e:
             print(f"Receive loop error: {str(e)}")
         finally:
-            self.connected = False
-            self.client_connected = False
-    
+            if self.is_server:
+                self._drop_client(slot, sock)
+            else:
+                self.connected = False
+                self.client_connected = False
+
+    def _store(self, slot, data):
+        """Queue a received message for the game to process"""
+        with self.lock:
+            if slot == CONTROL_SLOT:
+                if data.get('type') == 'welcome':
+                    self.player_slot = data['slot']
+                self.control_buffer.append(data)
+                return
+            buffer = self.data_buffer.setdefault(slot, [])
+            buffer.append(data)
+            if len(buffer) > self.max_buffer_size:
+                buffer.pop(0)  # Remove oldest data if buffer is full
+
+    def _drop_client(self, slot, sock):
+        """Forget a client whose connection failed or closed, and close its socket"""
+        with self.lock:
+            if self.clients.get(slot) is sock:
+                del self.clients[slot]
+            self.client_connected = bool(self.clients)
+        self.send_locks.pop(sock, None)
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _relay(self, sender, frame):
+        """Forward a client's stream to every other client"""
+        for slot, client in list(self.clients.items()):
+            if slot != sender:
+                try:
+                    self._send_frame(client, frame)
+                except OSError:
+                    self._drop_client(slot, client)
+
+    @staticmethod
+    def _encode(slot, data):
+        payload = pickle.dumps((slot, data))
+        return HEADER.pack(len(payload)) + payload
+
+    def _send_frame(self, sock, frame):
+        """Send one whole frame; receive threads relay on the same sockets the game sends on"""
+        lock = self.send_locks.get(sock)
+        if lock is None:
+            lock = self.send_locks.setdefault(sock, threading.Lock())
+        with lock:
+            sock.sendall(frame)
+
+    def _send_message(self, sock, slot, data):
+        self._send_frame(sock, self._encode(slot, data))
+
     def send_data(self, data):
-        """Send data to the connected client/server"""
+        """Send our player's data to the connected client(s)/server"""
         if not self.connected:
             return False, "Not connected"
-        
+
+        if self.is_server:
+            # One dead client must not stop the send to the others
+            frame = self._encode(HOST_SLOT, data)
+            for slot, client in list(self.clients.items()):
+                try:
+                    self._send_frame(client, frame)
+                except OSError as e:
+                    print(f"Dropping player {slot + 1}: {str(e)}")
+                    self._drop_client(slot, client)
+            return True, "Data sent successfully"
+
         try:
-            # Serialize the data
-            serialized_data = pickle.dumps(data)
-            self.client.send(serialized_data)
+            self._send_message(self.client, self.player_slot, data)
             return True, "Data sent successfully"
         except Exception as e:
             self.connected = False
             return False, f"Failed to send data: {str(e)}"
-    
+
+    def send_control(self, data):
+        """Broadcast a lobby/control message from the host to every client"""
+        if not self.is_server:
+            return False, "Only the host sends control messages"
+        frame = self._encode(CONTROL_SLOT, data)
+        for slot, client in list(self.clients.items()):
+            try:
+                self._send_frame(client, frame)
+            except OSError:
+                self._drop_client(slot, client)
+        return True, "Control message sent"
+
     def get_latest_data(self):
-        """Get the latest data from the buffer and clear it"""
-        if not self.data_buffer:
+        """Get all buffered player data from every peer and clear it"""
+        streams = self.get_player_streams()
+        if not streams:
             return None
-        
-        # Get the latest data
-        latest_data = self.data_buffer.copy()
-        self.data_buffer.clear()
+
+        latest_data = []
+        for messages in streams.values():
+            latest_data.extend(messages)
         return latest_data
-    
+
+    def get_player_streams(self):
+        """Get buffered data per player slot and clear it"""
+        with self.lock:
+            streams = {slot: messages for slot, messages in self.data_buffer.items() if messages}
+            self.data_buffer = {}
+        return streams
+
+    def get_control_messages(self):
+        """Get buffered control messages and clear them"""
+        with self.lock:
+            messages = self.control_buffer
+            self.control_buffer = []
+        return messages
+
+    def player_count(self):
+        """Number of player slots currently filled, including the host"""
+        return 1 + len(self.clients)
+
+    def player_slots(self):
+        """Filled player slots in order, host first; slots freed by departed clients leave gaps"""
+        with self.lock:
+            return [HOST_SLOT] + sorted(self.clients)
+
     def close(self):
         """Close all connections and stop threads"""
         self.running = False
-        
+
         # Close client socket
         if self.client:
             try:
@@ -147,7 +295,15 @@ class NetworkManager:
             except:
                 pass
             self.client = None
-        
+
+        # Close connections to our clients
+        for client in list(self.clients.values()):
+            try:
+                client.close()
+            except:
+                pass
+        self.clients = {}
+
         # Close server socket
         if self.server:
             try:
@@ -155,17 +311,23 @@ class NetworkManager:
             except:
                 pass
             self.server = None
-        
+
+        self.send_locks = {}
         self.connected = False
         self.client_connected = False
-        
+
         # Wait for threads to terminate
         if self.server_thread and self.server_thread.is_alive():
             self.server_thread.join(timeout=1.0)
-        
+
         if self.receive_thread and self.receive_thread.is_alive():
             self.receive_thread.join(timeout=1.0)
-        
+
+        for thread in self.receive_threads:
+            if thread.is_alive():
+                thread.join(timeout=1.0)
+        self.receive_threads = []
+
         return True, "Network connections closed."
 
     def get_server_ip(self):
@@ -0,0 +1,51 @@
+import pygame
+
+SIZE_STEPS = 2  # Particle sizes are rounded to half pixels
+ALPHA_LEVELS = 32  # Fade steps baked per sprite
+
+# Particle colors
+SPARK_COLOR = (255, 215, 0)
+FLASH_COLOR = (255, 255, 200)
+DROP_COLOR = (180, 0, 0)
+SPLAT_COLOR = (140, 0, 0)
+
+class ParticleAtlas:
+    """Pre-rendered particle sprites at quantized sizes and fade levels.
+
+    Sparks, flashes and blood drops are circles and splats are flattened
+    ellipses. Each (kind, size, alpha) combination is drawn once, so the
+    effects only look sprites up and blit them.
+    """
+    def __init__(self):
+        self.sprites = {}
+
+    def get(self, kind, size, alpha):
+        """Sprite for a particle of a kind and radius, faded to alpha (0-255)"""
+        size_key = max(1, round(size * SIZE_STEPS))
+        alpha_key = min(ALPHA_LEVELS, max(0, round(alpha * ALPHA_LEVELS / 255)))
+        key = (kind, size_key, alpha_key)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self._render(kind, size_key / SIZE_STEPS, alpha_key * 255 // ALPHA_LEVELS)
+            self.sprites[key] = sprite
+        return sprite
+
+    def warm(self, kind, sizes):
+        """Render every fade level of a kind at the given radii ahead of time"""
+        for size in sizes:
+            for level in range(ALPHA_LEVELS + 1):
+                self.get(kind, size, level * 255 / ALPHA_LEVELS)
+
+    def _render(self, kind, size, alpha):
+        diameter = int(size * 2)
+        sprite = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
+        if kind == 'splat':
+            # Elongated splat, flattened onto the ground
+            flat = size * 0.6
+            pygame.draw.ellipse(sprite, (*SPLAT_COLOR, alpha), (0, size - flat / 2, size * 2, flat))
+        else:
+            color = {'spark': SPARK_COLOR, 'flash': FLASH_COLOR, 'drop': DROP_COLOR}[kind]
+            pygame.draw.circle(sprite, (*color, alpha), (size, size), size)
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha()
+        return sprite
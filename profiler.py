@@ -0,0 +1,145 @@
+from collections import deque
+import csv
+import json
+import time
+import pygame
+from quality import FRAME_BUDGET_MS
+from text_cache import get_font
+
+# Main loop phases in the order they are shown
+PHASES = ['events', 'net_in', 'sim', 'background', 'fighters', 'effects', 'hud', 'net_out', 'present']
+PHASE_COLORS = {
+    'events': (200, 200, 200),
+    'net_in': (80, 160, 255),
+    'sim': (255, 215, 0),
+    'background': (120, 200, 120),
+    'fighters': (255, 120, 60),
+    'effects': (220, 40, 40),
+    'hud': (200, 120, 255),
+    'net_out': (40, 220, 220),
+    'present': (255, 255, 255),
+}
+PROFILE_WINDOW = 240  # Frames kept for the rolling stats and the graph
+GRAPH_HEIGHT = 120
+GRAPH_SCALE = 4  # Graph pixels per millisecond
+STAT_COLUMNS = [110, 170, 230, 290]  # x of the min, mean, p95 and max columns
+
+class FrameProfiler:
+    """Times each phase of the main loop while enabled.
+
+    Call begin_frame() at the top of the loop, lap(phase) after each piece
+    of work to charge the time since the last lap to that phase (a phase may
+    be charged several times a frame) and end_frame() before waiting for the
+    next frame. While disabled every call returns straight away.
+    """
+    def __init__(self, window=PROFILE_WINDOW):
+        self.enabled = False
+        self.recording = False
+        self.history = deque(maxlen=window)  # Per-frame {phase: ms}
+        self.trace = []
+        self.frame = None
+        self.last = 0.0
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.frame = None
+        if not enabled:
+            self.history.clear()
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame = dict.fromkeys(PHASES, 0.0)
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        """Charge the time since the last lap to a phase"""
+        if self.frame is None:
+            return
+        now = time.perf_counter()
+        self.frame[phase] += (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self):
+        if self.frame is None:
+            return
+        self.history.append(self.frame)
+        if self.recording:
+            self.trace.append(self.frame)
+        self.frame = None
+
+    def stats(self):
+        """Rolling (min, mean, p95, max) milliseconds for each phase and the frame total"""
+        result = {}
+        for phase in PHASES + ['total']:
+            if phase == 'total':
+                samples = sorted(sum(frame.values()) for frame in self.history)
+            else:
+                samples = sorted(frame[phase] for frame in self.history)
+            if not samples:
+                result[phase] = (0.0, 0.0, 0.0, 0.0)
+                continue
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            result[phase] = (samples[0], sum(samples) / len(samples), p95, samples[-1])
+        return result
+
+    def start_recording(self):
+        self.recording = True
+        self.trace = []
+
+    def stop_recording(self, path):
+        """Stop recording and write the trace; returns (success, message)"""
+        self.recording = False
+        trace, self.trace = self.trace, []
+        try:
+            self.save(path, trace)
+        except OSError as e:
+            return False, f"Could not write trace: {e}"
+        return True, f"Wrote {len(trace)} frames to {path}"
+
+    def save(self, path, frames=None):
+        """Write frames (default the rolling window) as CSV or, for .jsonl paths, JSON lines"""
+        frames = list(self.history) if frames is None else frames
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.jsonl'):
+                for index, frame in enumerate(frames):
+                    f.write(json.dumps({'frame': index, **frame}) + '\n')
+            else:
+                writer = csv.writer(f)
+                writer.writerow(['frame'] + PHASES)
+                for index, frame in enumerate(frames):
+                    writer.writerow([index] + [f"{frame[phase]:.3f}" for phase in PHASES])
+
+    def draw(self, screen, x, y):
+        """Draw the stacked frame-time graph and stats table; returns the screen rects drawn"""
+        font = get_font(20)
+        row_height = font.get_linesize()
+        width = self.history.maxlen
+        panel = pygame.Surface((max(width, 330) + 20, GRAPH_HEIGHT + row_height * (len(PHASES) + 2) + 30))
+        panel.fill((0, 0, 0))
+        panel.set_alpha(200)
+
+        # One column per frame, phases stacked bottom up
+        base = GRAPH_HEIGHT + 10
+        for column, frame in enumerate(self.history):
+            top = base
+            for phase in PHASES:
+                bar = frame[phase] * GRAPH_SCALE
+                if bar >= 1:
+                    pygame.draw.line(panel, PHASE_COLORS[phase], (10 + column, top), (10 + column, max(10, top - bar)))
+                top -= bar
+        budget_y = base - FRAME_BUDGET_MS * GRAPH_SCALE
+        pygame.draw.line(panel, (255, 0, 0), (10, budget_y), (10 + width, budget_y))
+
+        # Rolling stats per phase
+        text_y = base + 10
+        panel.blit(font.render("ms", True, (255, 255, 255)), (10, text_y))
+        for column_x, heading in zip(STAT_COLUMNS, ["min", "mean", "p95", "max"]):
+            panel.blit(font.render(heading, True, (255, 255, 255)), (column_x, text_y))
+        for phase, values in self.stats().items():
+            text_y += row_height
+            color = PHASE_COLORS.get(phase, (255, 255, 255))
+            panel.blit(font.render(phase, True, color), (10, text_y))
+            for column_x, value in zip(STAT_COLUMNS, values):
+                panel.blit(font.render(f"{value:.2f}", True, color), (column_x, text_y))
+        return [screen.blit(panel, (x, y))]
@@ -0,0 +1,53 @@
+FRAME_BUDGET_MS = 1000 / 60
+SAMPLE_WINDOW = 60  # Frames averaged before deciding anything
+DOWNGRADE_RATIO = 0.9  # Step down once frames use this share of the budget...
+UPGRADE_RATIO = 0.5  # ...and only step back up well below it
+
+# Quality levels from best to cheapest; render_scale is the share of the screen's
+# resolution the arena is drawn at
+QUALITY_LEVELS = [
+    {'name': 'high', 'blood_particles': (8, 12), 'hit_particles': 8, 'trail_length': 5,
+     'crowd_animation': True, 'bar_shine': True, 'render_scale': 1.0},
+    {'name': 'medium', 'blood_particles': (5, 8), 'hit_particles': 5, 'trail_length': 3,
+     'crowd_animation': True, 'bar_shine': True, 'render_scale': 0.875},
+    {'name': 'low', 'blood_particles': (3, 4), 'hit_particles': 3, 'trail_length': 2,
+     'crowd_animation': False, 'bar_shine': False, 'render_scale': 0.75},
+]
+
+class QualityGovernor:
+    """Steps render quality down when frames run over budget and back up when there is room.
+
+    Frame times are averaged over a window of frames. After every change the
+    window starts over, so one level gets a fair measurement before the next
+    step, and the gap between the two thresholds keeps it from flapping.
+    """
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, window=SAMPLE_WINDOW):
+        self.budget_ms = budget_ms
+        self.window = window
+        self.level = 0
+        self.samples = []
+        self.average_ms = 0.0
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+
+    def set_level(self, level):
+        self.level = max(0, min(len(QUALITY_LEVELS) - 1, level))
+        self.samples = []
+
+    def record(self, frame_ms):
+        """Add one frame's work time; returns True when the quality level changed"""
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.window:
+            return False
+
+        self.average_ms = sum(self.samples) / len(self.samples)
+        self.samples = []
+        if self.average_ms > self.budget_ms * DOWNGRADE_RATIO and self.level < len(QUALITY_LEVELS) - 1:
+            self.set_level(self.level + 1)
+            return True
+        if self.average_ms < self.budget_ms * UPGRADE_RATIO and self.level > 0:
+            self.set_level(self.level - 1)
+            return True
+        return False
@@ -0,0 +1,229 @@
+from fractions import Fraction
+import pygame
+
+FULL_UPDATE_RATIO = 0.5  # Share of the screen above which one full flip beats many small updates
+MAX_DIRTY_RECTS = 96  # More rects than this are presented with a full flip as well
+MAX_SCALE_STEP = 8  # Largest source step that dirty rects are snapped to when scaling
+RENDER_SCALE_STEP = Fraction(1, 8)  # Render scales snap to these steps so world rects scale in whole steps
+MIN_RENDER_SCALE = Fraction(1, 2)  # Lowest internal resolution, as a share of the screen's
+
+def letterbox(size, window_size):
+    """Largest rect of the render size's aspect ratio centered in the window"""
+    scale = min(window_size[0] / size[0], window_size[1] / size[1])
+    view_width = round(size[0] * scale)
+    view_height = round(size[1] * scale)
+    return pygame.Rect((window_size[0] - view_width) // 2, (window_size[1] - view_height) // 2,
+                       view_width, view_height)
+
+def fold(rects, more):
+    """rects plus more, with each of more merged into a rect it overlaps so shared areas count once"""
+    rects = list(rects)
+    for rect in more:
+        index = rect.collidelist(rects)
+        if index >= 0:
+            rects[index] = rects[index].union(rect)
+        else:
+            rects.append(rect)
+    return rects
+
+class DirtyRenderer:
+    """Redraws and presents only the parts of the screen that changed.
+
+    Every frame starts by restoring last frame's dirty rects from the cached
+    static background. Everything drawn on top of it is marked with the
+    rects it covered, and only the union of last frame's and this frame's
+    rects is pushed to the display, unless that is most of the screen.
+
+    The world (background, fighters and effects) is drawn on its own
+    surface at the render scale, a share of the screen's resolution that
+    can change at runtime. At scale 1 that surface is the screen itself.
+    Otherwise compose() scales the world's changed areas onto the screen,
+    and the HUD is drawn on top at full resolution. The camera maps arena
+    coordinates to the world surface, so gameplay never sees the scale.
+
+    When the window is a different size from the screen we draw on, the
+    frame is scaled into a letterboxed viewport as it is presented. Dirty
+    rects are snapped to whole steps of the scale ratio so scaling them one
+    by one gives the same pixels as scaling the whole frame.
+    """
+    def __init__(self, screen, background, window=None, camera=None):
+        self.screen = screen
+        self.background = background
+        self.camera = camera
+        self.screen_rect = screen.get_rect()
+        self.previous = []
+        self.current = []
+        self.full_redraw = True
+        self.full_updates = 0
+        self.partial_updates = 0
+
+        self.render_scale = Fraction(1)
+        self.world = screen
+        self.world_rect = self.screen_rect
+
+        self.window = window if window is not None else screen
+        self.scaled = self.window is not screen
+        self.viewport = letterbox(self.screen_rect.size, self.window.get_size())
+        if self.scaled:
+            self.view = self.window.subsurface(self.viewport)
+            self.ratio_x = Fraction(self.viewport.width, self.screen_rect.width)
+            self.ratio_y = Fraction(self.viewport.height, self.screen_rect.height)
+            self.piecewise = max(self.ratio_x.denominator, self.ratio_y.denominator) <= MAX_SCALE_STEP
+
+    def invalidate(self):
+        """Redraw and present the whole screen on the next frame"""
+        self.full_redraw = True
+
+    def set_render_scale(self, scale):
+        """Draw the world at a share of the screen's resolution; returns True when it changed.
+
+        The scale is rounded to a step of RENDER_SCALE_STEP between
+        MIN_RENDER_SCALE and 1, so world and screen rects line up in whole
+        pixels.
+        """
+        scale = Fraction(round(scale / RENDER_SCALE_STEP)) * RENDER_SCALE_STEP
+        scale = min(Fraction(1), max(MIN_RENDER_SCALE, scale))
+        if scale == self.render_scale:
+            return False
+        self.render_scale = scale
+        if scale == 1:
+            self.world = self.screen
+        else:
+            size = (int(self.screen_rect.width * scale), int(self.screen_rect.height * scale))
+            self.world = pygame.Surface(size).convert(self.screen)
+        self.world_rect = self.world.get_rect()
+        if self.camera is not None:
+            self.camera.set_scale(float(scale))
+        self.invalidate()
+        return True
+
+    def window_to_screen(self, pos):
+        """Map a window position (e.g. the mouse) to screen coordinates"""
+        if not self.scaled:
+            return pos
+        return (int((pos[0] - self.viewport.x) * self.screen_rect.width / self.viewport.width),
+                int((pos[1] - self.viewport.y) * self.screen_rect.height / self.viewport.height))
+
+    def begin(self):
+        """Wipe last frame's drawing back to the static background"""
+        static = self.background.static_layer()
+        if self.full_redraw:
+            self.world.blit(static, (0, 0))
+        else:
+            for rect in self.previous:
+                rect = self._world_rect(rect)
+                self.world.blit(static, rect, rect)
+        self.current = []
+
+    def mark_world(self, rects):
+        """Record world surface areas drawn this frame; call before compose()"""
+        if self.world is self.screen:
+            self.mark(rects)
+            return
+        for rect in rects:
+            rect = self.world_rect.clip(rect)
+            if rect.width and rect.height:
+                self.current.append(self._screen_rect(rect))
+
+    def compose(self):
+        """Scale the world's changed areas onto the screen, ready for the HUD to be drawn on top"""
+        if self.world is self.screen:
+            return
+        # Last frame's rects too, as they were wiped back to the background
+        rects = fold(self.current, self.previous)
+        area = sum(rect.width * rect.height for rect in rects)
+        screen_area = self.screen_rect.width * self.screen_rect.height
+        if self.full_redraw or len(rects) > MAX_DIRTY_RECTS or area > screen_area * FULL_UPDATE_RATIO:
+            pygame.transform.scale(self.world, self.screen_rect.size, self.screen)
+            return
+        for rect in rects:
+            pygame.transform.scale(self.world.subsurface(self._world_rect(rect)), rect.size,
+                                   self.screen.subsurface(rect))
+
+    def mark(self, rects):
+        """Record screen areas drawn this frame"""
+        for rect in rects:
+            rect = self.screen_rect.clip(rect)
+            if rect.width and rect.height:
+                if self.world is not self.screen:
+                    rect = self._snap(rect)
+                self.current.append(rect)
+
+    def present(self):
+        """Push this frame to the display, falling back to a full flip for big changes"""
+        # Fold last frame's rects into the ones they overlap so moved things count once
+        rects = fold(self.current, self.previous)
+        area = sum(rect.width * rect.height for rect in rects)
+        screen_area = self.screen_rect.width * self.screen_rect.height
+        full = self.full_redraw or len(rects) > MAX_DIRTY_RECTS or area > screen_area * FULL_UPDATE_RATIO
+        if self.scaled:
+            if self.full_redraw:
+                # Clear the letterbox bars
+                self.window.fill((0, 0, 0))
+            if full or not self.piecewise:
+                # Whole frame at once for big changes, and for ratios that can't be
+                # scaled piece by piece without seams
+                pygame.transform.scale(self.screen, self.viewport.size, self.view)
+                rects = [self._window_rect(rect) for rect in rects]
+            else:
+                rects = [self._scale_rect(rect) for rect in rects]
+
+        if full:
+            pygame.display.flip()
+            self.full_updates += 1
+        else:
+            pygame.display.update(rects)
+            self.partial_updates += 1
+        self.full_redraw = False
+        self.previous = self.current
+        self.current = []
+
+    def _snap(self, rect):
+        """Grow a screen rect to whole steps of the render scale"""
+        step = self.render_scale.denominator
+        left = rect.left // step * step
+        top = rect.top // step * step
+        right = min(self.screen_rect.width, -(-rect.right // step) * step)
+        bottom = min(self.screen_rect.height, -(-rect.bottom // step) * step)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def _screen_rect(self, rect):
+        """Snapped screen rect covering a world rect"""
+        left = int(rect.left / self.render_scale)
+        top = int(rect.top / self.render_scale)
+        right = -int(-rect.right / self.render_scale)
+        bottom = -int(-rect.bottom / self.render_scale)
+        return self._snap(pygame.Rect(left, top, right - left, bottom - top))
+
+    def _world_rect(self, rect):
+        """World rect under a snapped screen rect"""
+        if self.world is self.screen:
+            return rect
+        left = int(rect.left * self.render_scale)
+        top = int(rect.top * self.render_scale)
+        right = min(self.world_rect.width, int(rect.right * self.render_scale))
+        bottom = min(self.world_rect.height, int(rect.bottom * self.render_scale))
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def _window_rect(self, rect):
+        """Window rect covering a screen rect"""
+        left = self.viewport.x + int(rect.left * self.ratio_x)
+        top = self.viewport.y + int(rect.top * self.ratio_y)
+        right = self.viewport.x + -int(-rect.right * self.ratio_x)
+        bottom = self.viewport.y + -int(-rect.bottom * self.ratio_y)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def _scale_rect(self, rect):
+        """Scale one dirty rect into the viewport; returns the window rect it covered"""
+        step_x = self.ratio_x.denominator
+        step_y = self.ratio_y.denominator
+        left = rect.left // step_x * step_x
+        top = rect.top // step_y * step_y
+        right = min(self.screen_rect.width, -(-rect.right // step_x) * step_x)
+        bottom = min(self.screen_rect.height, -(-rect.bottom // step_y) * step_y)
+        source = pygame.Rect(left, top, right - left, bottom - top)
+        target = pygame.Rect(int(left * self.ratio_x), int(top * self.ratio_y), 0, 0)
+        target.width = int(right * self.ratio_x) - target.x
+        target.height = int(bottom * self.ratio_y) - target.y
+        pygame.transform.scale(self.screen.subsurface(source), target.size, self.view.subsurface(target))
+        return target.move(self.viewport.topleft)
@@ -0,0 +1,59 @@
+import math
+
+class SpatialHash:
+    """Uniform grid that buckets objects by position for cheap neighbour queries"""
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def clear(self):
+        """Remove every object from the grid"""
+        self.cells.clear()
+
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, obj, x, y):
+        """Add an object to the cell containing (x, y)"""
+        cell = self._cell(x, y)
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            self.cells[cell] = [obj]
+        else:
+            bucket.append(obj)
+
+    def rebuild(self, objects):
+        """Clear the grid and insert every object at its own x/y"""
+        self.cells.clear()
+        for obj in objects:
+            self.insert(obj, obj.x, obj.y)
+
+    def query(self, x, y, radius):
+        """Yield objects in every cell overlapping the square around (x, y)"""
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    yield from bucket
+
+    def pairs(self, radius):
+        """Yield each unordered pair of objects that may lie within radius of each other"""
+        span = max(1, math.ceil(radius / self.cell_size))
+        for (cx, cy), bucket in self.cells.items():
+            # Pairs inside the same cell
+            for i in range(len(bucket)):
+                for j in range(i + 1, len(bucket)):
+                    yield bucket[i], bucket[j]
+
+            # Pairs with neighbouring cells, visiting each cell pair only once
+            for dx in range(-span, span + 1):
+                for dy in range(-span, span + 1):
+                    if (dx, dy) <= (0, 0):
+                        continue
+                    other = self.cells.get((cx + dx, cy + dy))
+                    if other:
+                        for a in bucket:
+                            for b in other:
+                                yield a, b
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+import pygame
+
+SPRITE_RADIUS = 72  # Half the size of the scratch surface poses are drawn on
+
+class SpriteCache:
+    """Bounded cache of pre-rendered poses.
+
+    Each pose is drawn once with the caller's render function onto a scratch
+    surface centered on the fighter, cropped to what was drawn and converted
+    for fast alpha blits. Least recently used poses are dropped once the cache
+    is full.
+    """
+    def __init__(self, max_sprites=1024, scale=1.0):
+        self.max_sprites = max_sprites
+        self.scale = scale
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.sprites.clear()
+
+    def set_scale(self, scale):
+        """Change the scale sprites are rendered at, dropping every cached sprite"""
+        if scale != self.scale:
+            self.scale = scale
+            self.clear()
+
+    def get(self, key, render):
+        """Return (surface, (dx, dy)) for a pose, rendering it on first use.
+
+        render(surface, x, y) draws the pose centered on (x, y). The offset is
+        where the surface goes relative to the fighter's position.
+        """
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        sprite = self._render(render)
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def warm(self, entries):
+        """Render (key, render) pairs ahead of time while there is room left"""
+        for key, render in entries:
+            if len(self.sprites) >= self.max_sprites:
+                break
+            if key not in self.sprites:
+                self.sprites[key] = self._render(render)
+
+    def _render(self, render):
+        size = SPRITE_RADIUS * 2
+        scratch = pygame.Surface((size, size), pygame.SRCALPHA)
+        render(scratch, SPRITE_RADIUS, SPRITE_RADIUS)
+
+        # Keep only the drawn part so cached poses stay small
+        bounds = scratch.get_bounding_rect()
+        if bounds.width == 0 or bounds.height == 0:
+            bounds = pygame.Rect(SPRITE_RADIUS, SPRITE_RADIUS, 1, 1)
+        surface = scratch.subsurface(bounds).copy()
+        dx = bounds.x - SPRITE_RADIUS
+        dy = bounds.y - SPRITE_RADIUS
+
+        if self.scale != 1.0:
+            scaled_size = (max(1, round(bounds.width * self.scale)), max(1, round(bounds.height * self.scale)))
+            surface = pygame.transform.smoothscale(surface, scaled_size)
+            dx = round(dx * self.scale)
+            dy = round(dy * self.scale)
+
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface, (dx, dy)
@@ -0,0 +1,98 @@
+import math
+from collections import namedtuple
+
+SWING_RANGE = 180  # Degrees covered by one swing
+DIRECTIONS = (0, 45, 90, 135, 180, 225, 270, 315)
+
+# Sword geometry relative to the fighter's center
+SwordPose = namedtuple('SwordPose', ['angle', 'handle_dx', 'handle_dy', 'tip_dx', 'tip_dy'])
+
+def view_for_direction(direction):
+    """Return (is_side_view, facing_left) for a facing direction in degrees"""
+    is_side_view = 135 <= direction <= 225 or (direction >= 315 or direction <= 45)
+    facing_left = 135 <= direction <= 225
+    return is_side_view, facing_left
+
+def segment_distance_sq(px, py, ax, ay, bx, by):
+    """Squared distance from point (px, py) to the segment a-b"""
+    abx = bx - ax
+    aby = by - ay
+    apx = px - ax
+    apy = py - ay
+    length_sq = abx * abx + aby * aby
+    if length_sq == 0:
+        t = 0.0
+    else:
+        t = max(0.0, min(1.0, (apx * abx + apy * aby) / length_sq))
+    dx = apx - abx * t
+    dy = apy - aby * t
+    return dx * dx + dy * dy
+
+class SwordArcTable:
+    """Per-direction, per-frame sword geometry shared by hit detection and drawing"""
+    def __init__(self, handle_length, sword_length, attack_duration):
+        self.handle_length = handle_length
+        self.sword_length = sword_length
+        self.attack_duration = attack_duration
+        self.swing = {}
+        self.rest = {}
+        for direction in DIRECTIONS:
+            self._build(direction)
+
+    def _pose(self, angle):
+        radians = math.radians(angle)
+        cos_a = math.cos(radians)
+        sin_a = math.sin(radians)
+        tip_length = self.handle_length + self.sword_length
+        return SwordPose(angle,
+                         cos_a * self.handle_length, sin_a * self.handle_length,
+                         cos_a * tip_length, sin_a * tip_length)
+
+    def _build(self, direction):
+        """Precompute every attack frame and the rest pose for one direction"""
+        is_side_view, facing_left = view_for_direction(direction)
+
+        # Side views swing across the front of the fighter
+        if is_side_view:
+            base_angle = -90 if facing_left else 90
+            rest_angle = -45 if facing_left else 45
+        else:
+            base_angle = direction
+            rest_angle = direction + 45
+
+        frames = []
+        for frame in range(self.attack_duration + 1):
+            # Same easing as the drawn swing
+            progress = frame / self.attack_duration
+            swing_offset = SWING_RANGE * (1 - (1 - progress) ** 2)
+            frames.append(self._pose(base_angle - swing_offset))
+
+        self.swing[direction] = frames
+        self.rest[direction] = self._pose(rest_angle)
+
+    def swing_pose(self, direction, frame):
+        """Sword pose at an attack frame"""
+        frames = self.swing.get(direction)
+        if frames is None:
+            self._build(direction)
+            frames = self.swing[direction]
+        return frames[min(max(frame, 0), self.attack_duration)]
+
+    def rest_pose(self, direction):
+        """Sword pose while not attacking"""
+        pose = self.rest.get(direction)
+        if pose is None:
+            self._build(direction)
+            pose = self.rest[direction]
+        return pose
+
+_tables = {}
+
+def get_arc_table(handle_length, sword_length, attack_duration):
+    """Shared table for a sword shape, built once on first use"""
+    key = (handle_length, sword_length, attack_duration)
+    table = _tables.get(key)
+    if table is None:
+        table = SwordArcTable(handle_length, sword_length, attack_duration)
+        _tables[key] = table
+    return table
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import pygame
+
+MAX_TEXT_SURFACES = 256  # Rendered strings kept around, least recently used dropped first
+ALPHA_STEP = 25  # Faded text is cached at alpha levels this far apart
+
+_fonts = {}
+_texts = OrderedDict()
+
+def get_font(size):
+    """The default font at a size, loaded once and shared"""
+    font = _fonts.get(size)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.Font(None, size)
+        _fonts[size] = font
+    return font
+
+def render_text(text, size, color, antialias=True, shadow=None):
+    """Rendered text, cached by everything that affects its pixels.
+
+    shadow is an optional (color, (dx, dy)) drawn behind the text; the
+    returned surface then has the text at its top-left and grows by the
+    shadow offset. The surface is shared, so callers must not modify it.
+    """
+    key = (text, size, color, antialias, shadow)
+    surface = _texts.get(key)
+    if surface is not None:
+        _texts.move_to_end(key)
+        return surface
+
+    font = get_font(size)
+    surface = font.render(text, antialias, color)
+    if shadow is not None:
+        shadow_color, (dx, dy) = shadow
+        shadow_surface = font.render(text, antialias, shadow_color)
+        combined = pygame.Surface((surface.get_width() + dx, surface.get_height() + dy), pygame.SRCALPHA)
+        combined.blit(shadow_surface, (dx, dy))
+        combined.blit(surface, (0, 0))
+        surface = combined
+
+    _remember(key, surface)
+    return surface
+
+def render_faded_text(text, size, color, alpha):
+    """Rendered text at a translucency, cached like render_text.
+
+    alpha is rounded to a step of ALPHA_STEP, so text fading out over many
+    frames shares a handful of surfaces instead of copying one every frame.
+    """
+    alpha = min(255, round(alpha / ALPHA_STEP) * ALPHA_STEP)
+    if alpha >= 255:
+        return render_text(text, size, color)
+    key = (text, size, color, alpha)
+    surface = _texts.get(key)
+    if surface is not None:
+        _texts.move_to_end(key)
+        return surface
+
+    # Faded copy, so the shared opaque text stays untouched
+    surface = render_text(text, size, color).copy()
+    surface.set_alpha(alpha)
+    _remember(key, surface)
+    return surface
+
+def _remember(key, surface):
+    _texts[key] = surface
+    if len(_texts) > MAX_TEXT_SURFACES:
+        _texts.popitem(last=False)